@@ -48,3 +48,24 @@ class AdminOrderSerializer(serializers.ModelSerializer):
             "items",
         ]
         read_only_fields = ["id", "user", "created_at", "updated_at", "items"]
+
+
+class AdminOrderListSerializer(serializers.ModelSerializer):
+    # admin table rows: summary columns, full items only on the detail view
+    user = UserSummarySerializer(read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            "id",
+            "user",
+            "total_amount",
+            "payment_status",
+            "order_status",
+            "item_count",
+            "first_item_name",
+            "thumbnail",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = fields
@@ -1,3 +1,111 @@
+from unittest import mock
+
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from order.models import NotificationOutbox, Order, OrderItem
+from product.models import Category, Product
+from user.models import User
+from .views import AdminOrderBulkStatus
+
+
+class AdminOrderBulkStatusTests(TestCase):
+    url = "/api/v1/admin/admin_orders/bulk-status/"
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email="admin@example.com", password="pass12345")
+        self.buyer = User.objects.create_user(
+            email="buyer@example.com", name="Buyer", phone_number="9876543210", password="pass12345",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _order(self, order_status):
+        return Order.objects.create(user=self.buyer, total_amount=499, order_status=order_status)
+
+    def test_reports_per_id_results(self):
+        processing = self._order("PROCESSING")
+        shipped = self._order("SHIPPED")
+        delivered = self._order("DELIVERED")
+        response = self.client.post(
+            self.url,
+            {"status": "SHIPPED", "ids": [processing.id, shipped.id, delivered.id, 999999]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        results = {r["id"]: r["result"] for r in response.json()["results"]}
+        self.assertEqual(results, {
+            processing.id: "updated",
+            shipped.id: "unchanged",
+            delivered.id: "invalid_transition",
+            999999: "not_found",
+        })
+        self.assertEqual(Order.objects.get(pk=processing.id).order_status, "SHIPPED")
+        self.assertEqual(Order.objects.get(pk=delivered.id).order_status, "DELIVERED")
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+
+    def test_filter_mode_runs_in_constant_queries(self):
+        for _ in range(25):
+            self._order("PROCESSING")
+        # auth is forced; id SELECT + locking status SELECT + locking SELECT + UPDATE
+        # + outbox INSERT (+ two savepoint pairs)
+        with self.assertNumQueries(9):
+            response = self.client.post(
+                self.url, {"status": "SHIPPED", "filter": {"order_status": "PROCESSING"}}, format="json",
+            )
+        self.assertEqual(response.json()["updated"], 25)
+        self.assertFalse(Order.objects.filter(order_status="PROCESSING").exists())
+
+    def test_filter_must_restrict_and_is_capped(self):
+        self._order("PROCESSING")
+        for filters in ({"order_status": None}, {"order_status": "", "created_after": None}):
+            response = self.client.post(self.url, {"status": "SHIPPED", "filter": filters}, format="json")
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.filter(order_status="SHIPPED").exists())
+
+        self._order("PROCESSING")
+        with mock.patch.object(AdminOrderBulkStatus, "MAX_IDS", 1):
+            response = self.client.post(
+                self.url, {"status": "SHIPPED", "filter": {"order_status": "PROCESSING"}}, format="json",
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.filter(order_status="SHIPPED").exists())
+
+    def test_requires_ids_or_filter(self):
+        response = self.client.post(self.url, {"status": "SHIPPED"}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+class AdminOrderListTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email="admin@example.com", password="pass12345")
+        buyer = User.objects.create_user(
+            email="buyer@example.com", name="Buyer", phone_number="9876543210", password="pass12345",
+        )
+        product = Product.objects.create(category=Category.objects.create(name="Dresses"), name="Maxi dress", new_price=499)
+        for _ in range(3):
+            order = Order.objects.create(user=buyer, total_amount=499, item_count=1, first_item_name="Maxi dress")
+            OrderItem.objects.create(order=order, product=product, size="M", price=499)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_list_rows_come_from_the_order_table_alone(self):
+        self.client.get("/api/v1/admin/admin_orders/")  # warm up session / auth queries
+        with self.assertNumQueries(2):  # count + page (orders joined with users)
+            response = self.client.get("/api/v1/admin/admin_orders/")
+        rows = response.json()["results"]
+        self.assertEqual(len(rows), 3)
+        self.assertNotIn("items", rows[0])
+        self.assertEqual((rows[0]["item_count"], rows[0]["first_item_name"]), (1, "Maxi dress"))
+        self.assertEqual(rows[0]["user"]["email"], "buyer@example.com")
+
+        detail = self.client.get(f"/api/v1/admin/admin_orders/{rows[0]['id']}/").json()
+        self.assertEqual(detail["items"][0]["product_name"], "Maxi dress")
+
+    def test_cursor_mode_rejects_other_orderings(self):
+        response = self.client.get("/api/v1/admin/admin_orders/?pagination=cursor&ordering=total_amount")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("ordering", response.json())
 
-# Create your tests here.
+        response = self.client.get("/api/v1/admin/admin_orders/?pagination=cursor&ordering=-created_at")
+        self.assertEqual(len(response.json()["results"]), 3)
@@ -1,9 +1,10 @@
 # admin_orders/urls.py
 from django.urls import path
-from .views import AdminOrderList, AdminOrderDetail, AdminOrderStatus
+from .views import AdminOrderList, AdminOrderDetail, AdminOrderStatus, AdminOrderBulkStatus
 
 urlpatterns = [
     path("admin_orders/", AdminOrderList.as_view(), name="admin-orders-list"),
     path("admin_orders/<int:pk>/", AdminOrderDetail.as_view(), name="admin-orders-detail"),
+    path("admin_orders/bulk-status/", AdminOrderBulkStatus.as_view(), name="admin-orders-bulk-status"),
     path("admin_orders/<int:pk>/status/", AdminOrderStatus.as_view(), name="admin-orders-status"),
 ]
@@ -4,10 +4,15 @@ from rest_framework import status
 from rest_framework.permissions import IsAdminUser
 from rest_framework.pagination import PageNumberPagination
 from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from django.db import transaction
 from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 
+from django_dress.pagination import KeysetPagination, wants_cursor
 from order.models import Order
-from .serializers import AdminOrderSerializer
+from order.services import set_order_status
+from .serializers import AdminOrderListSerializer, AdminOrderSerializer
 
 
 class AdminOrderPagination(PageNumberPagination):
@@ -15,6 +20,12 @@ class AdminOrderPagination(PageNumberPagination):
     page_size_query_param = "page_size"
     max_page_size = 100
 
+
+class AdminOrderCursorPagination(KeysetPagination):
+    # served by the (created_at, id) index on Order
+    ordering = ("-created_at", "-id")
+    max_page_size = 100
+
 class AdminOrderList(APIView):
     permission_classes = [IsAdminUser]
 
@@ -27,9 +38,10 @@ class AdminOrderList(APIView):
     def get(self, request):
         """
         GET /api/v1/admin/admin_orders/?page=1&page_size=10&search=foo&ordering=-created_at
+        GET /api/v1/admin/admin_orders/?pagination=cursor&count=estimated  (keyset pages, newest first)
         """
         try:
-            qs = Order.objects.select_related("user").prefetch_related("items__product").all()
+            qs = Order.objects.select_related("user").all()
 
             search = request.query_params.get("search")
             if search:
@@ -43,11 +55,16 @@ class AdminOrderList(APIView):
             if ordering and ordering in self.ALLOWED_ORDERING:
                 qs = qs.order_by(ordering)
 
-            paginator = AdminOrderPagination()
+            if wants_cursor(request):
+                paginator = AdminOrderCursorPagination()
+            else:
+                paginator = AdminOrderPagination()
             page = paginator.paginate_queryset(qs, request)
-            serializer = AdminOrderSerializer(page, many=True, context={"request": request})
+            serializer = AdminOrderListSerializer(page, many=True, context={"request": request})
             return paginator.get_paginated_response(serializer.data)
 
+        except ValidationError:
+            raise
         except Exception:
             return Response(
                 {"detail": "Invalid request or internal error while processing query."},
@@ -119,3 +136,88 @@ class AdminOrderStatus(APIView):
         order.save(update_fields=["order_status", "updated_at"])
         serializer = AdminOrderSerializer(order, context={"request": request})
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class AdminOrderBulkStatus(APIView):
+    permission_classes = [IsAdminUser]
+
+    MAX_IDS = 1000
+    FILTER_FIELDS = {"order_status", "payment_status", "created_after", "created_before"}
+
+    def post(self, request):
+        """
+        Move many orders to one status in a single UPDATE.
+        Body: { "status": "SHIPPED", "ids": [1, 2, 3] }
+           or { "status": "SHIPPED", "filter": { "order_status": "PROCESSING", "created_before": "2025-12-01T00:00:00Z" } }
+        Returns a result per matched id: updated / unchanged / invalid_transition / not_found.
+        Either way at most MAX_IDS orders; a filter matching more is rejected.
+        """
+        new_status = request.data.get("status")
+        valid_statuses = {choice[0] for choice in Order.ORDER_STATUS_CHOICES}
+        if new_status not in valid_statuses:
+            return Response({"detail": "Invalid status"}, status=status.HTTP_400_BAD_REQUEST)
+
+        ids = request.data.get("ids")
+        filters = request.data.get("filter")
+        if ids:
+            if not isinstance(ids, list) or len(ids) > self.MAX_IDS:
+                return Response({"detail": f"ids must be a list of at most {self.MAX_IDS} order ids"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            try:
+                ids = list(dict.fromkeys(int(i) for i in ids))
+            except (TypeError, ValueError):
+                return Response({"detail": "ids must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+            qs = Order.objects.filter(pk__in=ids)
+        elif isinstance(filters, dict) and filters:
+            unknown = set(filters) - self.FILTER_FIELDS
+            if unknown:
+                return Response({"detail": f"Unsupported filter(s): {', '.join(sorted(unknown))}"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            qs = Order.objects.all()
+            applied = 0
+            for field in ("order_status", "payment_status"):
+                if filters.get(field):
+                    qs = qs.filter(**{field: filters[field]})
+                    applied += 1
+            for field, lookup in (("created_after", "created_at__gte"), ("created_before", "created_at__lt")):
+                if filters.get(field):
+                    value = parse_datetime(str(filters[field]))
+                    if value is None:
+                        return Response({"detail": f"{field} must be an ISO datetime"},
+                                        status=status.HTTP_400_BAD_REQUEST)
+                    qs = qs.filter(**{lookup: value})
+                    applied += 1
+            if not applied:
+                # {"order_status": null} etc. would otherwise select every order
+                return Response({"detail": "filter must restrict at least one field"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            # same cap as id mode: resolve the filter to ids first
+            ids = list(qs.order_by("pk").values_list("pk", flat=True)[:self.MAX_IDS + 1])
+            if len(ids) > self.MAX_IDS:
+                return Response({"detail": f"filter matches more than {self.MAX_IDS} orders; narrow it "
+                                           "(e.g. by created_before) and repeat"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            qs = Order.objects.filter(pk__in=ids)
+        else:
+            return Response({"detail": "ids or filter is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        allowed_from = [s for s, targets in Order.ORDER_STATUS_TRANSITIONS.items() if new_status in targets]
+        with transaction.atomic():
+            # statuses read under the row locks, so the per-id results match what the UPDATE saw
+            current = dict(qs.select_for_update().order_by("pk").values_list("pk", "order_status"))
+            # one UPDATE + one outbox INSERT; notifications go out in one dispatcher batch
+            changed = {pk: old for pk, _, old in set_order_status(qs, new_status, from_statuses=allowed_from)}
+
+        results = []
+        for pk in ids:
+            if pk in changed:
+                results.append({"id": pk, "result": "updated", "from": changed[pk]})
+            elif pk not in current:
+                results.append({"id": pk, "result": "not_found"})
+            elif current[pk] == new_status:
+                results.append({"id": pk, "result": "unchanged"})
+            else:
+                results.append({"id": pk, "result": "invalid_transition", "from": current[pk]})
+
+        return Response({"status": new_status, "updated": len(changed), "results": results},
+                        status=status.HTTP_200_OK)
@@ -7,9 +7,9 @@ from rest_framework import status
 from rest_framework.permissions import IsAdminUser
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
-from django.db.models import Q
-
+from django_dress.pagination import KeysetPagination, wants_cursor
 from product.models import Product, Category, Size
+from product.search import search_products
 from .serializers import AdminProductSerializer, CategorySerializer, SizeSerializer
 
 
@@ -19,6 +19,14 @@ class AdminProductPagination(PageNumberPagination):
     max_page_size = 200
 
 
+class AdminProductCursorPagination(KeysetPagination):
+    # served by the (created_at, id) index on Product
+    ordering = ("-created_at", "-id")
+    max_page_size = 200
+    # ?search= results keep their rank order (offset pages)
+    ranked_params = ("search",)
+
+
 def _extract_sizes_as_strings(data):
     """
     Normalize incoming sizes_input into a list[str] or return None if absent.
@@ -114,21 +122,25 @@ class AdminProductListCreate(APIView):
     def get(self, request):
         qs = Product.objects.select_related("category").prefetch_related("sizes__size")
         search = request.query_params.get("search")
-        if search:
-            qs = qs.filter(Q(name__icontains=search) | Q(category__name__icontains=search))
+        qs = search_products(qs, search)
         category = request.query_params.get("category")
         if category:
             if str(category).isdigit():
                 qs = qs.filter(category_id=int(category))
             else:
                 qs = qs.filter(category__slug=category)
-        ordering = request.query_params.get("ordering", "-created_at")
+        ordering = request.query_params.get("ordering")
         allowed = {"created_at", "-created_at", "new_price", "-new_price", "name", "-name"}
-        if ordering not in allowed:
-            ordering = "-created_at"
-        qs = qs.order_by(ordering)
-
-        paginator = AdminProductPagination()
+        if ordering in allowed:
+            qs = qs.order_by(ordering)
+        elif not search:
+            # searches keep their relevance order unless an ordering is asked for
+            qs = qs.order_by("-created_at")
+
+        if wants_cursor(request):
+            paginator = AdminProductCursorPagination()
+        else:
+            paginator = AdminProductPagination()
         page = paginator.paginate_queryset(qs, request)
         serializer = AdminProductSerializer(page, many=True, context={"request": request})
         return paginator.get_paginated_response(serializer.data)
@@ -1,3 +1,31 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from user.models import User
+
+
+class UserListCursorTests(TestCase):
+    url = "/api/v1/admin/admin_user/"
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email="admin@example.com", password="pass12345")
+        for n in range(3):
+            User.objects.create_user(
+                email=f"buyer{n}@example.com", name=f"Buyer {n}", phone_number=f"987654321{n}", password="pass12345",
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_default_ordering_can_be_passed_explicitly(self):
+        response = self.client.get(self.url, {"pagination": "cursor", "ordering": "-id", "page_size": 2})
+        self.assertEqual(response.status_code, 200)
+        ids = [row["id"] for row in response.json()["results"]]
+        self.assertEqual(ids, list(User.objects.order_by("-id").values_list("id", flat=True)[:2]))
+
+    def test_other_orderings_are_rejected(self):
+        response = self.client.get(self.url, {"pagination": "cursor", "ordering": "name"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json()["ordering"],
+            ["Cursor pages are ordered by -id; use page numbers for other orderings."],
+        )
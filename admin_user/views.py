@@ -5,6 +5,7 @@ from rest_framework.response import Response
 from rest_framework import status, permissions
 from rest_framework.pagination import PageNumberPagination
 
+from django_dress.pagination import KeysetPagination, wants_cursor
 from user.models import User
 from .serializers import AdminUserSerializer
 
@@ -15,12 +16,18 @@ class StandardResultsSetPagination(PageNumberPagination):
     max_page_size = 100
 
 
+class UserCursorPagination(KeysetPagination):
+    # keyset on the primary key index
+    ordering = ("-id",)
+    max_page_size = 100
+
 
 class UserListAPIView(APIView):
     """
     GET: list users with pagination, search and ordering.
     Query params:
       - page, page_size
+      - pagination=cursor / cursor, count=estimated|exact (keyset pages by -id)
       - search (searches name, email, phone_number)
       - ordering (e.g. 'name' or '-id')
     """
@@ -47,7 +54,10 @@ class UserListAPIView(APIView):
             qs = qs.order_by("-id")
 
         # paginate
-        paginator = StandardResultsSetPagination()
+        if wants_cursor(request):
+            paginator = UserCursorPagination()
+        else:
+            paginator = StandardResultsSetPagination()
         page = paginator.paginate_queryset(qs, request)
         serializer = AdminUserSerializer(page, many=True, context={"request": request})
         return paginator.get_paginated_response(serializer.data)
@@ -92,6 +102,8 @@ class ToggleBanAPIView(APIView):
     def post(self, request, pk, format=None):
         user = get_object_or_404(User, pk=pk)
         user.is_banned = not bool(user.is_banned)
+        # save() evicts the user's cached auth record (user/signals.py): the ban
+        # applies to their next request
         user.save()
         serializer = AdminUserSerializer(user, context={"request": request})
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -0,0 +1,34 @@
+# cart/management/commands/flush_carts.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from cart.store import get_cart_store
+
+
+class Command(BaseCommand):
+    help = "Write carts changed in the hot cart store back to CartItem (write-behind)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--interval", type=float, default=1.0, help="seconds to sleep when nothing is dirty")
+        parser.add_argument("--once", action="store_true", help="flush what is dirty now and exit")
+
+    def handle(self, *args, **options):
+        store = get_cart_store()
+        batch_size = options["batch_size"]
+        while True:
+            try:
+                flushed = store.flush_dirty(batch_size)
+            except Exception as exc:
+                # redis / db hiccup: the cart stays dirty, try again shortly
+                self.stderr.write(f"flush failed: {exc}")
+                flushed = 0
+                if options["once"]:
+                    raise
+            if flushed:
+                self.stdout.write(f"flushed {flushed} cart(s)")
+            if flushed < batch_size:
+                if options["once"]:
+                    return
+                time.sleep(options["interval"])
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:44
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0003_alter_cartitem_unique_together'),
+        ('product', '0007_product_rating_sum'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='cartitem',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(models.F('user'), models.F('product'), django.db.models.functions.comparison.Coalesce('size', models.Value('')), name='cartitem_user_product_size_uniq'),
+        ),
+    ]
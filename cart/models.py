@@ -1,5 +1,7 @@
 from django.conf import settings
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from product.models import Product  # adjust if product app name differs
 
@@ -13,7 +15,14 @@ class CartItem(models.Model):
     size = models.CharField(max_length=32, null=True, blank=True)
 
     class Meta:
-        unique_together = ("user", "product")
+        # one row per (user, product, size); NULL size counts as one size so the
+        # add-to-cart upsert can target this index with ON CONFLICT
+        constraints = [
+            models.UniqueConstraint(
+                F("user"), F("product"), Coalesce("size", Value("")),
+                name="cartitem_user_product_size_uniq",
+            ),
+        ]
         ordering = ("-added_at",)
 
     def __str__(self):
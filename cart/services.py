@@ -0,0 +1,101 @@
+# cart/services.py
+from django.db import connection, transaction
+
+from django_dress.etags import bump_collection_version
+from product.models import Product
+from .models import CartItem
+
+
+def merge_cart_lines(lines):
+    """{(product_id, size): total quantity} for [(product_id, size, quantity), ...]."""
+    wanted = {}
+    for product_id, size, quantity in lines:
+        key = (int(product_id), size or None)
+        wanted[key] = wanted.get(key, 0) + quantity
+    return wanted
+
+
+def add_to_cart(user_id, product_id, size, quantity):
+    """
+    Add `quantity` of (product, size) to the user's cart in a single statement.
+    Returns (item_id, product_id, quantity, created), or None when the product doesn't exist.
+    """
+    rows = add_many_to_cart(user_id, [(product_id, size, quantity)])
+    return rows[0] if rows else None
+
+
+def add_many_to_cart(user_id, lines):
+    """
+    Upsert `lines` = [(product_id, size, quantity), ...] into the user's cart:
+    one INSERT ... SELECT ... ON CONFLICT DO UPDATE for any number of lines.
+
+    - the join on the product table drops unknown products (no separate lookup)
+    - quantities are added atomically in the database, so concurrent adds of
+      the same item never lose an increment
+    - repeated (product, size) lines are summed first; Postgres refuses to
+      update the same row twice in one statement
+
+    Returns [(item_id, product_id, quantity, created), ...] for the rows written.
+    """
+    wanted = merge_cart_lines(lines)
+    if not wanted:
+        return []
+
+    cart_table = connection.ops.quote_name(CartItem._meta.db_table)
+    product_table = connection.ops.quote_name(Product._meta.db_table)
+    values = ", ".join(["(%s, %s::varchar, %s)"] * len(wanted))
+    params = [user_id]
+    for (product_id, size), quantity in wanted.items():
+        params += [product_id, size, quantity]
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {cart_table} AS c (user_id, product_id, size, quantity, added_at) "
+            f"SELECT %s, p.id, v.size, v.qty, NOW() "
+            f"FROM (VALUES {values}) AS v(product_id, size, qty) "
+            f"JOIN {product_table} AS p ON p.id = v.product_id "
+            f"ON CONFLICT (user_id, product_id, (COALESCE(size, ''))) "
+            f"DO UPDATE SET quantity = c.quantity + EXCLUDED.quantity "
+            # xmax is 0 only for freshly inserted rows
+            f"RETURNING c.id, c.product_id, c.quantity, (c.xmax = 0)",
+            params,
+        )
+        rows = cursor.fetchall()
+
+    if rows:
+        # raw SQL skips the CartItem signals
+        transaction.on_commit(lambda: bump_collection_version("cart", user_id))
+    return rows
+
+
+def sync_cart_rows(user_id, lines):
+    """
+    Write-behind for cart stores that keep the live cart elsewhere: make the
+    user's CartItem rows equal `lines` = [(product_id, size, quantity, added_at), ...].
+    Lines for products that no longer exist are dropped.
+    """
+    wanted = {(product_id, size or ""): (product_id, size, quantity, added_at) for product_id, size, quantity, added_at in lines}
+    known = set(Product.objects.filter(pk__in={line[0] for line in wanted.values()}).values_list("pk", flat=True))
+
+    with transaction.atomic():
+        rows = {
+            (row.product_id, row.size or ""): row
+            for row in CartItem.objects.select_for_update().filter(user_id=user_id)
+        }
+        stale = [row.pk for key, row in rows.items() if key not in wanted or key[0] not in known]
+        changed, new = [], []
+        for key, (product_id, size, quantity, added_at) in wanted.items():
+            if product_id not in known:
+                continue
+            row = rows.get(key)
+            if row is None:
+                new.append(CartItem(user_id=user_id, product_id=product_id, size=size, quantity=quantity, added_at=added_at))
+            elif row.quantity != quantity:
+                row.quantity = quantity
+                changed.append(row)
+        if stale:
+            CartItem.objects.filter(pk__in=stale).delete()
+        if changed:
+            CartItem.objects.bulk_update(changed, ["quantity"])
+        if new:
+            CartItem.objects.bulk_create(new)
@@ -0,0 +1,13 @@
+# cart/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from django_dress.etags import bump_collection_version
+from .models import CartItem
+
+
+@receiver([post_save, post_delete], sender=CartItem)
+def bump_cart_version(sender, instance, **kwargs):
+    # covers view mutations and checkout clearing the cart
+    transaction.on_commit(lambda: bump_collection_version("cart", instance.user_id))
@@ -0,0 +1,292 @@
+# cart/store.py
+"""
+Cart storage backends. Views and checkout go through get_cart_store() and never
+touch CartItem directly, so a hot-cart backend can be switched on for sales events
+(settings.CART_STORE) without changing the API.
+
+Both backends hand back CartItem instances with `product` loaded, so the existing
+serializers keep working; the Redis ones are unsaved.
+"""
+import json
+import logging
+import time
+from datetime import datetime, timezone as dt_timezone
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from django_dress.etags import bump_collection_version
+from product.models import Product
+from .models import CartItem
+from .services import add_many_to_cart, merge_cart_lines, sync_cart_rows
+
+logger = logging.getLogger(__name__)
+
+_store = None
+
+
+def get_cart_store():
+    global _store
+    if _store is None:
+        _store = import_string(settings.CART_STORE)()
+    return _store
+
+
+class DatabaseCartStore:
+    """Every change is a CartItem row write (the original behaviour)."""
+
+    def items(self, user_id):
+        return list(CartItem.objects.filter(user_id=user_id).select_related("product"))
+
+    def get(self, user_id, item_id):
+        return CartItem.objects.filter(pk=item_id, user_id=user_id).select_related("product").first()
+
+    def add(self, user_id, lines):
+        """lines = [(product_id, size, quantity), ...] -> [(item_id, product_id, quantity, created), ...]"""
+        return add_many_to_cart(user_id, lines)
+
+    def set_quantity(self, user_id, item_id, quantity):
+        item = self.get(user_id, item_id)
+        if item is not None:
+            item.quantity = quantity
+            item.save()
+        return item
+
+    def remove(self, user_id, item_id):
+        deleted, _ = CartItem.objects.filter(pk=item_id, user_id=user_id).delete()
+        return bool(deleted)
+
+    def remove_products(self, user_id, product_ids):
+        """Checkout: drop the purchased products. Runs inside the checkout transaction."""
+        CartItem.objects.filter(user_id=user_id, product_id__in=product_ids).delete()
+
+    def flush_dirty(self, batch_size=500):
+        return 0
+
+
+class RedisCartStore:
+    """
+    Hot carts in one Redis hash per user, persisted to CartItem by write-behind.
+
+    cart:<user_id>  "seq"     -> last line id handed out
+                    "<id>"    -> JSON [product_id, size, quantity, added_at]
+    cart:dirty      set of user ids whose hash differs from the CartItem rows
+
+    - the hash is loaded from CartItem on first use (line ids = row pks)
+    - every change is an optimistic WATCH/MULTI transaction on the user's hash,
+      so concurrent adds never lose an increment
+    - `flush_carts` (management command) writes dirty carts back in batches;
+      checkout writes the buyer's cart back immediately
+    - the hash expires after CART_STORE_TTL seconds without changes, well after
+      it has been flushed
+    """
+    key_prefix = "cart:"
+    dirty_key = "cart:dirty"
+
+    def __init__(self, client=None):
+        if client is None:
+            client = redis.Redis.from_url(settings.CART_REDIS_URL, decode_responses=True)
+        self.redis = client
+        self.ttl = settings.CART_STORE_TTL
+
+    def _key(self, user_id):
+        return f"{self.key_prefix}{user_id}"
+
+    # -- hash <-> lines ----------------------------------------------------
+
+    @staticmethod
+    def _decode(data):
+        """{line_id: [product_id, size, quantity, added_at]} from a raw hash."""
+        return {
+            int(field): json.loads(value)
+            for field, value in data.items()
+            if field != "seq"
+        }
+
+    def _snapshot(self, user_id):
+        """Hash contents for a cart that isn't in Redis yet, from CartItem."""
+        rows = CartItem.objects.filter(user_id=user_id).values_list("pk", "product_id", "size", "quantity", "added_at")
+        mapping = {"seq": max((row[0] for row in rows), default=0)}
+        for pk, product_id, size, quantity, added_at in rows:
+            mapping[str(pk)] = json.dumps([product_id, size, quantity, added_at.timestamp()])
+        return mapping
+
+    def _update(self, user_id, change, load=True):
+        """
+        Run change(seq, lines) -> (writes, deletes, result) atomically against the
+        user's hash, loading it from the database first if needed.
+        With load=False a cart that isn't in Redis is left alone (returns None).
+        """
+        key = self._key(user_id)
+        with self.redis.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    data = pipe.hgetall(key)
+                    fresh = {}
+                    if not data:
+                        if not load:
+                            return None
+                        fresh = data = self._snapshot(user_id)
+                    writes, deletes, result = change(int(data["seq"]), self._decode(data))
+                    pipe.multi()
+                    if fresh or writes:
+                        pipe.hset(key, mapping={**fresh, **writes})
+                    if deletes:
+                        pipe.hdel(key, *deletes)
+                    pipe.expire(key, self.ttl)
+                    if writes or deletes:
+                        pipe.sadd(self.dirty_key, user_id)
+                    pipe.execute()
+                    break
+                except redis.WatchError:
+                    continue
+        if writes or deletes:
+            bump_collection_version("cart", user_id)
+        return result
+
+    def _lines(self, user_id):
+        data = self.redis.hgetall(self._key(user_id))
+        if not data:
+            return self._update(user_id, lambda seq, lines: ({}, [], lines))
+        return self._decode(data)
+
+    def _to_items(self, user_id, lines):
+        products = Product.objects.in_bulk({line[0] for line in lines.values()})
+        items = []
+        for line_id, (product_id, size, quantity, added_at) in lines.items():
+            if product_id not in products:
+                continue
+            item = CartItem(
+                id=line_id, user_id=user_id, product=products[product_id], size=size,
+                quantity=quantity, added_at=datetime.fromtimestamp(added_at, tz=dt_timezone.utc),
+            )
+            items.append(item)
+        items.sort(key=lambda item: item.added_at, reverse=True)
+        return items
+
+    # -- store API -----------------------------------------------------------
+
+    def items(self, user_id):
+        return self._to_items(user_id, self._lines(user_id))
+
+    def get(self, user_id, item_id):
+        lines = self._lines(user_id)
+        if item_id not in lines:
+            return None
+        items = self._to_items(user_id, {item_id: lines[item_id]})
+        return items[0] if items else None
+
+    def add(self, user_id, lines):
+        wanted = merge_cart_lines(lines)
+        known = set(Product.objects.filter(pk__in={pid for pid, _ in wanted}).values_list("pk", flat=True))
+        wanted = {key: qty for key, qty in wanted.items() if key[0] in known}
+        if not wanted:
+            return []
+
+        def change(seq, current):
+            by_key = {(line[0], line[1] or ""): line_id for line_id, line in current.items()}
+            writes, result = {}, []
+            now = time.time()
+            for (product_id, size), quantity in wanted.items():
+                line_id = by_key.get((product_id, size or ""))
+                if line_id is None:
+                    seq += 1
+                    line_id, line, created = seq, [product_id, size, quantity, now], True
+                else:
+                    line = current[line_id]
+                    line, created = [line[0], line[1], line[2] + quantity, line[3]], False
+                writes[str(line_id)] = json.dumps(line)
+                result.append((line_id, product_id, line[2], created))
+            writes["seq"] = seq
+            return writes, [], result
+
+        return self._update(user_id, change)
+
+    def set_quantity(self, user_id, item_id, quantity):
+        def change(seq, current):
+            if item_id not in current:
+                return {}, [], False
+            line = current[item_id]
+            return {str(item_id): json.dumps([line[0], line[1], quantity, line[3]])}, [], True
+
+        if not self._update(user_id, change):
+            return None
+        return self.get(user_id, item_id)
+
+    def remove(self, user_id, item_id):
+        def change(seq, current):
+            if item_id not in current:
+                return {}, [], False
+            return {}, [str(item_id)], True
+
+        return self._update(user_id, change)
+
+    def remove_products(self, user_id, product_ids):
+        """
+        Checkout: the rows go now, inside the checkout transaction; the hash is
+        updated and the rest of the cart written back once it commits.
+        """
+        product_ids = set(product_ids)
+        CartItem.objects.filter(user_id=user_id, product_id__in=product_ids).delete()
+
+        def change(seq, current):
+            gone = [str(line_id) for line_id, line in current.items() if line[0] in product_ids]
+            return {}, gone, None
+
+        def on_commit():
+            # the order is committed by now: a Redis / write-back error here
+            # must not turn the checkout response into a 500
+            try:
+                self._update(user_id, change, load=False)
+                self.flush(user_id)
+            except Exception:
+                logger.exception("cart store: post-checkout cleanup failed for user %s", user_id)
+
+        transaction.on_commit(on_commit)
+
+    # -- write-behind --------------------------------------------------------
+
+    def flush(self, user_id):
+        """
+        Make the CartItem rows match the user's hash. The cart stays in
+        cart:dirty unless the rows were written and the hash is unchanged since.
+        """
+        key = self._key(user_id)
+        data = self.redis.hgetall(key)
+        if data:
+            lines = [
+                (product_id, size, quantity, datetime.fromtimestamp(added_at, tz=dt_timezone.utc))
+                for product_id, size, quantity, added_at in self._decode(data).values()
+            ]
+            sync_cart_rows(user_id, lines)
+
+        with self.redis.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                if pipe.hgetall(key) != data:
+                    # changed while we were writing: the next round picks it up
+                    return
+                pipe.multi()
+                pipe.srem(self.dirty_key, user_id)
+                pipe.execute()
+            except redis.WatchError:
+                pass
+
+    def flush_dirty(self, batch_size=500):
+        """
+        Write back up to batch_size dirty carts; returns how many were flushed.
+        Ids are only read here; flush() removes each one once its cart is
+        written, so a failure (logged) or a crash leaves it for the next round.
+        """
+        user_ids = self.redis.srandmember(self.dirty_key, batch_size) or []
+        flushed = 0
+        for user_id in user_ids:
+            try:
+                self.flush(int(user_id))
+                flushed += 1
+            except Exception:
+                logger.exception("cart store: flushing the cart of user %s failed", user_id)
+        return flushed
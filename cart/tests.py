@@ -1,3 +1,307 @@
-from django.test import TestCase
+import threading
+import unittest
+from unittest import mock
 
-# Create your tests here.
+import redis
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from product.models import Category, Product
+from user.models import User
+from .models import CartItem
+from .services import add_to_cart, sync_cart_rows
+from .store import RedisCartStore
+
+try:
+    import fakeredis
+except ImportError:  # optional, only needed for the Redis store tests
+    fakeredis = None
+
+
+class CartDeltaResponseTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email="buyer@example.com", name="Buyer", phone_number="9876543210", password="pass12345",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name="Dresses")
+        self.products = [
+            Product.objects.create(category=category, name=f"Dress {i}", new_price=499) for i in range(3)
+        ]
+
+    def test_full_response_is_unchanged_by_default(self):
+        self.client.post("/api/v1/cart/", {"product": self.products[0].id, "size": "M"}, format="json")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/v1/cart/", {"product": self.products[1].id, "size": "M"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()["items"]), 2)
+
+    def test_delta_returns_only_the_changed_item(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.client.post("/api/v1/cart/?response=delta", {"product": self.products[0].id, "size": "M"}, format="json")
+        with self.captureOnCommitCallbacks(execute=True):
+            second = self.client.post("/api/v1/cart/?response=delta", {"product": self.products[1].id, "size": "M"}, format="json")
+        body = second.json()
+        self.assertEqual(set(body), {"version", "item"})
+        self.assertEqual(body["item"]["product_detail"]["id"], self.products[1].id)
+        self.assertEqual(body["version"], second["ETag"])
+        self.assertNotEqual(first["ETag"], self.client.get("/api/v1/cart/")["ETag"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            removed = self.client.delete(f"/api/v1/cart/{body['item']['id']}/?response=delta")
+        self.assertEqual(removed.json()["removed"], body["item"]["id"])
+        self.assertNotIn("items", removed.json())
+
+    def test_get_answers_304_until_the_cart_changes(self):
+        etag = self.client.get("/api/v1/cart/")["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/v1/cart/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # checkout and other code paths clear the cart directly; the version still moves
+        with self.captureOnCommitCallbacks(execute=True):
+            CartItem.objects.create(user=self.user, product=self.products[0], size="M")
+        response = self.client.get("/api/v1/cart/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["items"]), 1)
+
+
+class CartUpsertTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="buyer@example.com", name="Buyer", phone_number="9876543210", password="pass12345",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name="Dresses")
+        self.products = [
+            Product.objects.create(category=category, name=f"Dress {i}", new_price=499) for i in range(3)
+        ]
+
+    def test_add_is_one_statement_and_increments(self):
+        with self.assertNumQueries(1):
+            add_to_cart(self.user.id, self.products[0].id, "M", 2)
+        _, _, quantity, created = add_to_cart(self.user.id, self.products[0].id, "M", 3)
+        self.assertEqual((quantity, created), (5, False))
+        # another size of the same product is its own line
+        add_to_cart(self.user.id, self.products[0].id, "L", 1)
+        add_to_cart(self.user.id, self.products[0].id, None, 1)
+        add_to_cart(self.user.id, self.products[0].id, None, 1)
+        self.assertEqual(
+            dict(CartItem.objects.filter(user=self.user).values_list("size", "quantity")),
+            {"M": 5, "L": 1, None: 2},
+        )
+
+    def test_unknown_product(self):
+        self.assertIsNone(add_to_cart(self.user.id, 999999, "M", 1))
+        response = self.client.post("/api/v1/cart/", {"product": 999999, "size": "M"}, format="json")
+        self.assertEqual(response.status_code, 404)
+
+    def test_post_status_codes(self):
+        payload = {"product": self.products[0].id, "size": "M", "quantity": 2}
+        self.assertEqual(self.client.post("/api/v1/cart/", payload, format="json").status_code, 201)
+        response = self.client.post("/api/v1/cart/", payload, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["items"][0]["quantity"], 4)
+        payload["quantity"] = 0
+        self.assertEqual(self.client.post("/api/v1/cart/", payload, format="json").status_code, 400)
+
+    def test_bulk_add(self):
+        add_to_cart(self.user.id, self.products[0].id, "M", 1)
+        items = [
+            {"product": self.products[0].id, "size": "M", "quantity": 2},
+            {"product": self.products[1].id, "size": "S"},
+            {"product": self.products[1].id, "size": "S", "quantity": 2},
+            {"product": 999999, "size": "S"},
+        ]
+        with self.assertNumQueries(2):  # upsert + cart read
+            response = self.client.post("/api/v1/cart/bulk/", {"items": items}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["skipped"], [999999])
+        quantities = {i["product_detail"]["id"]: i["quantity"] for i in response.json()["items"]}
+        self.assertEqual(quantities, {self.products[0].id: 3, self.products[1].id: 3})
+
+        response = self.client.post("/api/v1/cart/bulk/", {"items": [{"size": "S"}]}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_add_delta_reads_the_cart_once(self):
+        items = [{"product": p.id, "size": "M"} for p in self.products]
+        with self.assertNumQueries(2):  # upsert + one cart read
+            response = self.client.post("/api/v1/cart/bulk/?response=delta", {"items": items}, format="json")
+        self.assertEqual(
+            sorted(i["product_detail"]["id"] for i in response.json()["changed"]),
+            [p.id for p in self.products],
+        )
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "ON CONFLICT upsert needs PostgreSQL")
+class ConcurrentAddToCartTests(TransactionTestCase):
+    """A burst of double-taps on "add" must not lose any increment."""
+
+    workers = 16
+
+    def test_concurrent_adds_lose_nothing(self):
+        user = User.objects.create_user(
+            email="buyer@example.com", name="Buyer", phone_number="9876543210", password="pass12345",
+        )
+        product = Product.objects.create(category=Category.objects.create(name="Dresses"), name="Maxi dress", new_price=499)
+        barrier = threading.Barrier(self.workers)
+        errors = []
+
+        def run():
+            try:
+                barrier.wait()
+                for _ in range(5):
+                    add_to_cart(user.id, product.id, "M", 1)
+            except Exception as exc:
+                errors.append(repr(exc))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run) for _ in range(self.workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        item = CartItem.objects.get(user=user, product=product)
+        self.assertEqual(item.quantity, self.workers * 5)
+
+
+@unittest.skipUnless(fakeredis, "fakeredis is not installed")
+class RedisCartStoreTests(TestCase):
+    def setUp(self):
+        self.store = RedisCartStore(client=fakeredis.FakeRedis(decode_responses=True))
+        patcher = mock.patch("cart.store._store", self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user(
+            email="buyer@example.com", name="Buyer", phone_number="9876543210", password="pass12345",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name="Dresses")
+        self.products = [
+            Product.objects.create(category=category, name=f"Dress {i}", new_price=499) for i in range(3)
+        ]
+
+    def _rows(self):
+        return dict(CartItem.objects.filter(user=self.user).values_list("product_id", "quantity"))
+
+    def test_loads_existing_rows_and_keeps_their_ids(self):
+        row = CartItem.objects.create(user=self.user, product=self.products[0], size="M", quantity=2)
+        items = self.store.items(self.user.id)
+        self.assertEqual([(i.id, i.quantity) for i in items], [(row.id, 2)])
+
+    def test_changes_stay_in_redis_until_flushed(self):
+        CartItem.objects.create(user=self.user, product=self.products[0], size="M", quantity=1)
+        self.client.post("/api/v1/cart/", {"product": self.products[0].id, "size": "M", "quantity": 2}, format="json")
+        response = self.client.post("/api/v1/cart/", {"product": self.products[1].id, "size": "S"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        quantities = {i["product_detail"]["id"]: i["quantity"] for i in response.json()["items"]}
+        self.assertEqual(quantities, {self.products[0].id: 3, self.products[1].id: 1})
+        self.assertEqual(self._rows(), {self.products[0].id: 1})
+
+        # changing a quantity is not a database write
+        line_id = response.json()["items"][0]["id"]
+        with self.assertNumQueries(1):  # product lookup for the response
+            self.client.patch(f"/api/v1/cart/{line_id}/?response=delta", {"quantity": 5}, format="json")
+
+        self.assertEqual(self.store.flush_dirty(), 1)
+        self.assertEqual(self._rows(), {self.products[0].id: 3, self.products[1].id: 5})
+        self.assertEqual(self.store.flush_dirty(), 0)
+
+        self.client.delete(f"/api/v1/cart/{line_id}/")
+        self.store.flush_dirty()
+        self.assertEqual(self._rows(), {self.products[0].id: 3})
+
+    def test_failed_flush_keeps_that_cart_dirty_and_flushes_the_rest(self):
+        other = User.objects.create_user(
+            email="other@example.com", name="Other", phone_number="9876543211", password="pass12345",
+        )
+        self.store.add(self.user.id, [(self.products[0].id, "M", 1)])
+        self.store.add(other.id, [(self.products[1].id, "M", 2)])
+
+        real_sync = sync_cart_rows
+
+        def sync(user_id, lines):
+            if user_id == self.user.id:
+                raise DatabaseError("boom")
+            return real_sync(user_id, lines)
+
+        with mock.patch("cart.store.sync_cart_rows", side_effect=sync), self.assertLogs("cart.store", "ERROR"):
+            self.assertEqual(self.store.flush_dirty(), 1)
+        self.assertEqual(dict(CartItem.objects.filter(user=other).values_list("product_id", "quantity")),
+                         {self.products[1].id: 2})
+        self.assertEqual(self.store.redis.smembers("cart:dirty"), {str(self.user.id)})
+
+        self.assertEqual(self.store.flush_dirty(), 1)
+        self.assertEqual(self._rows(), {self.products[0].id: 1})
+        self.assertEqual(self.store.redis.smembers("cart:dirty"), set())
+
+    def test_cart_changed_during_flush_stays_dirty(self):
+        self.store.add(self.user.id, [(self.products[0].id, "M", 1)])
+        real_sync = sync_cart_rows
+
+        def sync(user_id, lines):
+            real_sync(user_id, lines)
+            self.store.add(self.user.id, [(self.products[0].id, "M", 1)])
+
+        with mock.patch("cart.store.sync_cart_rows", side_effect=sync):
+            self.store.flush(self.user.id)
+        self.assertEqual(self.store.redis.smembers("cart:dirty"), {str(self.user.id)})
+        self.store.flush_dirty()
+        self.assertEqual(self._rows(), {self.products[0].id: 2})
+
+    def test_checkout_cleanup_errors_are_logged(self):
+        self.store.add(self.user.id, [(self.products[0].id, "M", 1)])
+        with mock.patch.object(self.store, "flush", side_effect=redis.ConnectionError), \
+                self.assertLogs("cart.store", "ERROR"):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.store.remove_products(self.user.id, [self.products[0].id])
+
+    def test_checkout_removes_purchased_lines_and_writes_back(self):
+        self.store.add(self.user.id, [(self.products[0].id, "M", 1), (self.products[1].id, "M", 2)])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.store.remove_products(self.user.id, [self.products[0].id])
+        self.assertEqual([i.product_id for i in self.store.items(self.user.id)], [self.products[1].id])
+        self.assertEqual(self._rows(), {self.products[1].id: 2})
+
+
+@unittest.skipUnless(fakeredis, "fakeredis is not installed")
+class ConcurrentRedisCartStoreTests(TransactionTestCase):
+    workers = 8
+
+    def test_concurrent_adds_lose_nothing(self):
+        store = RedisCartStore(client=fakeredis.FakeRedis(decode_responses=True))
+        user = User.objects.create_user(
+            email="buyer@example.com", name="Buyer", phone_number="9876543210", password="pass12345",
+        )
+        product = Product.objects.create(category=Category.objects.create(name="Dresses"), name="Maxi dress", new_price=499)
+        barrier = threading.Barrier(self.workers)
+        errors = []
+
+        def run():
+            try:
+                barrier.wait()
+                for _ in range(5):
+                    store.add(user.id, [(product.id, "M", 1)])
+            except Exception as exc:
+                errors.append(repr(exc))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run) for _ in range(self.workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual([i.quantity for i in store.items(user.id)], [self.workers * 5])
@@ -1,8 +1,9 @@
 
 from django.urls import path
-from .views import CartListCreateAPIView, CartItemDetailAPIView
+from .views import CartListCreateAPIView, CartItemDetailAPIView, CartBulkAddAPIView
 
 urlpatterns = [
     path("", CartListCreateAPIView.as_view(), name="cart-list-create"),
+    path("bulk/", CartBulkAddAPIView.as_view(), name="cart-bulk-add"),
     path("<int:pk>/", CartItemDetailAPIView.as_view(), name="cart-item-detail"),
 ]
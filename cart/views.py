@@ -1,20 +1,57 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from django.shortcuts import get_object_or_404
+from django.http import Http404
 
-from .models import CartItem
 from .serializers import CartItemSerializer
-from product.models import Product
+from .store import get_cart_store
+from django_dress.etags import collection_etag, not_modified, wants_delta
+
+
+# upper bound for one add-many request (guest cart restore)
+MAX_BULK_ITEMS = 100
+
+
+def parse_quantity(value):
+    """int >= 1 or ValueError."""
+    qty = int(value)
+    if qty < 1:
+        raise ValueError("Quantity must be >= 1")
+    return qty
+
+
+def cart_response(request, response_status=status.HTTP_200_OK, item=None, removed=None, changed=None):
+    """
+    Full cart by default. With ?response=delta only the changed row(s) are sent
+    back (or the id of the removed one) together with the new cart version.
+    """
+    etag = collection_etag("cart", request.user.id)
+    if wants_delta(request):
+        data = {"version": etag}
+        if item is not None:
+            data["item"] = CartItemSerializer(item, context={"request": request}).data
+        if changed is not None:
+            data["changed"] = CartItemSerializer(changed, many=True, context={"request": request}).data
+        if removed is not None:
+            data["removed"] = removed
+    else:
+        items = get_cart_store().items(request.user.id)
+        serializer = CartItemSerializer(items, many=True, context={"request": request})
+        data = {"items": serializer.data}
+    response = Response(data, status=response_status)
+    response["ETag"] = etag
+    return response
 
 
 class CartListCreateAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, format=None):
-        qs = CartItem.objects.filter(user=request.user).select_related("product")
-        serializer = CartItemSerializer(qs, many=True, context={"request": request})
-        return Response({"items": serializer.data}, status=status.HTTP_200_OK)
+        # If-None-Match with the last seen version -> 304, no query
+        cached = not_modified(request, collection_etag("cart", request.user.id))
+        if cached is not None:
+            return cached
+        return cart_response(request)
 
     def post(self, request, format=None):
         """
@@ -26,35 +63,76 @@ class CartListCreateAPIView(APIView):
         }
         """
         product_id = request.data.get("product")
-        qty = int(request.data.get("quantity", 1))
         size = request.data.get("size")  # accept as-is, no validation
 
         if not product_id:
             return Response({"detail": "Missing 'product' in payload."},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        product = get_object_or_404(Product, pk=product_id)
+        try:
+            product_id = int(product_id)
+            qty = parse_quantity(request.data.get("quantity", 1))
+        except (ValueError, TypeError):
+            return Response({"detail": "Invalid 'product' or 'quantity' value"},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-        # GET OR CREATE by (user, product, size)
-        item, created = CartItem.objects.get_or_create(
-            user=request.user,
-            product=product,
-            size=size,
-            defaults={"quantity": qty}
+        # insert, or add to the existing quantity of (user, product, size), atomically
+        store = get_cart_store()
+        rows = store.add(request.user.id, [(product_id, size, qty)])
+        if not rows:
+            return Response({"detail": "No Product matches the given query."},
+                            status=status.HTTP_404_NOT_FOUND)
+        item_id, _, _, created = rows[0]
+
+        item = None
+        if wants_delta(request):
+            item = store.get(request.user.id, item_id)
+        return cart_response(
+            request,
+            status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+            item=item,
         )
 
-        if not created:
-            # Add to existing quantity
-            item.quantity += qty
-            item.save()
 
-        qs = CartItem.objects.filter(user=request.user).select_related("product")
-        serializer = CartItemSerializer(qs, many=True, context={"request": request})
+class CartBulkAddAPIView(APIView):
+    """
+    POST /api/v1/cart/bulk/  -> add many items at once (e.g. restoring a guest cart after login)
+    {
+        "items": [{"product": <id>, "quantity": <int>, "size": "XL"}, ...]
+    }
+    Unknown products are skipped and reported back in "skipped".
+    """
+    permission_classes = [permissions.IsAuthenticated]
 
-        return Response(
-            {"items": serializer.data},
-            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
-        )
+    def post(self, request, format=None):
+        items = request.data.get("items")
+        if not isinstance(items, list) or not items:
+            return Response({"detail": "'items' must be a non-empty list."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > MAX_BULK_ITEMS:
+            return Response({"detail": f"At most {MAX_BULK_ITEMS} items per request."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        lines = []
+        for entry in items:
+            try:
+                lines.append((int(entry["product"]), entry.get("size"), parse_quantity(entry.get("quantity", 1))))
+            except (KeyError, ValueError, TypeError, AttributeError):
+                return Response({"detail": f"Invalid item: {entry}"},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        store = get_cart_store()
+        rows = store.add(request.user.id, lines)
+
+        changed = None
+        if wants_delta(request):
+            # one read of the whole cart, not one per line
+            cart = {item.id: item for item in store.items(request.user.id)}
+            changed = [cart[row[0]] for row in rows if row[0] in cart]
+        response = cart_response(request, changed=changed)
+        written = {row[1] for row in rows}
+        response.data["skipped"] = sorted({pid for pid, _, _ in lines} - written)
+        return response
 
 
 class CartItemDetailAPIView(APIView):
@@ -62,8 +140,6 @@ class CartItemDetailAPIView(APIView):
 
     def patch(self, request, pk, format=None):
         """ Update quantity only. """
-        obj = get_object_or_404(CartItem, pk=pk, user=request.user)
-
         qty = request.data.get("quantity")
         if qty is None:
             return Response({"detail": "Missing 'quantity' in payload."},
@@ -78,17 +154,14 @@ class CartItemDetailAPIView(APIView):
             return Response({"detail": "Invalid 'quantity' value"},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        obj.quantity = qty
-        obj.save()
+        obj = get_cart_store().set_quantity(request.user.id, pk, qty)
+        if obj is None:
+            raise Http404
 
-        qs = CartItem.objects.filter(user=request.user).select_related("product")
-        serializer = CartItemSerializer(qs, many=True, context={"request": request})
-        return Response({"items": serializer.data}, status=status.HTTP_200_OK)
+        return cart_response(request, item=obj)
 
     def delete(self, request, pk, format=None):
-        obj = get_object_or_404(CartItem, pk=pk, user=request.user)
-        obj.delete()
+        if not get_cart_store().remove(request.user.id, pk):
+            raise Http404
 
-        qs = CartItem.objects.filter(user=request.user).select_related("product")
-        serializer = CartItemSerializer(qs, many=True, context={"request": request})
-        return Response({"items": serializer.data}, status=status.HTTP_200_OK)
+        return cart_response(request, removed=pk)
@@ -3,12 +3,16 @@ import os
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "django_dress.settings")
 
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter, URLRouter
-from order.routing import websocket_urlpatterns
-from order.ws_middleware import JWTAuthMiddleware
+
+# set up Django (app registry) before anything below imports models
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from order.routing import websocket_urlpatterns  # noqa: E402
+from order.ws_middleware import JWTAuthMiddleware  # noqa: E402
 
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(), # normal HTTP requests
-    "websocket": URLRouter(websocket_urlpatterns),
+    "http": django_asgi_app, # normal HTTP requests
+    "websocket": JWTAuthMiddleware(URLRouter(websocket_urlpatterns)),
 
 })
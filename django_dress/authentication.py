@@ -0,0 +1,102 @@
+"""
+JWT authentication for the REST API without the per-request `User` SELECT.
+
+The few user columns authentication and permission checks read are cached
+per user id: in a small per-process LRU + TTL cache in front of the shared
+Django cache (Redis). The user app evicts both when a user is saved or deleted
+(user/signals.py); other processes drop their local copy within
+AUTH_USER_CACHE_LOCAL_TTL seconds. If the shared cache is unreachable,
+authentication falls back to the database instead of failing the request.
+
+request.user is a real `User` instance with only those columns loaded. Any
+other field is fetched on first access, so views that serialize the whole
+user (ProfileView) load it explicitly.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .usercache import UserCache
+
+logger = logging.getLogger(__name__)
+
+AUTH_FIELDS = ("id", "email", "is_staff", "is_superuser", "is_banned", "is_active")
+
+# user id -> {field: value} for AUTH_FIELDS, or None for ids with no user
+users = UserCache(maxsize=settings.AUTH_USER_CACHE_SIZE, ttl=settings.AUTH_USER_CACHE_LOCAL_TTL)
+
+_MISSING = object()
+
+
+def _key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def _auth_record(user_model, user_id):
+    record = users.get(user_id)
+    if record is not UserCache.MISSING:
+        return record
+
+    try:
+        record = cache.get(_key(user_id), _MISSING)
+    except Exception:
+        logger.warning("auth cache: read failed for user %s", user_id, exc_info=True)
+        # don't keep a local copy the shared cache can no longer evict
+        return user_model.objects.filter(pk=user_id).values(*AUTH_FIELDS).first()
+
+    if record is _MISSING:
+        record = user_model.objects.filter(pk=user_id).values(*AUTH_FIELDS).first()
+        try:
+            cache.set(_key(user_id), record, settings.AUTH_USER_CACHE_TTL)
+        except Exception:
+            logger.warning("auth cache: write failed for user %s", user_id, exc_info=True)
+    users.set(user_id, record)
+    return record
+
+
+def forget_auth_user(user_id):
+    """Drop a user's cached auth record, here and in the shared cache."""
+    users.pop(user_id)
+    try:
+        cache.delete(_key(user_id))
+    except Exception:
+        logger.exception("auth cache: evicting user %s failed", user_id)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that reads the user from the auth cache. Also rejects
+    banned users, like the websocket middleware does.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN or api_settings.USER_ID_FIELD != "id":
+            # needs the password hash / a different lookup column: not cached
+            user = super().get_user(validated_token)
+        else:
+            try:
+                user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+            except KeyError as e:
+                raise InvalidToken(_("Token contained no recognizable user identification")) from e
+            except (TypeError, ValueError) as e:
+                raise InvalidToken(_("Token contained an invalid user identification")) from e
+
+            record = _auth_record(self.user_model, user_id)
+            if record is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            # a real User with the other columns deferred (from_db wants model field order)
+            names = [f.attname for f in self.user_model._meta.concrete_fields if f.attname in record]
+            user = self.user_model.from_db(DEFAULT_DB_ALIAS, names, [record[name] for name in names])
+
+            if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+                raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if user.is_banned:
+            raise AuthenticationFailed(_("User is banned"), code="user_banned")
+        return user
@@ -0,0 +1,208 @@
+"""
+Channel layer for the notification sockets: channels_redis spread over several
+Redis hosts with a consistent-hash ring, falling back to a bounded in-process
+layer while Redis is unreachable.
+
+Configured from the environment in settings.CHANNEL_LAYERS.
+"""
+import asyncio
+import bisect
+import hashlib
+import logging
+import time
+
+from channels.layers import InMemoryChannelLayer
+from channels_redis.core import RedisChannelLayer
+from redis import exceptions as redis_exceptions
+
+logger = logging.getLogger(__name__)
+
+# errors that mean "Redis is not there", as opposed to a bad command
+UNAVAILABLE = (
+    redis_exceptions.ConnectionError,
+    redis_exceptions.TimeoutError,
+    OSError,
+    asyncio.TimeoutError,
+)
+
+
+def _ring_hash(value):
+    if isinstance(value, str):
+        value = value.encode("utf8")
+    return int.from_bytes(hashlib.md5(value).digest()[:4], "big")
+
+
+class LocalChannelLayer(InMemoryChannelLayer):
+    """
+    InMemoryChannelLayer whose expiry sweep - a walk over every channel and
+    group member - runs at most every `sweep_interval` seconds instead of on
+    every receive / group_send, which is O(sockets) per message with many
+    sockets open. Queues are bounded by `capacity` as usual (group_send drops
+    messages for full channels).
+    """
+
+    def __init__(self, sweep_interval=1.0, **kwargs):
+        super().__init__(**kwargs)
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+
+    def _clean_expired(self):
+        now = time.monotonic()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.sweep_interval
+        super()._clean_expired()
+
+
+class ShardedRedisChannelLayer(RedisChannelLayer):
+    """
+    RedisChannelLayer whose groups (user_<id>) and channels are placed on a
+    hash ring with `vnodes` points per host, keyed by the host address: the
+    order of `hosts` doesn't matter and adding a host moves only ~1/n of the
+    groups (channels_redis' own scheme moves most of them).
+
+    When a Redis call fails to connect, the layer switches to a
+    LocalChannelLayer (queues bounded by `fallback_capacity`) for
+    `retry_after` seconds. That only keeps calls from failing: live pushes
+    effectively stop until Redis recovers. Groups joined before the outage
+    exist only in Redis, and the outbox dispatcher runs in its own process
+    with no sockets, so a degraded group_send reaches nobody. Notifications
+    are stored in the inbox regardless and replayed when clients reconnect.
+    """
+
+    def __init__(self, hosts=None, vnodes=160, fallback_capacity=None, retry_after=5.0, **kwargs):
+        super().__init__(hosts=hosts, **kwargs)
+        ring = sorted(
+            (_ring_hash(f"{self._host_label(host)}#{point}"), index)
+            for index, host in enumerate(self.hosts)
+            for point in range(vnodes)
+        )
+        self._ring_points = [point for point, _ in ring]
+        self._ring_hosts = [index for _, index in ring]
+
+        self.fallback = LocalChannelLayer(
+            expiry=self.expiry,
+            group_expiry=self.group_expiry,
+            capacity=fallback_capacity or self.capacity,
+        )
+        self.retry_after = retry_after
+        self._down_until = 0.0
+        # channel -> pending Redis receive, kept across receive() calls
+        self._remote_receives = {}
+
+    @staticmethod
+    def _host_label(host):
+        return host.get("address") or repr(sorted(host.items()))
+
+    def consistent_hash(self, value):
+        if self.ring_size == 1:
+            return 0
+        index = bisect.bisect(self._ring_points, _ring_hash(value)) % len(self._ring_points)
+        return self._ring_hosts[index]
+
+    # -- fallback -------------------------------------------------------------
+
+    @property
+    def available(self):
+        return time.monotonic() >= self._down_until
+
+    def _mark_down(self, exc):
+        if self.available:
+            logger.warning(
+                "channel layer: Redis unavailable (%s), using the in-memory layer for %ss", exc, self.retry_after,
+            )
+        self._down_until = time.monotonic() + self.retry_after
+
+    async def send(self, channel, message):
+        if self.available:
+            try:
+                return await super().send(channel, message)
+            except UNAVAILABLE as exc:
+                self._mark_down(exc)
+        await self.fallback.send(channel, message)
+
+    async def receive(self, channel):
+        """
+        Wait on the in-memory layer and, while it is up, on Redis; whichever
+        delivers first wins. While Redis is down it is retried every retry_after.
+
+        The Redis receive is never cancelled for losing that race: channels_redis
+        takes a cancelled receive for a consumer going away and drops what it
+        has buffered for the channel. It stays pending for the next call, and is
+        only cancelled when this receive is (the consumer really is going away).
+        """
+        while True:
+            local = asyncio.ensure_future(self.fallback.receive(channel))
+            remote = self._remote_receives.get(channel)
+            if remote is None and self.available:
+                remote = self._remote_receives[channel] = asyncio.ensure_future(super().receive(channel))
+            waiters = [local] if remote is None else [local, remote]
+            try:
+                await asyncio.wait(
+                    waiters,
+                    timeout=None if remote is not None else self.retry_after,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+            except asyncio.CancelledError:
+                local.cancel()
+                if remote is not None:
+                    remote.cancel()
+                    self._remote_receives.pop(channel, None)
+                raise
+
+            messages = []
+            if remote is not None and remote.done():
+                del self._remote_receives[channel]
+                exc = remote.exception()
+                if exc is None:
+                    messages.append(remote.result())
+                elif isinstance(exc, UNAVAILABLE):
+                    self._mark_down(exc)
+                else:
+                    local.cancel()
+                    raise exc
+            if local.done():
+                messages.append(local.result())
+            else:
+                # an in-memory receive is a plain queue get: safe to cancel
+                local.cancel()
+            if messages:
+                # both delivered at once: keep the second for the next receive
+                for message in messages[1:]:
+                    await self.fallback.send(channel, message)
+                return messages[0]
+
+    async def group_add(self, group, channel):
+        if self.available:
+            try:
+                return await super().group_add(group, channel)
+            except UNAVAILABLE as exc:
+                self._mark_down(exc)
+        await self.fallback.group_add(group, channel)
+
+    async def group_discard(self, group, channel):
+        await self.fallback.group_discard(group, channel)
+        if self.available:
+            try:
+                await super().group_discard(group, channel)
+            except UNAVAILABLE as exc:
+                self._mark_down(exc)
+
+    async def group_send(self, group, message):
+        if self.available:
+            try:
+                await super().group_send(group, message)
+            except UNAVAILABLE as exc:
+                self._mark_down(exc)
+        # only reaches sockets of this process that joined during the outage
+        # (they are only in the local group); see the class docstring
+        if not self.available or group in self.fallback.groups:
+            await self.fallback.group_send(group, message)
+
+    async def flush(self):
+        await self.fallback.flush()
+        if self.available:
+            try:
+                await super().flush()
+            except UNAVAILABLE as exc:
+                self._mark_down(exc)
@@ -0,0 +1,46 @@
+import time
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+
+from product.cache import get_catalog_state
+
+
+def _version_key(kind, user_id):
+    return f"{kind}:version:{user_id}"
+
+
+def bump_collection_version(kind, user_id):
+    """Mark a user's cart / wishlist as changed."""
+    key = _version_key(kind, user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), None)
+
+
+def collection_etag(kind, user_id):
+    """
+    ETag of a per-user collection. The catalog version is part of it because
+    the serialized items embed product name / price / image.
+    """
+    key = _version_key(kind, user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    catalog_version, _ = get_catalog_state()
+    return f'"{version}.{catalog_version}"'
+
+
+def not_modified(request, etag):
+    """304 response when the client's If-None-Match still matches, else None."""
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response["ETag"] = etag
+    return response
+
+
+def wants_delta(request):
+    """Mutations return only the changed item with ?response=delta."""
+    return request.query_params.get("response") == "delta"
@@ -0,0 +1,142 @@
+import json
+
+from django.db import connections
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def wants_cursor(request):
+    """
+    Cursor (keyset) pagination is opt-in so existing page-number clients keep working:
+    ?pagination=cursor starts a keyset walk, ?cursor=<token> continues one.
+    """
+    params = request.query_params
+    return params.get("pagination") == "cursor" or "cursor" in params
+
+
+def estimated_count(queryset):
+    """
+    Row estimate from the Postgres planner (EXPLAIN) instead of COUNT(*).
+    Cheap on any table size but approximate; other databases get an exact count.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return queryset.count()
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination on an indexed ordering: each page is a
+    `WHERE (ordering) < (last seen) LIMIT n` range scan, with no OFFSET and no COUNT(*).
+
+    ?count=estimated adds the planner's row estimate, ?count=exact a real count.
+
+    Pages always follow `ordering`. Views without an OrderingFilter get a 400
+    for any other ?ordering=. A request carrying one of `ranked_params` (and
+    no ?ordering=) comes in relevance order, which a keyset would throw away:
+    it gets `?offset=` pages in the same response shape instead.
+    """
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    offset_query_param = "offset"
+    ranked_params = ()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_queryset = queryset
+        self.offset = None
+        params = request.query_params
+        if not params.get("ordering") and any(params.get(name) for name in self.ranked_params):
+            return self._paginate_by_offset(queryset, request)
+        self._check_ordering(request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def _check_ordering(self, request, view):
+        if any(issubclass(backend, OrderingFilter) for backend in getattr(view, "filter_backends", ())):
+            # CursorPagination already pages by the filter's ordering
+            return
+        # a bare string is a single field, as in CursorPagination.get_ordering
+        fields = (self.ordering,) if isinstance(self.ordering, str) else tuple(self.ordering)
+        ordering = request.query_params.get("ordering")
+        if ordering and ordering not in (fields[0], ",".join(fields)):
+            raise ValidationError({
+                "ordering": [f"Cursor pages are ordered by {','.join(fields)}; "
+                             "use page numbers for other orderings."],
+            })
+
+    def _paginate_by_offset(self, queryset, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        try:
+            self.offset = max(0, int(request.query_params.get(self.offset_query_param, 0)))
+        except ValueError:
+            self.offset = 0
+        # one extra row tells whether there is a next page, without a COUNT(*)
+        rows = list(queryset[self.offset:self.offset + self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.has_previous = self.offset > 0
+        return rows[:self.page_size]
+
+    def _offset_link(self, offset):
+        url = remove_query_param(self.base_url, self.cursor_query_param)
+        if offset <= 0:
+            return remove_query_param(url, self.offset_query_param)
+        return replace_query_param(url, self.offset_query_param, offset)
+
+    def get_next_link(self):
+        if self.offset is None:
+            return super().get_next_link()
+        return self._offset_link(self.offset + self.page_size) if self.has_next else None
+
+    def get_previous_link(self):
+        if self.offset is None:
+            return super().get_previous_link()
+        return self._offset_link(self.offset - self.page_size) if self.has_previous else None
+
+    def get_count(self):
+        mode = self.request.query_params.get("count")
+        if mode == "estimated":
+            return estimated_count(self.count_queryset)
+        if mode == "exact":
+            return self.count_queryset.count()
+        return None
+
+    def get_paginated_response(self, data):
+        payload = {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        }
+        count = self.get_count()
+        if count is not None:
+            payload = {"count": count, **payload}
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count"] = {"type": "integer", "example": 123}
+        return response_schema
+
+
+class OptionalKeysetPagination(KeysetPagination):
+    """
+    For views that historically returned the full, unpaginated list:
+    only paginates when the client asks for cursor mode.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not wants_cursor(request):
+            return None
+        return super().paginate_queryset(queryset, request, view)
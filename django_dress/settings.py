@@ -47,6 +47,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 
     "corsheaders",
 
@@ -132,7 +133,8 @@ AUTH_USER_MODEL = "user.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # JWTAuthentication with the user read from a cache (django_dress/authentication.py)
+        "django_dress.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
@@ -211,6 +213,25 @@ SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 
 RAZORPAY_KEY_ID = "rzp_test_RnrQ2LvFdfgWaI"
 RAZORPAY_KEY_SECRET = "QWayXrI4StKOIpzt866rMpKU"
+# signs POSTs to /api/v1/order/webhooks/razorpay/ (set in the Razorpay dashboard)
+RAZORPAY_WEBHOOK_SECRET = os.environ.get("RAZORPAY_WEBHOOK_SECRET", "")
+
+# "order.gateways.RazorpayGateway", or "order.gateways.FakeGateway" to run checkout offline
+PAYMENT_GATEWAY = os.environ.get("PAYMENT_GATEWAY", "order.gateways.RazorpayGateway")
+# pooled async HTTP client used by the async checkout views (seconds / counts)
+PAYMENT_GATEWAY_HTTP = {
+    "timeout": float(os.environ.get("PAYMENT_GATEWAY_TIMEOUT", 10)),
+    "connect_timeout": float(os.environ.get("PAYMENT_GATEWAY_CONNECT_TIMEOUT", 3)),
+    "retries": int(os.environ.get("PAYMENT_GATEWAY_RETRIES", 2)),
+    "backoff": float(os.environ.get("PAYMENT_GATEWAY_BACKOFF", 0.2)),
+    "max_connections": int(os.environ.get("PAYMENT_GATEWAY_MAX_CONNECTIONS", 100)),
+    "max_keepalive_connections": int(os.environ.get("PAYMENT_GATEWAY_MAX_KEEPALIVE", 20)),
+}
+# latency / failures simulated by FakeGateway.create_order
+PAYMENT_GATEWAY_FAKE = {
+    "latency_ms": float(os.environ.get("FAKE_GATEWAY_LATENCY_MS", 0)),
+    "failure_rate": float(os.environ.get("FAKE_GATEWAY_FAILURE_RATE", 0)),
+}
 
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_HOST = "smtp.gmail.com"
@@ -223,15 +244,76 @@ DEFAULT_FROM_EMAIL = "Dress_hub <no-reply@yourdomain.com>"
 
 ASGI_APPLICATION = "django_dress.asgi.application"
 
-# Define the channel layers to use Redis as the backend
+# Define the channel layers to use Redis as the backend.
+# CHANNEL_REDIS_HOSTS: comma-separated redis:// URLs; user groups are spread over
+# them by consistent hashing. While Redis is unreachable each process falls back
+# to an in-memory layer (queues capped at CHANNEL_LAYER_CAPACITY messages) and
+# retries Redis every CHANNEL_LAYER_RETRY_AFTER seconds (django_dress/channel_layers.py).
+CHANNEL_REDIS_HOSTS = [
+    host.strip()
+    for host in os.environ.get("CHANNEL_REDIS_HOSTS", "redis://127.0.0.1:6379").split(",")
+    if host.strip()
+]
 CHANNEL_LAYERS = {
     "default": {
-        "BACKEND": "channels_redis.core.RedisChannelLayer",
+        "BACKEND": "django_dress.channel_layers.ShardedRedisChannelLayer",
         "CONFIG": {
-            "hosts": [("127.0.0.1", 6379)],
+            "hosts": CHANNEL_REDIS_HOSTS,
+            "capacity": int(os.environ.get("CHANNEL_LAYER_CAPACITY", 100)),
+            "retry_after": float(os.environ.get("CHANNEL_LAYER_RETRY_AFTER", 5)),
         },
     },
 }
+
+# per-process cache of socket users (see order/ws_middleware.py); bans and deletes
+# evict immediately in the process that made them, elsewhere after the TTL (seconds)
+WS_AUTH_CACHE_SIZE = int(os.environ.get("WS_AUTH_CACHE_SIZE", 50000))
+WS_AUTH_CACHE_TTL = int(os.environ.get("WS_AUTH_CACHE_TTL", 60))
+
+# REST auth user cache (see django_dress/authentication.py): entries per process,
+# seconds a process trusts its local copy (how long a ban takes to reach other
+# workers) and seconds an entry lives in the shared cache
+AUTH_USER_CACHE_SIZE = int(os.environ.get("AUTH_USER_CACHE_SIZE", 50000))
+AUTH_USER_CACHE_LOCAL_TTL = int(os.environ.get("AUTH_USER_CACHE_LOCAL_TTL", 10))
+AUTH_USER_CACHE_TTL = int(os.environ.get("AUTH_USER_CACHE_TTL", 300))
+
+# seconds a user's open-socket count lives in the cache without a connect or a
+# refresh (open sockets refresh it every TTL / 4, see order/presence.py); only
+# bounds how long a crashed worker's sockets count
+WS_PRESENCE_TTL = int(os.environ.get("WS_PRESENCE_TTL", 24 * 60 * 60))
+
+# most unread notifications replayed to a socket on connect
+NOTIFICATION_REPLAY_LIMIT = int(os.environ.get("NOTIFICATION_REPLAY_LIMIT", 100))
+
+# order/events/ (server-sent events): seconds between heartbeats on an idle
+# stream (below proxy idle timeouts) and the reconnect delay sent to clients
+SSE_HEARTBEAT_INTERVAL = float(os.environ.get("SSE_HEARTBEAT_INTERVAL", 15))
+SSE_RETRY_MS = int(os.environ.get("SSE_RETRY_MS", 3000))
+
+# --------------------------------------------------
+# CACHE
+# --------------------------------------------------
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ.get("REDIS_CACHE_URL", "redis://127.0.0.1:6379/1"),
+    },
+}
+
+# seconds a cached public catalog response lives; writes invalidate it earlier
+CATALOG_CACHE_TIMEOUT = int(os.environ.get("CATALOG_CACHE_TIMEOUT", 300))
+
+# cart storage: "cart.store.DatabaseCartStore" (a row write per change) or
+# "cart.store.RedisCartStore" (hot carts in Redis, written back by `manage.py flush_carts`)
+CART_STORE = os.environ.get("CART_STORE", "cart.store.DatabaseCartStore")
+CART_REDIS_URL = os.environ.get("CART_REDIS_URL", "redis://127.0.0.1:6379/2")
+# seconds a checkout quote (signed id + cached pricing) stays valid
+ORDER_QUOTE_TTL = int(os.environ.get("ORDER_QUOTE_TTL", 900))
+
+# idle carts drop out of Redis after this many seconds (they are long flushed by then)
+CART_STORE_TTL = int(os.environ.get("CART_STORE_TTL", 3 * 24 * 3600))
+
 #s3 
 
 AWS_ACCESS_KEY_ID = os.environ.get("AWS_ACCESS_KEY_ID")
@@ -0,0 +1,39 @@
+class TrackedFieldsMixin:
+    """
+    Remembers the database value of `tracked_fields` when a row is loaded
+    (from_db) or saved, so change detection needs no extra SELECT.
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # deferred fields are missing from __dict__ and are simply not tracked
+        instance._loaded_values = {
+            name: instance.__dict__[name] for name in cls.tracked_fields if name in instance.__dict__
+        }
+        return instance
+
+    def is_tracking(self, name):
+        return name in getattr(self, "_loaded_values", {})
+
+    def get_loaded_value(self, name, default=None):
+        return getattr(self, "_loaded_values", {}).get(name, default)
+
+    def has_changed(self, name):
+        return self.is_tracking(name) and self._loaded_values[name] != getattr(self, name)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # post_save handlers have seen the old values; the row now holds the new ones
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            names = self.tracked_fields
+        else:
+            # update_fields holds field names ("product"), tracked_fields may hold attnames ("product_id")
+            update_fields = set(update_fields)
+            names = [n for n in self.tracked_fields if self._meta.get_field(n).name in update_fields or n in update_fields]
+        if not hasattr(self, "_loaded_values"):
+            self._loaded_values = {}
+        for name in names:
+            self._loaded_values[name] = getattr(self, name)
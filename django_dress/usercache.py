@@ -0,0 +1,65 @@
+"""
+Per-process user caches for authentication hot paths (WebSocket connects),
+so a burst of connects doesn't turn into a burst of `User` queries.
+
+Entries are keyed by user id and evicted least-recently-used past `maxsize`
+or after `ttl` seconds. `forget_user` drops an id from every cache; the user
+app calls it when a user is saved (ban, deactivation) or deleted. That only
+reaches this process: other workers see the change within their TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+_caches = []
+
+
+class UserCache:
+    """Thread-safe LRU + TTL mapping of user id -> value (None is a valid, cached value)."""
+
+    MISSING = object()
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+        _caches.append(self)
+
+    def get(self, user_id):
+        """-> cached value or UserCache.MISSING"""
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[user_id]
+                self.misses += 1
+                return self.MISSING
+            self._data.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, user_id, value):
+        with self._lock:
+            self._data[user_id] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, user_id):
+        with self._lock:
+            self._data.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+def forget_user(user_id):
+    for cache in _caches:
+        cache.pop(user_id)
@@ -0,0 +1,232 @@
+# order/async_views.py
+"""
+Async variants of the razorpay checkout endpoints. Under Daphne they await the
+gateway instead of parking a worker thread on the HTTPS round trip; database
+work still goes through sync_to_async / the async ORM. Under WSGI they hand
+the request to the sync view.
+
+Same request / response contract as the sync views in views.py.
+
+Also the server-sent events stream of order notifications (order_events).
+"""
+import asyncio
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from django_dress.middleware.jwt_cookie_middleware import JWTAuthCookieMiddleware
+from .consumers import _missed_events, keep_presence
+from .gateways import GatewayError, InvalidSignature, get_payment_gateway
+from .models import PaymentIntent
+from .outbox import user_group
+from .presence import socket_closed, socket_opened
+from .quotes import QuoteError
+from .services import PaymentConflictError, StockReservationError, complete_payment_intent
+from .views import (
+    _amount_mismatch,
+    _checkout_quote,
+    _create_payload,
+    _intent_fields,
+    _legacy_intent,
+    _saved_intent,
+    _verify_payload,
+    razorpay_create_order,
+    razorpay_verify,
+)
+from .ws_middleware import user_from_token
+
+
+def _resolve(drf_request):
+    return drf_request.user, drf_request.data
+
+
+def async_api_view(wsgi_view):
+    """
+    POST-only, authenticated async view using DRF's configured authentication
+    classes and JSON parsing (DRF views themselves can't be async).
+    The view is called as view(request, user, data).
+
+    Under WSGI every request runs on an event loop of its own, so nothing
+    async could be pooled: those requests are served by wsgi_view, the sync
+    equivalent, instead.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if not isinstance(request, ASGIRequest):
+                return await sync_to_async(wsgi_view)(request, *args, **kwargs)
+            if request.method != "POST":
+                return JsonResponse({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+
+            drf_request = Request(
+                request,
+                parsers=[JSONParser()],
+                authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+            )
+            try:
+                user, data = await sync_to_async(_resolve)(drf_request)
+            except APIException as exc:
+                return JsonResponse({"detail": exc.detail}, status=exc.status_code)
+            if not user or not user.is_authenticated:
+                return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+            return await view(request, user, data, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@async_api_view(razorpay_create_order)
+async def razorpay_create_order_async(request, user, data):
+    """POST /api/v1/order/checkout/razorpay/async/create/ (see razorpay_create_order)"""
+    try:
+        quote, quote_id, orders_payload = await sync_to_async(_checkout_quote)(user.id, data)
+    except QuoteError as e:
+        return JsonResponse({"error": str(e)}, status=e.status_code)
+
+    gateway = get_payment_gateway()
+    try:
+        razorpay_order_id = await gateway.acreate_order(quote["amount_paise"], quote["currency"])
+    except GatewayError as e:
+        return JsonResponse({"error": "payment_gateway_error", "detail": str(e)}, status=502)
+
+    await PaymentIntent.objects.acreate(**_intent_fields(user.id, razorpay_order_id, quote))
+
+    return JsonResponse(_create_payload(gateway, razorpay_order_id, quote, quote_id, orders_payload), status=201)
+
+
+@async_api_view(razorpay_verify)
+async def razorpay_verify_async(request, user, data):
+    """POST /api/v1/order/checkout/razorpay/async/verify/ (see razorpay_verify)"""
+    payment_id = data.get("razorpay_payment_id")
+    order_id = data.get("razorpay_order_id")
+    signature = data.get("razorpay_signature")
+
+    if not all([payment_id, order_id, signature]):
+        return JsonResponse({"error": "missing fields"}, status=400)
+
+    intent = await PaymentIntent.objects.filter(razorpay_order_id=order_id, user=user).afirst()
+    if intent is None:
+        try:
+            intent = await sync_to_async(_legacy_intent)(user.id, order_id, data)
+        except QuoteError as e:
+            return JsonResponse({"error": str(e)}, status=e.status_code)
+    if intent is None:
+        return JsonResponse({"error": "unknown razorpay order"}, status=404)
+
+    mismatch = _amount_mismatch(intent, data.get("amount", None))
+    if mismatch:
+        return JsonResponse(mismatch, status=400)
+
+    # local HMAC, no network round trip
+    try:
+        get_payment_gateway().verify_signature(order_id, payment_id, signature)
+    except InvalidSignature:
+        return JsonResponse({"error": "signature verification failed"}, status=400)
+
+    try:
+        intent = await sync_to_async(_saved_intent)(intent)
+        order, created = await sync_to_async(complete_payment_intent)(intent, payment_id)
+    except StockReservationError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except PaymentConflictError as e:
+        return JsonResponse({"error": "already_paid", "detail": str(e)}, status=409)
+
+    return JsonResponse(_verify_payload(order, created), status=200)
+
+
+def _sse(event, replayed=False):
+    data = {**event, "replayed": True} if replayed else event
+    return f"id: {event['cursor']}\nevent: notification\ndata: {json.dumps(data)}\n\n"
+
+
+async def _event_stream(user_id, last_event_id):
+    layer = get_channel_layer()
+    channel = await layer.new_channel()
+    group = user_group(user_id)
+    # join before reading the inbox, as the socket consumer does
+    await layer.group_add(group, channel)
+    await socket_opened(user_id)
+    presence = asyncio.ensure_future(keep_presence(user_id))
+    receive = None
+    try:
+        yield f"retry: {settings.SSE_RETRY_MS}\n\n"
+        if last_event_id is not None:
+            for event in await _missed_events(user_id, last_event_id):
+                yield _sse(event, replayed=True)
+        while True:
+            # one receive outlives the heartbeats: cancelling it (wait_for) would
+            # tell channels_redis the consumer left, and it drops buffered messages
+            if receive is None:
+                receive = asyncio.ensure_future(layer.receive(channel))
+            done, _ = await asyncio.wait([receive], timeout=settings.SSE_HEARTBEAT_INTERVAL)
+            if not done:
+                # comment line: keeps proxies from closing an idle connection
+                yield ": heartbeat\n\n"
+                continue
+            message, receive = receive.result(), None
+            if message.get("type") == "send_notification":
+                yield _sse(message["data"])
+    finally:
+        # client went away (Django cancels the stream) or the server is stopping
+        if receive is not None:
+            receive.cancel()
+        presence.cancel()
+        await layer.group_discard(group, channel)
+        await socket_closed(user_id)
+
+
+def _access_token(request):
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if token and scheme in settings.SIMPLE_JWT.get("AUTH_HEADER_TYPES", ("Bearer",)):
+        return token
+    # EventSource can't set headers: the login cookie, read here rather than
+    # relying on JWTAuthCookieMiddleware having copied it into the header
+    for name in JWTAuthCookieMiddleware.COOKIE_NAMES:
+        if request.COOKIES.get(name):
+            return request.COOKIES[name]
+    return None
+
+
+async def order_events(request):
+    """
+    GET /api/v1/order/events/   (Accept: text/event-stream)
+
+    One-way alternative to ws/order/notifications/: the same user_<id> group
+    and event payloads, as server-sent events with the notification cursor as
+    the event id. EventSource reconnects with Last-Event-ID and gets the unread
+    notifications it missed first (`?since=<cursor>` does the same for the
+    first request; empty replays all unread). A comment line is sent every
+    SSE_HEARTBEAT_INTERVAL seconds while idle.
+    Authenticated by the access JWT (Authorization header or cookie).
+
+    Streams only under the ASGI server (Daphne): route /api/v1/order/events/
+    there like ws/. Under WSGI the response would never be flushed, so it
+    answers 501 instead.
+    """
+    if request.method != "GET":
+        return JsonResponse({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"detail": "The event stream is served by the ASGI server."}, status=501)
+
+    token = _access_token(request)
+    user = await user_from_token(token) if token else None
+    if user is None or not user.is_authenticated:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+    last_event_id = request.headers.get("Last-Event-ID", request.GET.get("since"))
+    response = StreamingHttpResponse(_event_stream(user.id, last_event_id), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx: don't buffer the stream
+    return response
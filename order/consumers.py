@@ -1,6 +1,43 @@
+import asyncio
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 
+from .outbox import mark_read, socket_event, unread_since, user_group
+from .presence import refresh_interval, socket_alive, socket_closed, socket_opened
+
+
+@database_sync_to_async
+def _missed_events(user_id, cursor):
+    return [socket_event(n) for n in unread_since(user_id, cursor)]
+
+
+async def keep_presence(user_id):
+    """Run while a socket / stream is open: keeps its presence count from expiring."""
+    while True:
+        await asyncio.sleep(refresh_interval())
+        await socket_alive(user_id)
+
+
 class OrderNotificationConsumer(AsyncJsonWebsocketConsumer): # Consumer to send order notifications to users(WebSocket endpoint)
+    """
+    ws/order/notifications/?since=<cursor>
+
+    Every event carries "id" and "cursor". A client reconnecting with the last
+    cursor it saw first gets the unread notifications it missed (oldest first,
+    at most NOTIFICATION_REPLAY_LIMIT, marked "replayed"), then live ones.
+    `?since=` with an empty value replays all unread; no `since`, no replay.
+    With more unread than the limit, the newest ones are replayed.
+    An event sent while the replay is read can arrive twice: dedupe on "id".
+
+    {"type": "read", "cursor": "<cursor>"} from the client marks everything up
+    to that cursor read (no cursor: all), so it isn't replayed again; same as
+    POST order/notifications/read/.
+    """
+    group_name = None
+    presence_task = None
+
     async def connect(self):# On WebSocket connection
         user = self.scope["user"] # Get the authenticated user from scope
 
@@ -8,9 +45,32 @@ class OrderNotificationConsumer(AsyncJsonWebsocketConsumer): # Consumer to send
             await self.close()
             return
         # every websocket connection is added to a group based on user id
-        self.group_name = f"user_{user.id}" # Define group name based on user ID
-        await self.channel_layer.group_add(self.group_name, self.channel_name) 
+        self.group_name = user_group(user.id)
+        # join before reading the inbox, so nothing falls between replay and live
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await socket_opened(user.id)
+        self.presence_task = asyncio.ensure_future(keep_presence(user.id))
         await self.accept()
 
+        params = parse_qs(self.scope.get("query_string", b"").decode(), keep_blank_values=True)
+        if "since" in params:
+            for event in await _missed_events(user.id, params["since"][-1]):
+                await self.send_json({**event, "replayed": True})
+
+    async def disconnect(self, code):
+        if self.presence_task:
+            self.presence_task.cancel()
+        if self.group_name:
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+            await socket_closed(self.scope["user"].id)
+
+    async def receive_json(self, content, **kwargs):
+        if isinstance(content, dict) and content.get("type") == "read":
+            cursor = content.get("cursor")
+            marked = await database_sync_to_async(mark_read)(
+                self.scope["user"].id, cursor if isinstance(cursor, str) else None,
+            )
+            await self.send_json({"type": "read", "marked": marked})
+
     async def send_notification(self, event):# Handler to send notification to WebSocket
         await self.send_json(event["data"])# Send JSON data to WebSocket client
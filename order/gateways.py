@@ -0,0 +1,226 @@
+# order/gateways.py
+"""
+Payment gateway behind the checkout views. settings.PAYMENT_GATEWAY picks the
+implementation; FakeGateway runs in-process so checkout can be load-tested
+offline (see `manage.py loadtest_checkout`).
+
+Every gateway has blocking methods for the sync views and `a`-prefixed
+coroutines for the async ones (order/async_views.py).
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import random
+import time
+import uuid
+from functools import lru_cache
+
+import httpx
+import razorpay
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class GatewayError(Exception):
+    """The gateway could not be reached or refused the request."""
+
+
+class InvalidSignature(Exception):
+    """Payment signature doesn't match the order / payment ids."""
+
+
+def payment_signature(secret, order_id, payment_id):
+    """HMAC-SHA256 of "order_id|payment_id", as Razorpay signs checkout payments."""
+    message = f"{order_id}|{payment_id}".encode()
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def webhook_signature(secret, body):
+    """HMAC-SHA256 of the raw webhook body, as sent in X-Razorpay-Signature."""
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def _check_webhook_signature(secret, body, signature):
+    if not secret:
+        raise InvalidSignature("webhook secret is not configured")
+    if not hmac.compare_digest(webhook_signature(secret, body), signature or ""):
+        raise InvalidSignature("webhook signature mismatch")
+
+
+class RazorpayGateway:
+    orders_url = "https://api.razorpay.com/v1/orders"
+
+    def __init__(self, key_id=None, key_secret=None, transport=None):
+        self.key_id = key_id or settings.RAZORPAY_KEY_ID
+        self.key_secret = key_secret or settings.RAZORPAY_KEY_SECRET
+        self.client = razorpay.Client(auth=(self.key_id, self.key_secret))
+
+        options = settings.PAYMENT_GATEWAY_HTTP
+        self.timeout = httpx.Timeout(options["timeout"], connect=options["connect_timeout"])
+        self.limits = httpx.Limits(
+            max_connections=options["max_connections"],
+            max_keepalive_connections=options["max_keepalive_connections"],
+        )
+        self.retries = options["retries"]
+        self.backoff = options["backoff"]
+        self.transport = transport
+        self._async_client = None
+        self._async_client_loop = None
+
+    def create_order(self, amount_paise, currency="INR"):
+        """-> gateway order id"""
+        try:
+            order = self.client.order.create({
+                "amount": amount_paise,
+                "currency": currency,
+                "payment_capture": 1
+            })
+        except Exception as exc:
+            raise GatewayError(str(exc)) from exc
+        return order["id"]
+
+    def order_amount(self, order_id):
+        """-> amount (paise) the gateway order was created for"""
+        try:
+            return self.client.order.fetch(order_id)["amount"]
+        except Exception as exc:
+            raise GatewayError(str(exc)) from exc
+
+    async def _get_async_client(self):
+        """
+        One pooled AsyncClient per event loop (Daphne runs a single loop, so in
+        production this is one keep-alive pool shared by every request). A
+        client left over from a previous loop is closed, not leaked.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is not None and self._async_client_loop is not loop:
+            stale, self._async_client = self._async_client, None
+            try:
+                await stale.aclose()
+            except Exception:
+                # its connections belong to a loop that may be gone already
+                logger.debug("closing the previous razorpay client failed", exc_info=True)
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                auth=(self.key_id, self.key_secret),
+                timeout=self.timeout,
+                limits=self.limits,
+                transport=self.transport,
+            )
+            self._async_client_loop = loop
+        return self._async_client
+
+    async def acreate_order(self, amount_paise, currency="INR"):
+        """
+        Non-blocking create_order. Connection errors, timeouts, 429 and 5xx are
+        retried with exponential backoff; an order created by an attempt whose
+        response got lost simply expires unpaid on Razorpay's side.
+        """
+        client = await self._get_async_client()
+        payload = {"amount": amount_paise, "currency": currency, "payment_capture": 1}
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                response = await client.post(self.orders_url, json=payload)
+            except httpx.TransportError as exc:
+                error = exc
+                continue
+            if response.status_code == 429 or response.status_code >= 500:
+                error = f"razorpay returned {response.status_code}"
+                continue
+            if response.is_error:
+                raise GatewayError(f"razorpay returned {response.status_code}: {response.text}")
+            return response.json()["id"]
+        raise GatewayError(f"razorpay unreachable after {self.retries + 1} attempts: {error}")
+
+    def verify_signature(self, order_id, payment_id, signature):
+        try:
+            self.client.utility.verify_payment_signature({
+                "razorpay_order_id": order_id,
+                "razorpay_payment_id": payment_id,
+                "razorpay_signature": signature,
+            })
+        except razorpay.errors.SignatureVerificationError as exc:
+            raise InvalidSignature(str(exc)) from exc
+
+    def verify_webhook_signature(self, body, signature):
+        _check_webhook_signature(settings.RAZORPAY_WEBHOOK_SECRET, body, signature)
+
+
+class FakeGateway:
+    """
+    In-process stand-in for Razorpay: hands out order ids, signs payments with
+    the same HMAC scheme and can add latency / random failures to create_order.
+    Configure with settings.PAYMENT_GATEWAY_FAKE = {"latency_ms": .., "failure_rate": ..}.
+    """
+
+    def __init__(self, key_id="rzp_fake", key_secret="fake_secret", latency_ms=None, failure_rate=None):
+        options = getattr(settings, "PAYMENT_GATEWAY_FAKE", {})
+        self.key_id = key_id
+        self.key_secret = key_secret
+        self.latency_ms = options.get("latency_ms", 0) if latency_ms is None else latency_ms
+        self.failure_rate = options.get("failure_rate", 0.0) if failure_rate is None else failure_rate
+        self.orders = {}  # order id -> amount (paise)
+
+    def _maybe_fail(self):
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise GatewayError("simulated gateway failure")
+
+    def _new_order(self, amount_paise):
+        order_id = f"order_{uuid.uuid4().hex[:14]}"
+        self.orders[order_id] = amount_paise
+        return order_id
+
+    def create_order(self, amount_paise, currency="INR"):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        self._maybe_fail()
+        return self._new_order(amount_paise)
+
+    async def acreate_order(self, amount_paise, currency="INR"):
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        self._maybe_fail()
+        return self._new_order(amount_paise)
+
+    def order_amount(self, order_id):
+        try:
+            return self.orders[order_id]
+        except KeyError:
+            raise GatewayError(f"unknown order {order_id}") from None
+
+    def pay(self, order_id):
+        """What the checkout widget would do: -> (payment_id, signature)."""
+        payment_id = f"pay_{uuid.uuid4().hex[:14]}"
+        return payment_id, payment_signature(self.key_secret, order_id, payment_id)
+
+    def verify_signature(self, order_id, payment_id, signature):
+        expected = payment_signature(self.key_secret, order_id, payment_id)
+        if not hmac.compare_digest(expected, signature or ""):
+            raise InvalidSignature("signature mismatch")
+
+    def verify_webhook_signature(self, body, signature):
+        _check_webhook_signature(self.key_secret, body, signature)
+
+
+@lru_cache(maxsize=None)
+def _load_gateway(path):
+    return import_string(path)()
+
+
+def get_payment_gateway():
+    return _load_gateway(settings.PAYMENT_GATEWAY)
+
+
+@receiver(setting_changed)
+def reset_payment_gateway(setting, **kwargs):
+    # override_settings in tests / the load-test command
+    if setting.startswith("PAYMENT_GATEWAY"):
+        _load_gateway.cache_clear()
@@ -0,0 +1,100 @@
+# order/management/commands/bench_channel_layer.py
+import asyncio
+import statistics
+import time
+
+from channels.layers import get_channel_layer
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from order.management.stats import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive group_send at fixed target rates against the configured channel layer "
+        "(one listening channel per group, like one socket per user) and report the "
+        "achieved send rate, delivered share and delivery lag. Only touches its own "
+        "bench_user_<n> groups; nothing is flushed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rates", type=int, nargs="+", default=[1000, 10000, 100000], help="target msgs/s")
+        parser.add_argument("--duration", type=float, default=5.0, help="seconds per rate")
+        parser.add_argument("--groups", type=int, default=1000)
+        parser.add_argument("--tick", type=float, default=0.01, help="seconds between send batches")
+        parser.add_argument(
+            "--in-memory-layer", action="store_true",
+            help="use the in-process LocalChannelLayer instead of the configured one (no Redis needed)",
+        )
+
+    def handle(self, *args, **options):
+        overrides = {}
+        if options["in_memory_layer"]:
+            overrides["CHANNEL_LAYERS"] = {"default": {"BACKEND": "django_dress.channel_layers.LocalChannelLayer"}}
+        with override_settings(**overrides):
+            asyncio.run(self._run(options))
+
+    async def _run(self, options):
+        layer = get_channel_layer()
+        self.stdout.write(f"layer: {layer}, {options['groups']} groups")
+        groups = [f"bench_user_{i}" for i in range(options["groups"])]
+        channels = [await layer.new_channel() for _ in groups]
+        for group, channel in zip(groups, channels):
+            await layer.group_add(group, channel)
+
+        try:
+            for rate in options["rates"]:
+                await self._run_rate(layer, groups, channels, rate, options)
+        finally:
+            for group, channel in zip(groups, channels):
+                await layer.group_discard(group, channel)
+
+    async def _run_rate(self, layer, groups, channels, rate, options):
+        lags = []
+
+        async def listen(channel):
+            while True:
+                message = await layer.receive(channel)
+                lags.append(time.time() - message["sent"])
+
+        listeners = [asyncio.ensure_future(listen(channel)) for channel in channels]
+        sent = 0
+        start = time.perf_counter()
+        try:
+            while (elapsed := time.perf_counter() - start) < options["duration"]:
+                # catch up to the target, at most one tick's worth per batch;
+                # when the layer can't keep up this just sends flat out
+                due = min(int(rate * elapsed) - sent, max(1, int(rate * options["tick"])))
+                if due <= 0:
+                    await asyncio.sleep(options["tick"])
+                    continue
+                now = time.time()
+                await asyncio.gather(*(
+                    layer.group_send(
+                        groups[(sent + i) % len(groups)],
+                        {"type": "send_notification", "data": {"n": sent + i}, "sent": now},
+                    )
+                    for i in range(due)
+                ))
+                sent += due
+            send_elapsed = time.perf_counter() - start
+
+            # let in-flight messages land
+            deadline = time.perf_counter() + 2
+            while len(lags) < sent and time.perf_counter() < deadline:
+                await asyncio.sleep(0.05)
+        finally:
+            for listener in listeners:
+                listener.cancel()
+            await asyncio.gather(*listeners, return_exceptions=True)
+
+        samples = [lag * 1000 for lag in lags]
+        achieved = sent / send_elapsed
+        verdict = self.style.SUCCESS("ok") if achieved >= rate * 0.95 else self.style.WARNING("below target")
+        self.stdout.write(
+            f"target {rate:>7}/s: sent {achieved:9.0f}/s {verdict}, "
+            f"delivered {len(lags)}/{sent} ({len(lags) / max(sent, 1):.1%}), "
+            f"lag p50 {percentile(samples, 50):7.1f}ms p99 {percentile(samples, 99):7.1f}ms "
+            f"mean {statistics.mean(samples) if samples else 0.0:7.1f}ms"
+        )
@@ -0,0 +1,125 @@
+# order/management/commands/bench_websockets.py
+import asyncio
+import gc
+import os
+import resource
+import statistics
+import time
+import uuid
+
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from order import ws_middleware
+from order.management.stats import percentile
+from user.models import User
+
+NOTIFICATIONS_PATH = "/ws/order/notifications/"
+
+
+def _rss_bytes():
+    """Current resident set size (Linux); peak RSS elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Open many concurrent sockets to OrderNotificationConsumer in-process (through "
+        "the real ASGI stack: JWT cookie auth, URL router, channel layer group_add) and "
+        "report connect latency, memory per connection and auth cache hits. "
+        "Writes synthetic users to the database and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sockets", type=int, default=10000)
+        parser.add_argument("--users", type=int, default=2000, help="sockets are spread over this many users")
+        parser.add_argument("--concurrency", type=int, default=1000, help="connects in flight at once")
+        parser.add_argument("--connect-timeout", type=float, default=60.0, help="seconds before a connect counts as failed")
+        parser.add_argument(
+            "--in-memory-layer", action="store_true",
+            help="use the in-process LocalChannelLayer instead of the configured one (no Redis needed)",
+        )
+
+    def handle(self, *args, **options):
+        overrides = {}
+        if options["in_memory_layer"]:
+            overrides["CHANNEL_LAYERS"] = {"default": {"BACKEND": "django_dress.channel_layers.LocalChannelLayer"}}
+        with override_settings(**overrides):
+            tag = uuid.uuid4().hex[:8]
+            users = self._seed(tag, options["users"])
+            try:
+                # a cold cache: the first socket of every user loads it
+                ws_middleware.users.clear()
+                asyncio.run(self._run(users, options))
+            finally:
+                User.objects.filter(pk__in=[u.pk for u in users]).delete()
+
+    def _seed(self, tag, count):
+        return User.objects.bulk_create([
+            User(email=f"wsbench-{tag}-{i}@example.com", name="WS bench", phone_number=f"8{tag[:3]}{i:06d}"[:15])
+            for i in range(count)
+        ])
+
+    async def _run(self, users, options):
+        from django_dress.asgi import application
+
+        cookies = [f"access={AccessToken.for_user(u)}".encode() for u in users]
+        semaphore = asyncio.Semaphore(options["concurrency"])
+        latencies, failures = [], 0
+
+        async def connect(i):
+            nonlocal failures
+            communicator = WebsocketCommunicator(
+                application, NOTIFICATIONS_PATH, headers=[(b"cookie", cookies[i % len(cookies)])],
+            )
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    connected, _ = await communicator.connect(timeout=options["connect_timeout"])
+                except asyncio.TimeoutError:
+                    connected = False
+                latencies.append(time.perf_counter() - start)
+            if not connected:
+                failures += 1
+                return None
+            return communicator
+
+        gc.collect()
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+        communicators = await asyncio.gather(*(connect(i) for i in range(options["sockets"])))
+        elapsed = time.perf_counter() - start
+        gc.collect()
+        rss_after = _rss_bytes()
+
+        self._report(latencies, failures, elapsed, rss_after - rss_before, options)
+
+        async def disconnect(communicator):
+            async with semaphore:
+                await communicator.disconnect(timeout=30)
+
+        await asyncio.gather(*(disconnect(c) for c in communicators if c is not None))
+
+    def _report(self, latencies, failures, elapsed, rss_delta, options):
+        sockets = options["sockets"]
+        samples = [t * 1000 for t in latencies]
+        cache = ws_middleware.users
+        self.stdout.write(
+            f"{sockets} sockets over {options['users']} users, {options['concurrency']} connects in flight"
+        )
+        self.stdout.write(f"connected: {sockets - failures}, refused or timed out: {failures}, in {elapsed:.2f}s "
+                          f"({sockets / elapsed:.0f} connects/s)")
+        self.stdout.write(
+            f"connect: p50 {percentile(samples, 50):7.1f}ms  p99 {percentile(samples, 99):7.1f}ms  "
+            f"mean {statistics.mean(samples):7.1f}ms"
+        )
+        self.stdout.write(f"memory: {rss_delta / 2 ** 20:.1f} MiB RSS, {rss_delta / sockets / 1024:.1f} KiB per connection")
+        self.stdout.write(f"auth cache: {cache.hits} hits, {cache.misses} misses")
+        status = self.style.SUCCESS("ok") if not failures else self.style.ERROR("FAILED")
+        self.stdout.write(f"all sockets accepted: {status}")
@@ -0,0 +1,33 @@
+# order/management/commands/dispatch_notifications.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from order.outbox import drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Send queued order notifications (NotificationOutbox) over the channel layer in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--interval", type=float, default=0.5, help="seconds to sleep when the outbox is empty")
+        parser.add_argument("--once", action="store_true", help="drain what is queued now and exit")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        while True:
+            try:
+                sent = drain_outbox(batch_size)
+            except Exception as exc:
+                # db hiccup: the batch stays queued, try again shortly
+                self.stderr.write(f"dispatch failed: {exc}")
+                sent = 0
+                if options["once"]:
+                    raise
+            if sent:
+                self.stdout.write(f"sent {sent} notification(s)")
+            if sent < batch_size:
+                if options["once"]:
+                    return
+                time.sleep(options["interval"])
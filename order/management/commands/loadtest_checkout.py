@@ -0,0 +1,168 @@
+# order/management/commands/loadtest_checkout.py
+import asyncio
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from order.gateways import get_payment_gateway
+from order.management.stats import percentile
+from order.models import Order, PaymentIntent
+from product.models import Category, Product, ProductSize, Size
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive razorpay create -> pay -> verify (stock decrement included) against the "
+        "in-process FakeGateway at a given concurrency and report latency percentiles. "
+        "Writes synthetic users/products to the database and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--checkouts", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--products", type=int, default=20, help="hot SKUs the checkouts compete for")
+        parser.add_argument("--stock", type=int, default=1000, help="stock per SKU")
+        parser.add_argument("--latency-ms", type=float, default=50.0, help="simulated gateway latency on create")
+        parser.add_argument("--failure-rate", type=float, default=0.0, help="share of gateway creates that fail")
+        parser.add_argument("--async-views", action="store_true", help="use the checkout/razorpay/async/ endpoints")
+
+    def handle(self, *args, **options):
+        gateway_options = {"latency_ms": options["latency_ms"], "failure_rate": options["failure_rate"]}
+        with override_settings(
+            PAYMENT_GATEWAY="order.gateways.FakeGateway",
+            PAYMENT_GATEWAY_FAKE=gateway_options,
+            ALLOWED_HOSTS=["testserver"],
+        ):
+            tag = uuid.uuid4().hex[:8]
+            users, products = self._seed(tag, options)
+            try:
+                results, elapsed = asyncio.run(self._run(users, products, options))
+                self._report(results, elapsed, products, options)
+            finally:
+                self._cleanup(users, products)
+
+    # -- data ---------------------------------------------------------------
+
+    def _seed(self, tag, options):
+        category = Category.objects.create(name=f"loadtest-{tag}")
+        size, _ = Size.objects.get_or_create(name="M")
+        products = [
+            Product.objects.create(category=category, name=f"loadtest {tag} {i}", new_price=499)
+            for i in range(options["products"])
+        ]
+        ProductSize.objects.bulk_create([ProductSize(product=p, size=size, stock=options["stock"]) for p in products])
+        users = [
+            User.objects.create_user(
+                email=f"loadtest-{tag}-{i}@example.com", name="Load test",
+                phone_number=f"9{i:09d}", password=uuid.uuid4().hex,
+            )
+            for i in range(options["concurrency"])
+        ]
+        return users, products
+
+    def _cleanup(self, users, products):
+        PaymentIntent.objects.filter(user__in=users).delete()
+        Order.objects.filter(user__in=users).delete()
+        User.objects.filter(pk__in=[u.pk for u in users]).delete()
+        category_id = products[0].category_id if products else None
+        Product.objects.filter(pk__in=[p.pk for p in products]).delete()
+        if category_id:
+            Category.objects.filter(pk=category_id).delete()
+
+    # -- load ---------------------------------------------------------------
+
+    def _checkout(self, user, product, async_views=False):
+        """One full checkout on a worker thread -> (outcome, {step: seconds})."""
+        client = APIClient()
+        prefix = "/api/v1/order/checkout/razorpay/"
+        if async_views:
+            # plain Django views: authenticate like a real client
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+            prefix += "async/"
+        else:
+            client.force_authenticate(user)
+        gateway = get_payment_gateway()
+        timings = {}
+        try:
+            start = time.perf_counter()
+            created = client.post(
+                prefix + "create/",
+                {"orders": [{"product": product.id, "size": "M", "quantity": 1, "shipping_address": "load test"}]},
+                format="json",
+            )
+            timings["create"] = time.perf_counter() - start
+            if created.status_code != 201:
+                return f"create_{created.status_code}", timings
+
+            order_id = created.json()["razorpay_order_id"]
+            payment_id, signature = gateway.pay(order_id)
+
+            start = time.perf_counter()
+            verified = client.post(
+                prefix + "verify/",
+                {"razorpay_order_id": order_id, "razorpay_payment_id": payment_id, "razorpay_signature": signature},
+                format="json",
+            )
+            timings["verify"] = time.perf_counter() - start
+            if verified.status_code != 200:
+                return f"verify_{verified.status_code}", timings
+            return "ok", timings
+        finally:
+            connection.close()
+
+    async def _run(self, users, products, options):
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=options["concurrency"])
+        semaphore = asyncio.Semaphore(options["concurrency"])
+
+        async def one(i):
+            async with semaphore:
+                start = time.perf_counter()
+                outcome, timings = await loop.run_in_executor(
+                    executor, self._checkout, users[i % len(users)], products[i % len(products)],
+                    options["async_views"],
+                )
+                timings["total"] = time.perf_counter() - start
+                return outcome, timings
+
+        start = time.perf_counter()
+        try:
+            results = await asyncio.gather(*(one(i) for i in range(options["checkouts"])))
+        finally:
+            executor.shutdown()
+        return results, time.perf_counter() - start
+
+    def _report(self, results, elapsed, products, options):
+        outcomes = {}
+        for outcome, _ in results:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        ok = outcomes.get("ok", 0)
+
+        self.stdout.write(
+            f"{len(results)} checkouts ({'async' if options['async_views'] else 'sync'} views), "
+            f"concurrency {options['concurrency']}, "
+            f"gateway latency {options['latency_ms']:.0f}ms, failure rate {options['failure_rate']:.2%}"
+        )
+        self.stdout.write("outcomes: " + ", ".join(f"{k}={v}" for k, v in sorted(outcomes.items())))
+        self.stdout.write(f"throughput: {ok / elapsed:.1f} checkouts/s ({elapsed:.2f}s)")
+        for step in ("create", "verify", "total"):
+            samples = [t[step] * 1000 for o, t in results if step in t]
+            if samples:
+                self.stdout.write(
+                    f"{step:>7}: p50 {percentile(samples, 50):7.1f}ms  p99 {percentile(samples, 99):7.1f}ms  "
+                    f"mean {statistics.mean(samples):7.1f}ms"
+                )
+
+        # every verified checkout took exactly one unit of stock
+        remaining = sum(ProductSize.objects.filter(product__in=products).values_list("stock", flat=True))
+        sold = len(products) * options["stock"] - remaining
+        status = self.style.SUCCESS("ok") if sold == ok else self.style.ERROR("MISMATCH")
+        self.stdout.write(f"stock decremented by {sold} for {ok} verified checkouts: {status}")
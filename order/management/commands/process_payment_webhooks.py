@@ -0,0 +1,33 @@
+# order/management/commands/process_payment_webhooks.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from order.webhooks import process_webhook_events
+
+
+class Command(BaseCommand):
+    help = "Create / confirm orders from stored payment webhook events, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--interval", type=float, default=1.0, help="seconds to sleep when nothing is pending")
+        parser.add_argument("--once", action="store_true", help="process what is pending now and exit")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        while True:
+            try:
+                processed = process_webhook_events(batch_size)
+            except Exception as exc:
+                # db hiccup: the batch stays unprocessed, try again shortly
+                self.stderr.write(f"processing failed: {exc}")
+                processed = 0
+                if options["once"]:
+                    raise
+            if processed:
+                self.stdout.write(f"processed {processed} event(s)")
+            if processed < batch_size:
+                if options["once"]:
+                    return
+                time.sleep(options["interval"])
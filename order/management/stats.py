@@ -0,0 +1,11 @@
+# order/management/stats.py
+"""Helpers shared by the benchmark / load-test commands."""
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of values (0.0 when empty)."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))
+    return values[index]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0006_notificationoutbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentIntent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('razorpay_order_id', models.CharField(max_length=255, unique=True)),
+                ('razorpay_payment_id', models.CharField(blank=True, max_length=255, null=True, unique=True)),
+                ('lines', models.JSONField()),
+                ('total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('amount_paise', models.PositiveIntegerField()),
+                ('currency', models.CharField(default='INR', max_length=3)),
+                ('status', models.CharField(choices=[('CREATED', 'Created'), ('PAID', 'Paid')], default='CREATED', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('order', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payment_intent', to='order.order')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payment_intents', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:01
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_summary(apps, schema_editor):
+    # existing orders: one UPDATE with correlated subqueries over their items
+    Order = apps.get_model("order", "Order")
+    OrderItem = apps.get_model("order", "OrderItem")
+    items = OrderItem.objects.filter(order=OuterRef("pk"))
+    first = items.order_by("id")
+    Order.objects.update(
+        item_count=Coalesce(
+            Subquery(items.order_by().values("order").annotate(n=Count("id")).values("n")[:1]), Value(0),
+        ),
+        first_item_name=Coalesce(Subquery(first.values("product__name")[:1]), Value("")),
+        thumbnail=Subquery(first.values("product__image")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0008_paymentwebhookevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='first_item_name',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to='products/'),
+        ),
+        migrations.RunPython(backfill_summary, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,12 @@
 from django.db import models
 from django.conf import settings
+from django_dress.tracking import TrackedFieldsMixin
 from product.models import Product
 
 User = settings.AUTH_USER_MODEL
 
-class Order(models.Model):
+
+class Order(TrackedFieldsMixin, models.Model):
     PAYMENT_STATUS_CHOICES = [
         ("PENDING", "Pending"),
         ("PAID", "Paid"),
@@ -17,6 +19,16 @@ class Order(models.Model):
         ("DELIVERED", "Delivered"),
     ]
 
+    # forward-only moves allowed by bulk admin updates
+    ORDER_STATUS_TRANSITIONS = {
+        "PROCESSING": {"SHIPPED", "DELIVERED"},
+        "SHIPPED": {"DELIVERED"},
+        "DELIVERED": set(),
+    }
+
+    # status changes drive user notifications (see signals.py)
+    tracked_fields = ("order_status",)
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="orders")
 
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
@@ -37,9 +49,23 @@ class Order(models.Model):
     shipping_address = models.TextField(blank=True, null=True)
     phone = models.CharField(max_length=15, blank=True, null=True)
 
+    # list-row summary, filled from the items at creation (see services.order_summary)
+    # so order lists don't have to load every OrderItem + Product
+    item_count = models.PositiveIntegerField(default=0)
+    first_item_name = models.CharField(max_length=255, blank=True, default="")
+    thumbnail = models.ImageField(upload_to="products/", blank=True, null=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # keyset pagination on (created_at, id)
+            models.Index(fields=["-created_at", "-id"], name="order_created_id_idx"),
+            # a user's order history, newest first (keyset pages on (created_at, id))
+            models.Index(fields=["user", "-created_at", "-id"], name="order_user_created_idx"),
+        ]
+
     def __str__(self):
         return f"Order #{self.id} - {self.user.username}"
 
@@ -57,10 +83,96 @@ class OrderItem(models.Model):
         return f"{self.product.name} x {self.quantity}"
 
 class Notification(models.Model):
+    """
+    A user's notification inbox. Written in batches by the dispatcher
+    (outbox.drain_outbox); sockets replay unread ones on connect.
+    """
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="notifications")
     message = models.TextField()
+    # the event as it was pushed to the socket, replayed as-is
+    payload = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     read = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # replay: WHERE user_id = ? AND (created_at, id) > cursor ORDER BY created_at, id
+            models.Index(fields=["user", "created_at", "id"], name="notification_user_created_idx"),
+        ]
+
     def __str__(self):
         return f"Notification for {self.user.username}: {self.message[:50]}"
+
+
+class NotificationOutbox(models.Model):
+    """
+    Pending WebSocket notification, written in the same transaction as the
+    change that caused it and drained by `manage.py dispatch_notifications`.
+    Rows are deleted once sent (and stored as Notification).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Outbox #{self.id} for user {self.user_id}"
+
+
+class PaymentIntent(models.Model):
+    """
+    A Razorpay checkout in flight: the priced lines are stored when the gateway
+    order is created, so verify only needs this row and the signature check.
+    `razorpay_payment_id` is set once, by a conditional UPDATE, which is what
+    makes repeated verify calls idempotent.
+    """
+    STATUS_CHOICES = [
+        ("CREATED", "Created"),
+        ("PAID", "Paid"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="payment_intents")
+    razorpay_order_id = models.CharField(max_length=255, unique=True)
+    razorpay_payment_id = models.CharField(max_length=255, blank=True, null=True, unique=True)
+
+    # snapshot of order.quotes.build_quote() at creation time
+    lines = models.JSONField()
+    total = models.DecimalField(max_digits=10, decimal_places=2)
+    amount_paise = models.PositiveIntegerField()
+    currency = models.CharField(max_length=3, default="INR")
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="CREATED")
+    order = models.OneToOneField(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name="payment_intent")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"PaymentIntent {self.razorpay_order_id} ({self.status})"
+
+
+class PaymentWebhookEvent(models.Model):
+    """
+    Raw gateway webhook, stored as received. Keyed by the gateway's event id so
+    redeliveries are dropped at INSERT time; rows are never deleted.
+    `manage.py process_payment_webhooks` works through the unprocessed ones.
+    """
+    event_id = models.CharField(max_length=255, unique=True)
+    event = models.CharField(max_length=100)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    processed_at = models.DateTimeField(null=True, blank=True)
+    # created / confirmed / ignored / no_intent / amount_mismatch / conflict / out_of_stock
+    outcome = models.CharField(max_length=32, blank=True)
+
+    class Meta:
+        indexes = [
+            # the processing queue: only unprocessed rows are indexed
+            models.Index(
+                fields=["id"], name="webhook_event_pending_idx",
+                condition=models.Q(processed_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.event} {self.event_id}"
@@ -0,0 +1,147 @@
+# order/outbox.py
+import asyncio
+import logging
+
+from datetime import datetime, timezone
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Notification, NotificationOutbox
+from .presence import online_users
+
+logger = logging.getLogger(__name__)
+
+
+def user_group(user_id):
+    # every websocket connection of a user joins this group (see consumers.py)
+    return f"user_{user_id}"
+
+
+def order_status_payload(order_id, status):
+    return {
+        "order_id": order_id,
+        "status": status,
+        "message": f"Your order #{order_id} is now {status}",
+    }
+
+
+def enqueue_notifications(events):
+    """
+    events = [(user_id, payload), ...]. One INSERT, inside the caller's
+    transaction: nothing is sent if that transaction rolls back.
+    """
+    NotificationOutbox.objects.bulk_create(
+        [NotificationOutbox(user_id=user_id, payload=payload) for user_id, payload in events]
+    )
+
+
+def notification_cursor(notification):
+    """Opaque replay position "<created_at in µs>-<id>"; sockets resume after it."""
+    micros = int(notification.created_at.timestamp() * 1_000_000)
+    return f"{micros}-{notification.id}"
+
+
+def parse_cursor(cursor):
+    """-> (created_at, id), or None for a missing / malformed cursor."""
+    try:
+        micros, notification_id = (int(part) for part in cursor.split("-"))
+        created_at = datetime.fromtimestamp(micros / 1_000_000, tz=timezone.utc)
+    except (AttributeError, ValueError, OverflowError, OSError):
+        return None
+    return created_at, notification_id
+
+
+def socket_event(notification):
+    """The stored event as a socket message, with its id and replay cursor."""
+    return {**notification.payload, "id": notification.id, "cursor": notification_cursor(notification)}
+
+
+def _after(position):
+    created_at, notification_id = position
+    return Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=notification_id)
+
+
+def unread_since(user_id, cursor=None, limit=None):
+    """
+    Unread notifications after `cursor` (all unread without one), oldest first.
+    With more than `limit` of them, the newest `limit`: older ones stay unread
+    until marked read (mark_read). One backward range scan on the
+    (user_id, created_at, id) index.
+    """
+    qs = Notification.objects.filter(user_id=user_id, read=False)
+    position = parse_cursor(cursor) if cursor else None
+    if position:
+        qs = qs.filter(_after(position))
+    newest = qs.order_by("-created_at", "-id")[:limit or settings.NOTIFICATION_REPLAY_LIMIT]
+    return list(reversed(newest))
+
+
+def mark_read(user_id, cursor=None):
+    """
+    Mark the user's notifications up to and including `cursor` read (all of
+    them without one), so they are no longer replayed. Returns how many changed;
+    a malformed cursor marks nothing.
+    """
+    qs = Notification.objects.filter(user_id=user_id, read=False)
+    if cursor:
+        position = parse_cursor(cursor)
+        if position is None:
+            return 0
+        qs = qs.exclude(_after(position))
+    return qs.update(read=True)
+
+
+def _push(notifications):
+    """Send stored notifications to the users with an open socket."""
+    try:
+        # offline users get theirs from the inbox when they reconnect
+        online = online_users({n.user_id for n in notifications})
+        async_to_sync(send_batch)([(n.user_id, socket_event(n)) for n in notifications if n.user_id in online])
+    except Exception:
+        # already committed: the inbox replays them on the next connect
+        logger.exception("pushing %d notification(s) failed", len(notifications))
+
+
+def drain_outbox(batch_size=500):
+    """
+    Store one batch of pending notifications in the inbox, push them to users
+    with an open socket and return how many were handled.
+    Rows are claimed with SKIP LOCKED so several dispatchers can run side by side.
+    The push happens after commit: a socket that connects before the presence
+    check gets the live event, one that connects later replays it from the
+    inbox (an event carries its id, so a socket that sees it both ways can
+    tell). Nothing is sent for a batch that rolls back.
+    """
+    with transaction.atomic():
+        events = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True).order_by("id")[:batch_size]
+        )
+        if not events:
+            return 0
+
+        notifications = Notification.objects.bulk_create([
+            Notification(user_id=e.user_id, message=e.payload.get("message", ""), payload=e.payload)
+            for e in events
+        ])
+        NotificationOutbox.objects.filter(pk__in=[e.pk for e in events]).delete()
+        transaction.on_commit(lambda: _push(notifications))
+    return len(events)
+
+
+async def send_batch(events):
+    """Fan out [(user_id, payload), ...] as concurrent group_send calls."""
+    channel_layer = get_channel_layer()
+    await asyncio.gather(*(
+        channel_layer.group_send(
+            user_group(user_id),
+            {
+                "type": "send_notification",  # Handler method name in consumer
+                "data": payload,
+            },
+        )
+        for user_id, payload in events
+    ))
@@ -0,0 +1,58 @@
+# order/presence.py
+"""
+Which users have a notification socket open, as a per-user socket counter in
+the shared cache (Redis in production), so the dispatcher can skip group_send
+for users nobody is listening for. Their notifications are still stored and
+replayed when they reconnect.
+
+Errs towards "online": a worker that dies with sockets open leaves its counts
+behind until WS_PRESENCE_TTL expires, which only costs a wasted group_send.
+Open sockets call socket_alive every refresh_interval() so a long-lived
+connection never expires out of the count.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _key(user_id):
+    return f"ws:presence:{user_id}"
+
+
+async def socket_opened(user_id):
+    key = _key(user_id)
+    if await cache.aadd(key, 1, settings.WS_PRESENCE_TTL):
+        return
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        # expired between add and incr
+        await cache.aadd(key, 1, settings.WS_PRESENCE_TTL)
+        return
+    await cache.atouch(key, settings.WS_PRESENCE_TTL)
+
+
+def refresh_interval():
+    """Seconds between socket_alive calls: well inside the TTL."""
+    return settings.WS_PRESENCE_TTL / 4
+
+
+async def socket_alive(user_id):
+    """Push back the expiry of an open socket's count."""
+    key = _key(user_id)
+    if not await cache.atouch(key, settings.WS_PRESENCE_TTL):
+        # expired anyway (e.g. a cache restart): count this socket again
+        await cache.aadd(key, 1, settings.WS_PRESENCE_TTL)
+
+
+async def socket_closed(user_id):
+    # never deleted at zero: a delete could race a concurrent open's incr
+    try:
+        await cache.adecr(_key(user_id))
+    except ValueError:
+        pass
+
+
+def online_users(user_ids):
+    """-> the subset of user_ids with at least one open socket (one cache round trip)."""
+    keys = {_key(user_id): user_id for user_id in user_ids}
+    return {keys[key] for key, count in cache.get_many(list(keys)).items() if count > 0}
@@ -0,0 +1,132 @@
+# order/quotes.py
+"""
+Server-side pricing for checkout. A quote is computed once (one product query),
+cached for ORDER_QUOTE_TTL seconds and handed to the client as a signed id;
+razorpay create looks it up instead of re-pricing the payload and stores it
+on the PaymentIntent that verify reads.
+"""
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+from product.models import Product
+
+QUOTE_SALT = "order.quote"
+
+
+class QuoteError(Exception):
+    """Invalid payload or unknown / expired quote; the message is safe to show the client."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def unit_price(product):
+    # use new_price if exists, else price, else old_price
+    price = getattr(product, "new_price", None)
+    if price is None:
+        price = getattr(product, "price", None) or getattr(product, "old_price", 0)
+    return Decimal(str(price))
+
+
+def build_quote(orders_payload):
+    """
+    Price `orders_payload` = [{"product", "size", "quantity", "shipping_address", "phone"}, ...].
+
+    Returns a JSON-ready dict; money values are strings, `amount_paise` is what
+    the payment gateway is asked to charge:
+    {
+        "lines": [{"product", "name", "image", "size", "quantity", "unit_price", "mrp",
+                   "discount", "line_total", "shipping_address", "phone"}, ...],
+        "subtotal": <sum of mrp * qty>, "discount": <sum of discounts>,
+        "total": <sum of line totals>, "amount_paise": <int>, "currency": "INR",
+    }
+    """
+    if isinstance(orders_payload, dict):
+        orders_payload = [orders_payload]
+    if not isinstance(orders_payload, list) or not orders_payload:
+        raise QuoteError("orders payload required")
+
+    parsed = []
+    for o in orders_payload:
+        try:
+            pid = int(o.get("product"))
+            qty = int(o.get("quantity", 1))
+        except (AttributeError, TypeError, ValueError):
+            raise QuoteError(f"invalid line in payload: {o}")
+        if qty < 1:
+            raise QuoteError(f"invalid quantity for product {pid}")
+        parsed.append((o, pid, qty))
+
+    product_map = Product.objects.in_bulk({pid for _, pid, _ in parsed})
+
+    lines = []
+    subtotal = discount = total = Decimal("0.00")
+    for o, pid, qty in parsed:
+        p = product_map.get(pid)
+        if not p:
+            raise QuoteError(f"Product {pid} not found", status_code=404)
+
+        price = unit_price(p)
+        mrp = Decimal(p.old_price) if p.has_discount else price
+        line_discount = p.discount_amount * qty
+        line_total = price * qty
+
+        subtotal += mrp * qty
+        discount += line_discount
+        total += line_total
+        lines.append({
+            "product": pid,
+            "name": p.name,
+            "image": p.image.name or "",
+            "size": o.get("size", "") or "",
+            "quantity": qty,
+            "unit_price": str(price),
+            "mrp": str(mrp),
+            "discount": str(line_discount),
+            "line_total": str(line_total),
+            "shipping_address": o.get("shipping_address", ""),
+            "phone": o.get("phone", ""),
+        })
+
+    return {
+        "lines": lines,
+        "subtotal": str(subtotal),
+        "discount": str(discount),
+        "total": str(total),
+        "amount_paise": int((total * 100).to_integral_value()),
+        "currency": "INR",
+    }
+
+
+def _cache_key(key):
+    return f"order:quote:{key}"
+
+
+def issue_quote(user_id, quote):
+    """Cache `quote` and return its signed id (bound to the user)."""
+    key = uuid.uuid4().hex
+    cache.set(_cache_key(key), quote, settings.ORDER_QUOTE_TTL)
+    return signing.dumps({"k": key, "u": user_id}, salt=QUOTE_SALT)
+
+
+def _unsign(quote_id, user_id):
+    try:
+        data = signing.loads(quote_id, salt=QUOTE_SALT, max_age=settings.ORDER_QUOTE_TTL)
+    except signing.BadSignature:  # includes SignatureExpired
+        raise QuoteError("invalid or expired quote")
+    if data.get("u") != user_id:
+        raise QuoteError("invalid or expired quote")
+    return _cache_key(data["k"])
+
+
+def get_quote(quote_id, user_id):
+    quote = cache.get(_unsign(quote_id, user_id))
+    if quote is None:
+        raise QuoteError("invalid or expired quote")
+    return quote
+
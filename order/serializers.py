@@ -39,3 +39,20 @@ class CheckoutOrderSerializer(BaseOrderSerializer):
 class UserOrderSerializer(BaseOrderSerializer):
     pass
 
+
+
+class OrderListSerializer(serializers.ModelSerializer):
+    # list rows: the denormalized summary columns instead of nested items
+    class Meta:
+        model = Order
+        fields = [
+            "id",
+            "total_amount",
+            "payment_status",
+            "order_status",
+            "item_count",
+            "first_item_name",
+            "thumbnail",
+            "created_at",
+        ]
+        read_only_fields = fields
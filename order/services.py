@@ -0,0 +1,171 @@
+# order/services.py
+from collections import OrderedDict
+from functools import reduce
+from operator import or_
+
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from cart.store import get_cart_store
+from product.cache import bump_catalog_version
+from product.models import ProductSize
+from .models import Order, OrderItem, PaymentIntent
+from .outbox import enqueue_notifications, order_status_payload
+
+
+class StockReservationError(Exception):
+    """Raised when a line can't be reserved; the message is safe to show the client."""
+
+
+class PaymentConflictError(Exception):
+    """The intent was already paid by a different payment id."""
+
+
+def reserve_stock(lines):
+    """
+    Lock, validate and decrement stock for `lines` = [(product, size_name, qty), ...],
+    `product` being a Product or its id. Must run inside transaction.atomic(); raising rolls the whole checkout back.
+
+    - one SELECT ... FOR UPDATE for every ProductSize row, ordered by pk so two
+      checkouts touching the same SKUs always lock them in the same order (no deadlock)
+    - stock is validated in memory (repeated lines for the same SKU are summed)
+    - one UPDATE ... FROM (VALUES ...) decrements every row
+    """
+    wanted = OrderedDict()
+    for product, size_name, qty in lines:
+        key = (getattr(product, "pk", product), size_name)
+        wanted[key] = wanted.get(key, 0) + qty
+    if not wanted:
+        return {}
+
+    lookup = reduce(or_, (Q(product_id=pid, size__name=size_name) for pid, size_name in wanted))
+    locked = (
+        ProductSize.objects.select_for_update(of=("self",))
+        .select_related("size")
+        .filter(lookup)
+        .order_by("pk")
+    )
+    rows = {(ps.product_id, ps.size.name): ps for ps in locked}
+
+    for (pid, size_name), qty in wanted.items():
+        ps = rows.get((pid, size_name))
+        if ps is None:
+            raise StockReservationError(f"Size '{size_name}' not available for product {pid}")
+        if ps.stock < qty:
+            # ps.product is only loaded on this error path
+            raise StockReservationError(f"Insufficient stock for {ps.product.name} size {size_name}")
+
+    _decrement_stock({rows[key].pk: qty for key, qty in wanted.items()})
+    # stock is part of the cached catalog responses; raw UPDATE skips signals
+    transaction.on_commit(bump_catalog_version)
+    return rows
+
+
+def _decrement_stock(quantities):
+    """quantities = {product_size_id: qty}; a single statement for all rows."""
+    table = connection.ops.quote_name(ProductSize._meta.db_table)
+    values = ", ".join(["(%s, %s)"] * len(quantities))
+    params = [value for pair in sorted(quantities.items()) for value in pair]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} AS ps SET stock = ps.stock - v.qty "
+            f"FROM (VALUES {values}) AS v(id, qty) WHERE ps.id = v.id",
+            params,
+        )
+
+
+def set_order_status(queryset, new_status, from_statuses=None):
+    """
+    Bulk status change for every order in queryset. update() bypasses the Order
+    signals, so the notifications are queued here, in the same transaction:
+    one locking SELECT, one UPDATE and one outbox INSERT for any number of orders.
+    Only orders currently in `from_statuses` are touched, when given.
+    Returns [(order_id, user_id, old_status), ...] for the orders that changed.
+    """
+    if from_statuses is not None:
+        queryset = queryset.filter(order_status__in=from_statuses)
+    with transaction.atomic():
+        changed = list(
+            queryset.exclude(order_status=new_status)
+            .select_for_update()
+            .order_by("pk")
+            .values_list("pk", "user_id", "order_status")
+        )
+        if changed:
+            Order.objects.filter(pk__in=[pk for pk, _, _ in changed]).update(
+                order_status=new_status, updated_at=timezone.now(),
+            )
+            enqueue_notifications(
+                [(user_id, order_status_payload(pk, new_status)) for pk, user_id, _ in changed]
+            )
+    return changed
+
+
+def order_summary(lines):
+    """
+    Denormalized list-row fields for an Order made of quote `lines`
+    (see quotes.build_quote): {"item_count", "first_item_name", "thumbnail"}.
+    """
+    first = lines[0] if lines else {}
+    return {
+        "item_count": len(lines),
+        "first_item_name": first.get("name", "")[:255],
+        # intents stored before quote lines carried the image have no "image"
+        "thumbnail": first.get("image") or None,
+    }
+
+
+def complete_payment_intent(intent, payment_id):
+    """
+    Turn a verified payment into its Order, exactly once. Returns (order, created).
+
+    The intent is claimed with `UPDATE ... WHERE razorpay_payment_id IS NULL`:
+    a retry (or a concurrent call, which waits on the row lock) updates nothing
+    and gets the existing order back instead of doing the work again.
+    Raises StockReservationError (everything rolled back, intent stays unpaid)
+    or PaymentConflictError.
+    """
+    if intent.razorpay_payment_id:
+        # already paid when it was loaded: a plain retry, nothing to claim
+        if intent.razorpay_payment_id != payment_id:
+            raise PaymentConflictError(f"{intent.razorpay_order_id} is already paid")
+        return intent.order, False
+
+    with transaction.atomic():
+        claimed = PaymentIntent.objects.filter(pk=intent.pk, razorpay_payment_id__isnull=True).update(
+            razorpay_payment_id=payment_id, status="PAID", updated_at=timezone.now(),
+        )
+        if not claimed:
+            intent = PaymentIntent.objects.select_related("order").get(pk=intent.pk)
+            if intent.razorpay_payment_id != payment_id:
+                raise PaymentConflictError(f"{intent.razorpay_order_id} is already paid")
+            return intent.order, False
+
+        lines = intent.lines
+        reserve_stock([(line["product"], line["size"], line["quantity"]) for line in lines])
+
+        first = lines[0]
+        order = Order.objects.create(
+            user_id=intent.user_id,
+            total_amount=intent.total,
+            payment_status="PAID",
+            razorpay_order_id=intent.razorpay_order_id,
+            razorpay_payment_id=payment_id,
+            shipping_address=first.get("shipping_address") or None,
+            phone=first.get("phone") or None,
+            **order_summary(lines),
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order, product_id=line["product"], size=line["size"],
+                quantity=line["quantity"], price=Decimal(line["unit_price"]),
+            )
+            for line in lines
+        ])
+        PaymentIntent.objects.filter(pk=intent.pk).update(order=order)
+
+        get_cart_store().remove_products(intent.user_id, [line["product"] for line in lines])
+    return order, True
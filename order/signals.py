@@ -1,40 +1,29 @@
 from django.db.models.signals import pre_save, post_save
 from django.dispatch import receiver
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 from .models import Order
+from .outbox import enqueue_notifications, order_status_payload
 
 @receiver(pre_save, sender=Order)
-def order_pre_save(sender, instance, **kwargs):
-    if instance.pk:
-        old = Order.objects.get(pk=instance.pk)
-        instance._old_status = old.order_status
-    else:
-        instance._old_status = None
+def order_pre_save(sender, instance, update_fields=None, **kwargs):
+    # rows loaded from the db already carry their old status (TrackedFieldsMixin);
+    # only an instance built by hand with an existing pk needs the extra lookup
+    if not instance.pk or instance.is_tracking("order_status"):
+        return
+    if update_fields is not None and "order_status" not in update_fields:
+        return
+    old_status = Order.objects.filter(pk=instance.pk).values_list("order_status", flat=True).first()
+    if old_status is not None:
+        instance._loaded_values = {**getattr(instance, "_loaded_values", {}), "order_status": old_status}
 
 
 @receiver(post_save, sender=Order)
-def order_post_save(sender, instance, created, **kwargs):
+def order_post_save(sender, instance, created, update_fields=None, **kwargs):
     if created:
         return
-
-    old_status = getattr(instance, "_old_status", None)
-    new_status = instance.order_status
-
-    if old_status == new_status:
+    if update_fields is not None and "order_status" not in update_fields:
+        return
+    if not instance.has_changed("order_status"):
         return
 
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        f"user_{instance.user.id}",
-        {
-            "type": "send_notification", # Handler method name in consumer
-            "data": {
-                "order_id": instance.id,
-                "status": new_status,
-                "message": f"Your order #{instance.id} is now {new_status}"
-            }
-        }
-    )
-
-    print("WS notification sent")
+    # queued in the saving transaction, sent by the dispatch_notifications command
+    enqueue_notifications([(instance.user_id, order_status_payload(instance.id, instance.order_status))])
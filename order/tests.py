@@ -1,3 +1,1110 @@
-from django.test import TestCase
+import asyncio
+import json
+import subprocess
+import sys
+import threading
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import httpx
+from asgiref.sync import async_to_sync as run_async
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from channels_redis.core import RedisChannelLayer
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from cart.models import CartItem
+from product.models import Category, Product, ProductSize, Size
+from django_dress.asgi import application
+from django_dress.channel_layers import ShardedRedisChannelLayer
+from user.models import User
+from . import ws_middleware
+from .models import Notification, NotificationOutbox, Order, PaymentIntent, PaymentWebhookEvent
+from .gateways import (
+    FakeGateway, GatewayError, RazorpayGateway, get_payment_gateway, payment_signature, webhook_signature,
+)
+from .outbox import drain_outbox, notification_cursor, send_batch, unread_since
+from .presence import online_users, socket_closed, socket_opened
+from .quotes import QuoteError, build_quote, get_quote, issue_quote
+from .services import StockReservationError, complete_payment_intent, reserve_stock, set_order_status
+from .views import _amount_mismatch
+from .webhooks import process_webhook_events, record_event
+
+
+def _make_product(name, sizes_stock):
+    category, _ = Category.objects.get_or_create(name="Dresses")
+    product = Product.objects.create(category=category, name=name, new_price=499)
+    for size_name, stock in sizes_stock.items():
+        size, _ = Size.objects.get_or_create(name=size_name)
+        ProductSize.objects.create(product=product, size=size, stock=stock)
+    return product
+
+
+def _stock(product, size_name):
+    return ProductSize.objects.get(product=product, size__name=size_name).stock
+
+
+class ReserveStockTests(TestCase):
+    def setUp(self):
+        self.dress = _make_product("Maxi dress", {"M": 3, "L": 1})
+        self.shirt = _make_product("Linen shirt", {"M": 2})
+
+    def test_locks_validates_and_decrements_in_fixed_queries(self):
+        lines = [(self.dress, "M", 2), (self.dress, "L", 1), (self.shirt, "M", 2)]
+        # one locking SELECT + one UPDATE, whatever the number of lines
+        with transaction.atomic(), self.assertNumQueries(2):
+            reserve_stock(lines)
+        self.assertEqual(_stock(self.dress, "M"), 1)
+        self.assertEqual(_stock(self.dress, "L"), 0)
+        self.assertEqual(_stock(self.shirt, "M"), 0)
+
+    def test_repeated_lines_are_summed(self):
+        with self.assertRaisesMessage(StockReservationError, "Insufficient stock for Maxi dress size M"):
+            with transaction.atomic():
+                reserve_stock([(self.dress, "M", 2), (self.dress, "M", 2)])
+        self.assertEqual(_stock(self.dress, "M"), 3)
+
+    def test_unknown_size(self):
+        with self.assertRaisesMessage(StockReservationError, "Size 'XL' not available"):
+            with transaction.atomic():
+                reserve_stock([(self.dress, "XL", 1)])
+
+
+class CodCheckoutTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="buyer@example.com", name="Buyer", phone_number="9876543210", password="pass12345",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.products = [_make_product(f"Dress {i}", {"M": 10}) for i in range(5)]
+
+    def _checkout(self, products, quantity=1):
+        payload = [
+            {"product": p.id, "size": "M", "quantity": quantity, "shipping_address": "MG Road", "phone": "9876543210"}
+            for p in products
+        ]
+        return self.client.post("/api/v1/order/checkout/cod/", {"orders": payload}, format="json")
+
+    def test_query_count_does_not_grow_with_cart_size(self):
+        with CaptureQueriesContext(connection) as one_line:
+            self.assertEqual(self._checkout(self.products[:1]).status_code, 201)
+        with CaptureQueriesContext(connection) as four_lines:
+            self.assertEqual(self._checkout(self.products[1:]).status_code, 201)
+        self.assertEqual(len(one_line), len(four_lines))
+
+    def test_creates_orders_decrements_stock_and_clears_cart(self):
+        CartItem.objects.create(user=self.user, product=self.products[0], size="M", quantity=2)
+        response = self._checkout(self.products[:2], quantity=2)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()["orders"]), 2)
+        self.assertEqual(response.json()["orders"][0]["items"][0]["quantity"], 2)
+        self.assertEqual(Order.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(_stock(self.products[0], "M"), 8)
+        self.assertFalse(CartItem.objects.filter(user=self.user).exists())
+
+    def test_orders_carry_their_list_summary(self):
+        self.products[0].image = "products/dress-0.jpg"
+        self.products[0].save()
+        self._checkout(self.products[:2], quantity=2)
+        summaries = set(Order.objects.values_list("item_count", "first_item_name", "thumbnail"))
+        self.assertEqual(summaries, {(1, "Dress 0", "products/dress-0.jpg"), (1, "Dress 1", "")})
+
+    def test_order_history_lists_summaries_in_one_query(self):
+        self._checkout(self.products)
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/v1/order/my-orders/")
+        rows = response.json()["results"]
+        self.assertEqual(len(rows), 5)
+        self.assertNotIn("items", rows[0])
+        self.assertEqual(rows[0]["item_count"], 1)
+
+        detail = self.client.get(f"/api/v1/order/my-orders/?order_id={rows[0]['id']}").json()
+        self.assertEqual(detail["items"][0]["product"]["name"], rows[0]["first_item_name"])
+
+    def test_insufficient_stock_creates_nothing(self):
+        response = self._checkout(self.products[:2], quantity=11)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(_stock(self.products[0], "M"), 10)
+
+
+class UserOrderHistoryTests(TestCase):
+    url = "/api/v1/order/my-orders/"
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="buyer@example.com", name="Buyer", phone_number="9876543210", password="pass12345",
+        )
+        other = User.objects.create_user(
+            email="other@example.com", name="Other", phone_number="9876543211", password="pass12345",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.orders = [
+            Order.objects.create(
+                user=self.user, total_amount=100 + i, first_item_name=f"Dress {i}",
+                payment_status="PAID" if i % 2 else "PENDING",
+                order_status="DELIVERED" if i < 3 else "PROCESSING",
+            )
+            for i in range(7)
+        ]
+        Order.objects.create(user=other, total_amount=1)
+        # spread the history over a week, oldest first
+        base = timezone.now() - timedelta(days=7)
+        for i, order in enumerate(self.orders):
+            Order.objects.filter(pk=order.pk).update(created_at=base + timedelta(days=i))
+
+    def _ids(self, response):
+        return [row["id"] for row in response.json()["results"]]
+
+    def test_walks_pages_newest_first(self):
+        seen = []
+        url = self.url + "?page_size=3"
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            seen += self._ids(response)
+            url = response.json()["next"]
+        self.assertEqual(seen, [o.id for o in reversed(self.orders)])
+
+    def test_filters(self):
+        response = self.client.get(self.url, {"order_status": "DELIVERED", "payment_status": "PAID"})
+        self.assertEqual(self._ids(response), [self.orders[1].id])
+
+        after = (timezone.now() - timedelta(days=3, hours=12)).isoformat()
+        response = self.client.get(self.url, {"created_after": after})
+        self.assertEqual(self._ids(response), [o.id for o in reversed(self.orders[4:])])
+
+        self.assertEqual(self.client.get(self.url, {"order_status": "LOST"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"created_before": "yesterday"}).status_code, 400)
+
+    def test_exact_count_on_request(self):
+        response = self.client.get(self.url, {"payment_status": "PENDING", "count": "exact"})
+        self.assertEqual(response.json()["count"], 4)
+
+
+class CheckoutQuoteTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="buyer@example.com", name="Buyer", phone_number="9876543210", password="pass12345",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.dress = _make_product("Maxi dress", {"M": 5})
+        self.dress.old_price = 699
+        self.dress.save()
+        self.shirt = _make_product("Linen shirt", {"M": 5})
+
+    def _orders(self):
+        return [
+            {"product": self.dress.id, "size": "M", "quantity": 2, "shipping_address": "MG Road", "phone": "9876543210"},
+            {"product": self.shirt.id, "size": "M", "quantity": 1},
+        ]
+
+    def test_totals_and_discounts(self):
+        with self.assertNumQueries(1):
+            quote = build_quote(self._orders())
+        self.assertEqual(quote["lines"][0]["discount"], "400.00")
+        self.assertEqual(Decimal(quote["subtotal"]), Decimal("1897.00"))
+        self.assertEqual(Decimal(quote["discount"]), Decimal("400.00"))
+        self.assertEqual(Decimal(quote["total"]), Decimal("1497.00"))
+        self.assertEqual(quote["amount_paise"], 149700)
+
+        with self.assertRaisesMessage(QuoteError, "Product 999999 not found"):
+            build_quote([{"product": 999999}])
+
+    def test_quote_id_is_signed_and_bound_to_the_user(self):
+        quote_id = issue_quote(self.user.id, build_quote(self._orders()))
+        self.assertEqual(get_quote(quote_id, self.user.id)["amount_paise"], 149700)
+        with self.assertRaises(QuoteError):
+            get_quote(quote_id, self.user.id + 1)
+        with self.assertRaises(QuoteError):
+            get_quote(quote_id + "x", self.user.id)
+
+    @override_settings(PAYMENT_GATEWAY="order.gateways.FakeGateway")
+    @mock.patch.object(FakeGateway, "create_order", return_value="order_1")
+    def test_create_reuses_the_quote(self, create_order):
+        quote = self.client.post("/api/v1/order/checkout/quote/", {"orders": self._orders()}, format="json").json()
+
+        # pricing is not repeated: the quote is read from the cache, only the intent is written
+        with self.assertNumQueries(1):
+            created = self.client.post(
+                "/api/v1/order/checkout/razorpay/create/", {"quote_id": quote["quote_id"]}, format="json",
+            )
+        self.assertEqual(created.json()["amount"], 149700)
+        create_order.assert_called_once_with(149700, "INR")
+        intent = PaymentIntent.objects.get(razorpay_order_id="order_1")
+        self.assertEqual(intent.lines, quote["lines"])
+        self.assertEqual(intent.total, Decimal("1497.00"))
+
+    @override_settings(PAYMENT_GATEWAY="order.gateways.FakeGateway")
+    def test_fake_gateway_round_trip(self):
+        created = self.client.post("/api/v1/order/checkout/razorpay/create/", {"orders": self._orders()}, format="json")
+        order_id = created.json()["razorpay_order_id"]
+        payment_id, signature = FakeGateway().pay(order_id)
+        response = self.client.post("/api/v1/order/checkout/razorpay/verify/", {
+            "razorpay_order_id": order_id, "razorpay_payment_id": payment_id, "razorpay_signature": signature,
+        }, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(_stock(self.dress, "M"), 3)
+
+    @override_settings(
+        PAYMENT_GATEWAY="order.gateways.FakeGateway",
+        PAYMENT_GATEWAY_FAKE={"latency_ms": 0, "failure_rate": 1.0},
+    )
+    def test_gateway_failure(self):
+        created = self.client.post("/api/v1/order/checkout/razorpay/create/", {"orders": self._orders()}, format="json")
+        self.assertEqual(created.status_code, 502)
+        self.assertFalse(PaymentIntent.objects.exists())
+
+
+@override_settings(PAYMENT_GATEWAY="order.gateways.FakeGateway")
+class PaymentIntentVerifyTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="buyer@example.com", name="Buyer", phone_number="9876543210", password="pass12345",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.dress = _make_product("Maxi dress", {"M": 5})
+        quote = build_quote([{"product": self.dress.id, "size": "M", "quantity": 2, "shipping_address": "MG Road"}])
+        self.intent = PaymentIntent.objects.create(
+            user=self.user, razorpay_order_id="order_1", lines=quote["lines"],
+            total=Decimal(quote["total"]), amount_paise=quote["amount_paise"],
+        )
+        CartItem.objects.create(user=self.user, product=self.dress, size="M", quantity=2)
+
+    def _verify(self, payment_id="pay_1", **extra):
+        payload = {
+            "razorpay_payment_id": payment_id, "razorpay_order_id": "order_1",
+            "razorpay_signature": payment_signature("fake_secret", "order_1", payment_id), **extra,
+        }
+        return self.client.post("/api/v1/order/checkout/razorpay/verify/", payload, format="json")
+
+    def test_verify_creates_the_order_from_the_intent(self):
+        response = self._verify(amount=99800)
+        self.assertEqual(response.status_code, 200)
+        order = Order.objects.get(pk=response.json()["order_id"])
+        self.assertEqual((order.total_amount, order.payment_status, order.shipping_address), (Decimal("998.00"), "PAID", "MG Road"))
+        self.assertEqual(list(order.items.values_list("size", "quantity")), [("M", 2)])
+        self.assertEqual(_stock(self.dress, "M"), 3)
+        self.assertFalse(CartItem.objects.filter(user=self.user).exists())
+        self.intent.refresh_from_db()
+        self.assertEqual((self.intent.status, self.intent.order_id), ("PAID", order.id))
+        self.assertEqual((order.item_count, order.first_item_name), (1, "Maxi dress"))
+
+    def test_retry_is_idempotent(self):
+        first = self._verify()
+        with self.assertNumQueries(2):  # intent lookup + its order, no claim, no stock work
+            again = self._verify()
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json()["order_id"], first.json()["order_id"])
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(_stock(self.dress, "M"), 3)
+
+        self.assertEqual(self._verify(payment_id="pay_2").status_code, 409)
+
+    def test_amount_signature_and_unknown_order(self):
+        self.assertEqual(self._verify(amount=100).json()["error"], "amount_mismatch")
+        self.assertEqual(self._verify(razorpay_signature="forged").json()["error"], "signature verification failed")
+        response = self.client.post("/api/v1/order/checkout/razorpay/verify/", {
+            "razorpay_payment_id": "pay_1", "razorpay_order_id": "order_x", "razorpay_signature": "sig",
+        }, format="json")
+        self.assertEqual(response.status_code, 404)
+
+    def test_amount_is_compared_numerically(self):
+        for amount in (99800, "99800", 998, "998", "998.0", "998.00"):
+            self.assertIsNone(_amount_mismatch(self.intent, amount), amount)
+        for amount in ("997.99", "abc", ""):
+            self.assertIsNotNone(_amount_mismatch(self.intent, amount), amount)
+        self.assertEqual(self._verify(amount="998.0").status_code, 200)
+
+    def _legacy_verify(self, order_id, **extra):
+        payment_id = f"pay_{order_id}"
+        payload = {
+            "razorpay_payment_id": payment_id, "razorpay_order_id": order_id,
+            "razorpay_signature": payment_signature("fake_secret", order_id, payment_id), **extra,
+        }
+        return self.client.post("/api/v1/order/checkout/razorpay/verify/", payload, format="json")
+
+    def test_legacy_orders_payload_must_match_the_gateway_order(self):
+        gateway = get_payment_gateway()
+        one_dress = [{"product": self.dress.id, "size": "M", "quantity": 1}]
+        order_id = gateway.create_order(49900)
+
+        # client-supplied lines worth more than was charged
+        two_dresses = [{**one_dress[0], "quantity": 2}]
+        response = self._legacy_verify(order_id, orders_payload=two_dresses)
+        self.assertEqual(response.json()["error"], "quote does not match razorpay order")
+        self.assertFalse(PaymentIntent.objects.filter(razorpay_order_id=order_id).exists())
+
+        response = self._legacy_verify(order_id, orders_payload=one_dress, amount=499)
+        self.assertEqual(response.status_code, 200)
+        intent = PaymentIntent.objects.get(razorpay_order_id=order_id)
+        self.assertEqual((intent.status, intent.order_id, intent.amount_paise), ("PAID", response.json()["order_id"], 49900))
+
+        # not a gateway order at all
+        response = self._legacy_verify("order_unknown", orders_payload=one_dress)
+        self.assertEqual(response.status_code, 502)
+
+    def test_legacy_quote_id_must_match_the_gateway_order(self):
+        gateway = get_payment_gateway()
+        quote_id = issue_quote(self.user.id, build_quote([{"product": self.dress.id, "size": "M", "quantity": 1}]))
+
+        response = self._legacy_verify(gateway.create_order(99800), quote_id=quote_id)
+        self.assertEqual(response.json()["error"], "quote does not match razorpay order")
+
+        order_id = gateway.create_order(49900)
+        response = self._legacy_verify(order_id, quote_id=quote_id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Order.objects.get(pk=response.json()["order_id"]).total_amount, Decimal("499.00"))
+
+    def test_out_of_stock_leaves_the_intent_unpaid(self):
+        ProductSize.objects.filter(product=self.dress).update(stock=1)
+        self.assertEqual(self._verify().status_code, 400)
+        self.intent.refresh_from_db()
+        self.assertEqual((self.intent.status, self.intent.razorpay_payment_id), ("CREATED", None))
+        self.assertFalse(Order.objects.exists())
+
+
+@override_settings(PAYMENT_GATEWAY="order.gateways.FakeGateway")
+class PaymentWebhookTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="buyer@example.com", name="Buyer", phone_number="9876543210", password="pass12345",
+        )
+        self.dress = _make_product("Maxi dress", {"M": 5})
+        quote = build_quote([{"product": self.dress.id, "size": "M", "quantity": 2, "shipping_address": "MG Road"}])
+        self.intent = PaymentIntent.objects.create(
+            user=self.user, razorpay_order_id="order_1", lines=quote["lines"],
+            total=Decimal(quote["total"]), amount_paise=quote["amount_paise"],
+        )
+
+    def _deliver(self, event_id, order_id="order_1", payment_id="pay_1", amount=99800,
+                 event="payment.captured", signature=None):
+        body = json.dumps({
+            "event": event,
+            "payload": {"payment": {"entity": {"id": payment_id, "order_id": order_id, "amount": amount}}},
+        }).encode()
+        return APIClient().post(
+            "/api/v1/order/webhooks/razorpay/", body, content_type="application/json",
+            HTTP_X_RAZORPAY_SIGNATURE=signature or webhook_signature("fake_secret", body),
+            HTTP_X_RAZORPAY_EVENT_ID=event_id,
+        )
+
+    def test_bad_signature_is_rejected(self):
+        response = self._deliver("evt_1", signature="forged")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PaymentWebhookEvent.objects.exists())
+
+    def test_redelivery_is_stored_once(self):
+        self.assertEqual(self._deliver("evt_1").json()["status"], "queued")
+        self.assertEqual(self._deliver("evt_1").json()["status"], "duplicate")
+        self.assertEqual(PaymentWebhookEvent.objects.count(), 1)
+
+    def test_batch_creates_the_order_and_verify_returns_it(self):
+        self._deliver("evt_1")
+        self._deliver("evt_2", event="order.paid")  # same payment, second event type
+        self.assertEqual(process_webhook_events(), 2)
+        self.assertEqual(process_webhook_events(), 0)
+
+        outcomes = dict(PaymentWebhookEvent.objects.values_list("event_id", "outcome"))
+        self.assertEqual(outcomes, {"evt_1": "created", "evt_2": "confirmed"})
+        self.intent.refresh_from_db()
+        self.assertEqual((self.intent.status, self.intent.razorpay_payment_id), ("PAID", "pay_1"))
+        self.assertEqual(_stock(self.dress, "M"), 3)
+
+        # the client coming back late gets the webhook's order, not a second one
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post("/api/v1/order/checkout/razorpay/verify/", {
+            "razorpay_payment_id": "pay_1", "razorpay_order_id": "order_1",
+            "razorpay_signature": payment_signature("fake_secret", "order_1", "pay_1"),
+        }, format="json")
+        self.assertEqual(response.json()["order_id"], self.intent.order_id)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_unusable_events_are_marked_and_skipped(self):
+        self._deliver("evt_1", amount=100)
+        self._deliver("evt_2", order_id="order_x")
+        self._deliver("evt_3", event="payment.failed")
+        process_webhook_events()
+        outcomes = dict(PaymentWebhookEvent.objects.values_list("event_id", "outcome"))
+        self.assertEqual(outcomes, {"evt_1": "amount_mismatch", "evt_2": "no_intent", "evt_3": "ignored"})
+        self.assertFalse(Order.objects.exists())
+
+    def test_a_failing_event_does_not_block_the_batch(self):
+        body = json.dumps({"event": "payment.captured", "payload": {"payment": ["malformed"]}}).encode()
+        record_event("evt_0", body, json.loads(body))
+        self._deliver("evt_1")
+        self._deliver("evt_2", event="order.paid")
+
+        real_complete = complete_payment_intent
+        calls = []
+
+        def flaky(intent, payment_id):
+            calls.append(payment_id)
+            if len(calls) == 1:
+                real_complete(intent, payment_id)  # writes, then blows up: must be rolled back
+                raise KeyError("lines")
+            return real_complete(intent, payment_id)
+
+        with mock.patch("order.webhooks.complete_payment_intent", side_effect=flaky), \
+                self.assertLogs("order.webhooks", "ERROR"):
+            self.assertEqual(process_webhook_events(), 3)
+        outcomes = dict(PaymentWebhookEvent.objects.values_list("event_id", "outcome"))
+        self.assertEqual(outcomes, {"evt_0": "ignored", "evt_1": "error", "evt_2": "created"})
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(_stock(self.dress, "M"), 3)
+        self.assertEqual(process_webhook_events(), 0)
+
+    def test_a_transient_failure_is_retried(self):
+        self._deliver("evt_1")
+        self._deliver("evt_2", event="payment.failed")
+        with mock.patch("order.webhooks.complete_payment_intent", side_effect=OperationalError("deadlock detected")), \
+                self.assertLogs("order.webhooks", "WARNING"):
+            self.assertEqual(process_webhook_events(), 1)
+        event = PaymentWebhookEvent.objects.get(event_id="evt_1")
+        self.assertEqual((event.outcome, event.processed_at), ("", None))
+        self.assertFalse(Order.objects.exists())
+
+        # the next run picks it up again
+        self.assertEqual(process_webhook_events(), 1)
+        outcomes = dict(PaymentWebhookEvent.objects.values_list("event_id", "outcome"))
+        self.assertEqual(outcomes, {"evt_1": "created", "evt_2": "ignored"})
+        self.assertEqual(_stock(self.dress, "M"), 3)
+
+
+@override_settings(PAYMENT_GATEWAY="order.gateways.FakeGateway")
+class AsyncCheckoutTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="buyer@example.com", name="Buyer", phone_number="9876543210", password="pass12345",
+        )
+        self.auth = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+        self.dress = _make_product("Maxi dress", {"M": 5})
+
+    def _post(self, url, payload, headers=None):
+        # the ASGI request path; under WSGI the sync views answer instead
+        return async_to_sync(self.async_client.post)(url, payload, content_type="application/json", headers=headers)
+
+    def test_create_and_verify(self):
+        orders = [{"product": self.dress.id, "size": "M", "quantity": 2}]
+        created = self._post("/api/v1/order/checkout/razorpay/async/create/", {"orders": orders}, self.auth)
+        self.assertEqual(created.status_code, 201)
+        self.assertEqual(created.json()["amount"], 99800)
+
+        order_id = created.json()["razorpay_order_id"]
+        payment_id, signature = FakeGateway().pay(order_id)
+        payload = {"razorpay_order_id": order_id, "razorpay_payment_id": payment_id, "razorpay_signature": signature}
+        verified = self._post("/api/v1/order/checkout/razorpay/async/verify/", payload, self.auth)
+        self.assertEqual(verified.status_code, 200)
+        self.assertEqual(Order.objects.get(pk=verified.json()["order_id"]).user, self.user)
+        self.assertEqual(_stock(self.dress, "M"), 3)
+
+        again = self._post("/api/v1/order/checkout/razorpay/async/verify/", payload, self.auth)
+        self.assertEqual(again.json()["order_id"], verified.json()["order_id"])
+
+    def test_requires_authentication(self):
+        response = self._post("/api/v1/order/checkout/razorpay/async/create/", {"orders": []})
+        self.assertEqual(response.status_code, 401)
+        response = self._post(
+            "/api/v1/order/checkout/razorpay/async/create/", {"orders": []}, {"Authorization": "Bearer nope"},
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_wsgi_requests_go_to_the_sync_view(self):
+        orders = [{"product": self.dress.id, "size": "M", "quantity": 2}]
+        with mock.patch.object(FakeGateway, "acreate_order") as acreate_order:
+            response = self.client.post(
+                "/api/v1/order/checkout/razorpay/async/create/", {"orders": orders},
+                content_type="application/json", headers=self.auth,
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["amount"], 99800)
+        acreate_order.assert_not_called()
+        self.assertTrue(PaymentIntent.objects.filter(razorpay_order_id=response.json()["razorpay_order_id"]).exists())
+
+
+@override_settings(PAYMENT_GATEWAY_HTTP={
+    "timeout": 1, "connect_timeout": 1, "retries": 2, "backoff": 0,
+    "max_connections": 10, "max_keepalive_connections": 5,
+})
+class AsyncRazorpayGatewayTests(TestCase):
+    def _gateway(self, responses):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            response = responses[min(len(calls), len(responses)) - 1]
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        return RazorpayGateway(key_id="rzp_test", key_secret="secret", transport=httpx.MockTransport(handler)), calls
+
+    def test_retries_server_errors_and_timeouts(self):
+        gateway, calls = self._gateway([
+            httpx.Response(503),
+            httpx.ConnectTimeout("slow"),
+            httpx.Response(200, json={"id": "order_1"}),
+        ])
+        self.assertEqual(run_async(gateway.acreate_order)(99800), "order_1")
+        self.assertEqual(len(calls), 3)
+        self.assertTrue(calls[0].headers["authorization"].startswith("Basic "))
+
+    def test_gives_up_after_retries(self):
+        gateway, calls = self._gateway([httpx.Response(502)])
+        with self.assertRaisesMessage(GatewayError, "after 3 attempts"):
+            run_async(gateway.acreate_order)(99800)
+        self.assertEqual(len(calls), 3)
+
+    def test_client_errors_are_not_retried(self):
+        gateway, calls = self._gateway([httpx.Response(400, json={"error": "bad amount"})])
+        with self.assertRaises(GatewayError):
+            run_async(gateway.acreate_order)(0)
+        self.assertEqual(len(calls), 1)
+
+    def test_client_is_reused_on_a_loop_and_closed_when_the_loop_changes(self):
+        gateway, calls = self._gateway([httpx.Response(200, json={"id": "order_1"})])
+
+        async def two_orders():
+            await gateway.acreate_order(99800)
+            first = gateway._async_client
+            await gateway.acreate_order(99800)
+            return first, gateway._async_client
+
+        first, second = asyncio.run(two_orders())
+        self.assertIs(first, second)
+        self.assertFalse(first.is_closed)
+
+        # a new loop (async_to_sync under WSGI): a new client, the old one closed
+        asyncio.run(gateway.acreate_order(99800))
+        self.assertIsNot(gateway._async_client, first)
+        self.assertTrue(first.is_closed)
+        self.assertEqual(len(calls), 3)
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class NotificationOutboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="buyer@example.com", name="Buyer", phone_number="9876543210", password="pass12345",
+        )
+        self.order = Order.objects.create(user=self.user, total_amount=499)
+        cache.clear()
+
+    def test_status_change_is_queued_not_sent(self):
+        self.order.order_status = "SHIPPED"
+        self.order.save(update_fields=["order_status", "updated_at"])
+        event = NotificationOutbox.objects.get()
+        self.assertEqual(event.user_id, self.user.id)
+        self.assertEqual(event.payload["status"], "SHIPPED")
+
+    def test_rolled_back_change_queues_nothing(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.order.order_status = "SHIPPED"
+            self.order.save()
+            raise RuntimeError("rollback")
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_drain_sends_and_persists_notifications(self):
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(f"user_{self.user.id}", channel)
+        async_to_sync(socket_opened)(self.user.id)
+
+        self.order.order_status = "SHIPPED"
+        self.order.save()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(drain_outbox(), 1)
+        # nothing goes out before the inbox rows are committed
+        self.assertNotIn(channel, layer.channels)
+        for callback in callbacks:
+            callback()
+
+        message = async_to_sync(layer.receive)(channel)
+        self.assertEqual(message["type"], "send_notification")
+        self.assertEqual(message["data"]["order_id"], self.order.id)
+        self.assertFalse(NotificationOutbox.objects.exists())
+        self.assertEqual(Notification.objects.get(user=self.user).message, f"Your order #{self.order.id} is now SHIPPED")
+        self.assertEqual(drain_outbox(), 0)
+
+    def test_offline_users_are_stored_not_sent(self):
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(f"user_{self.user.id}", channel)
+        async_to_sync(socket_opened)(self.user.id)
+        async_to_sync(socket_closed)(self.user.id)
+
+        self.order.order_status = "SHIPPED"
+        self.order.save()
+        with mock.patch("order.outbox.send_batch", wraps=send_batch) as send, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(drain_outbox(), 1)
+        send.assert_called_once_with([])
+        self.assertEqual(Notification.objects.get(user=self.user).payload["status"], "SHIPPED")
+
+    def test_rolled_back_batch_sends_nothing(self):
+        async_to_sync(socket_opened)(self.user.id)
+        self.order.order_status = "SHIPPED"
+        self.order.save()
+        with mock.patch("order.outbox.send_batch", wraps=send_batch) as send, \
+                self.assertRaises(RuntimeError), transaction.atomic():
+            drain_outbox()
+            raise RuntimeError("rollback")
+        send.assert_not_called()
+        self.assertTrue(NotificationOutbox.objects.exists())
+        self.assertFalse(Notification.objects.exists())
+
+    def test_failed_push_keeps_the_batch_stored(self):
+        async_to_sync(socket_opened)(self.user.id)
+        self.order.order_status = "SHIPPED"
+        self.order.save()
+        with mock.patch("order.outbox.send_batch", side_effect=ConnectionError("layer down")), \
+                self.assertLogs("order.outbox", "ERROR"), self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(drain_outbox(), 1)
+        self.assertFalse(NotificationOutbox.objects.exists())
+        self.assertEqual(Notification.objects.get(user=self.user).payload["status"], "SHIPPED")
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class AsgiStartupTests(SimpleTestCase):
+    def test_asgi_module_imports_in_a_fresh_interpreter(self):
+        # Daphne imports it before Django is set up; the test runner hides that
+        result = subprocess.run(
+            [sys.executable, "-c", "import django_dress.asgi"],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+class NotificationSocketAuthTests(TransactionTestCase):
+    # database_sync_to_async closes connections, which TestCase's transaction can't survive
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="buyer@example.com", name="Buyer", phone_number="9876543210", password="pass12345",
+        )
+        ws_middleware.users.clear()
+
+    def _connect(self, cookie):
+        async def connect():
+            communicator = WebsocketCommunicator(application, "/ws/order/notifications/", headers=[(b"cookie", cookie)])
+            connected, _ = await communicator.connect()
+            if connected:
+                await communicator.disconnect()
+            return connected
+        return async_to_sync(connect)()
+
+    def _cookie(self, user=None):
+        return f"theme=dark; access={AccessToken.for_user(user or self.user)}".encode()
+
+    def test_login_cookie_authenticates_and_user_is_cached(self):
+        self.assertTrue(self._connect(self._cookie()))
+        with self.assertNumQueries(0):
+            self.assertTrue(self._connect(self._cookie()))
+
+    def test_missing_or_forged_token_is_refused(self):
+        self.assertFalse(self._connect(b"theme=dark"))
+        self.assertFalse(self._connect(b"access=not-a-jwt"))
+
+    def test_ban_and_delete_evict_the_cached_user(self):
+        admin = User.objects.create_superuser(email="admin@example.com", password="pass12345")
+        client = APIClient()
+        client.force_authenticate(admin)
+        self.assertTrue(self._connect(self._cookie()))
+
+        client.post(f"/api/v1/admin/admin_user/{self.user.id}/toggle-ban/")
+        self.assertFalse(self._connect(self._cookie()))
+        client.post(f"/api/v1/admin/admin_user/{self.user.id}/toggle-ban/")
+        self.assertTrue(self._connect(self._cookie()))
+
+        cookie = self._cookie()
+        client.delete(f"/api/v1/admin/admin_user/{self.user.id}/")
+        self.assertFalse(self._connect(cookie))
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class NotificationReplayTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="buyer@example.com", name="Buyer", phone_number="9876543210", password="pass12345",
+        )
+        self.cookie = f"access={AccessToken.for_user(self.user)}".encode()
+        self.notifications = [
+            Notification.objects.create(user=self.user, message=f"event {i}", payload={"message": f"event {i}"})
+            for i in range(4)
+        ]
+        ws_middleware.users.clear()
+        cache.clear()
+
+    def _replayed(self, path):
+        async def connect():
+            communicator = WebsocketCommunicator(application, path, headers=[(b"cookie", self.cookie)])
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            events = []
+            while not await communicator.receive_nothing(timeout=0.2):
+                events.append(await communicator.receive_json_from())
+            await communicator.disconnect()
+            return events
+        return async_to_sync(connect)()
+
+    def test_replays_unread_events_after_the_cursor(self):
+        first, second, third, fourth = self.notifications
+        Notification.objects.filter(pk=third.pk).update(read=True)
+        events = self._replayed(f"/ws/order/notifications/?since={notification_cursor(first)}")
+        self.assertEqual([e["message"] for e in events], ["event 1", "event 3"])
+        self.assertTrue(all(e["replayed"] for e in events))
+        self.assertEqual(events[-1]["cursor"], notification_cursor(fourth))
+
+    def test_replay_is_opt_in(self):
+        self.assertEqual(len(self._replayed("/ws/order/notifications/?since=")), 4)
+        self.assertEqual(self._replayed("/ws/order/notifications/"), [])
+
+    def test_presence_follows_open_sockets(self):
+        async def scenario():
+            sockets = [
+                WebsocketCommunicator(application, "/ws/order/notifications/", headers=[(b"cookie", self.cookie)])
+                for _ in range(2)
+            ]
+            for socket in sockets:
+                await socket.connect()
+            online = [await sync_to_async(online_users)({self.user.id})]
+            for socket in sockets:
+                await socket.disconnect()
+                online.append(await sync_to_async(online_users)({self.user.id}))
+            return online
+        self.assertEqual(async_to_sync(scenario)(), [{self.user.id}, {self.user.id}, set()])
+
+    def test_replay_is_one_indexed_query(self):
+        with self.assertNumQueries(1):
+            unread_since(self.user.id, notification_cursor(self.notifications[0]))
+        self.assertEqual(unread_since(self.user.id, "garbage"), self.notifications)
+
+    def test_over_the_limit_replays_the_newest(self):
+        self.assertEqual(unread_since(self.user.id, limit=2), self.notifications[2:])
+        self.assertEqual(unread_since(self.user.id, notification_cursor(self.notifications[0]), limit=2),
+                         self.notifications[2:])
+
+    def test_read_notifications_stop_replaying(self):
+        async def mark_over_socket():
+            communicator = WebsocketCommunicator(
+                application, "/ws/order/notifications/", headers=[(b"cookie", self.cookie)],
+            )
+            await communicator.connect()
+            await communicator.send_json_to({"type": "read", "cursor": notification_cursor(self.notifications[1])})
+            reply = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return reply
+
+        self.assertEqual(async_to_sync(mark_over_socket)(), {"type": "read", "marked": 2})
+        self.assertEqual(
+            [e["message"] for e in self._replayed("/ws/order/notifications/?since=")], ["event 2", "event 3"],
+        )
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.post("/api/v1/order/notifications/read/", {"cursor": "garbage"}, format="json")
+                         .json(), {"marked": 0})
+        self.assertEqual(client.post("/api/v1/order/notifications/read/", {}, format="json").json(), {"marked": 2})
+        self.assertEqual(self._replayed("/ws/order/notifications/?since="), [])
+
+    def test_open_sockets_keep_their_presence(self):
+        async def scenario():
+            with mock.patch("order.consumers.refresh_interval", return_value=0.05):
+                communicator = WebsocketCommunicator(
+                    application, "/ws/order/notifications/", headers=[(b"cookie", self.cookie)],
+                )
+                await communicator.connect()
+                # the count expired while the socket stayed open (TTL passed / cache restart)
+                await cache.adelete(f"ws:presence:{self.user.id}")
+                await asyncio.sleep(0.2)
+                online = await sync_to_async(online_users)({self.user.id})
+                await communicator.disconnect()
+                return online
+        self.assertEqual(async_to_sync(scenario)(), {self.user.id})
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+    SSE_HEARTBEAT_INTERVAL=0.2,
+)
+class OrderEventStreamTests(TransactionTestCase):
+    # database_sync_to_async closes connections, which TestCase's transaction can't survive
+    url = "/api/v1/order/events/"
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="buyer@example.com", name="Buyer", phone_number="9876543210", password="pass12345",
+        )
+        self.auth = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+        self.notifications = [
+            Notification.objects.create(user=self.user, message=f"event {i}", payload={"message": f"event {i}"})
+            for i in range(3)
+        ]
+        ws_middleware.users.clear()
+        cache.clear()
+
+    @staticmethod
+    def _parse(chunk):
+        fields = dict(line.split(": ", 1) for line in chunk.decode().strip().splitlines() if not line.startswith(":"))
+        return fields.get("id"), json.loads(fields["data"])
+
+    def test_resumes_after_last_event_id_then_streams_live_events(self):
+        async def scenario():
+            response = await self.async_client.get(
+                self.url, headers={**self.auth, "Last-Event-ID": notification_cursor(self.notifications[0])},
+            )
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            self.assertEqual(response["Cache-Control"], "no-cache")
+            stream = aiter(response.streaming_content)
+            chunks = [await anext(stream) for _ in range(3)]
+
+            self.assertEqual(await sync_to_async(online_users)({self.user.id}), {self.user.id})
+            await get_channel_layer().group_send(
+                f"user_{self.user.id}",
+                {"type": "send_notification", "data": {"message": "live", "cursor": "1-99", "id": 99}},
+            )
+            chunks.append(await anext(stream))
+            chunks.append(await anext(stream))  # idle: heartbeat
+            await stream.aclose()
+            return chunks
+
+        retry, first, second, live, heartbeat = async_to_sync(scenario)()
+        self.assertEqual(retry, b"retry: 3000\n\n")
+        self.assertEqual(self._parse(first), (notification_cursor(self.notifications[1]), {
+            "message": "event 1", "id": self.notifications[1].id,
+            "cursor": notification_cursor(self.notifications[1]), "replayed": True,
+        }))
+        self.assertEqual(self._parse(second)[1]["message"], "event 2")
+        self.assertEqual(self._parse(live), ("1-99", {"message": "live", "cursor": "1-99", "id": 99}))
+        self.assertEqual(heartbeat, b": heartbeat\n\n")
+        self.assertEqual(online_users({self.user.id}), set())
+
+    def test_requires_a_valid_token(self):
+        async def scenario():
+            return [
+                (await self.async_client.get(self.url)).status_code,
+                (await self.async_client.get(self.url, headers={"Authorization": "Bearer forged"})).status_code,
+            ]
+        self.assertEqual(async_to_sync(scenario)(), [401, 401])
+
+    def test_cookie_auth_and_heartbeats_keep_one_receive(self):
+        layer = get_channel_layer()
+        real_receive = layer.receive
+        receives = []
+
+        async def counting_receive(channel):
+            receives.append(channel)
+            return await real_receive(channel)
+
+        async def scenario():
+            # no Authorization header: the cookie alone authenticates
+            self.async_client.cookies["access"] = str(AccessToken.for_user(self.user))
+            with mock.patch.object(layer, "receive", counting_receive):
+                response = await self.async_client.get(self.url)
+                stream = aiter(response.streaming_content)
+                chunks = [await anext(stream) for _ in range(3)]  # retry + two heartbeats
+                await layer.group_send(
+                    f"user_{self.user.id}",
+                    {"type": "send_notification", "data": {"message": "live", "cursor": "1-99", "id": 99}},
+                )
+                chunks.append(await anext(stream))
+                await stream.aclose()
+            return response.status_code, chunks
+
+        status_code, chunks = async_to_sync(scenario)()
+        self.assertEqual(status_code, 200)
+        self.assertEqual(chunks[1:3], [b": heartbeat\n\n"] * 2)
+        self.assertEqual(self._parse(chunks[3])[1]["message"], "live")
+        self.assertEqual(len(receives), 1)
+
+    def test_wsgi_answers_501(self):
+        self.client.credentials = None
+        response = self.client.get(self.url, HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+        self.assertEqual(response.status_code, 501)
+
+
+class ShardedChannelLayerTests(SimpleTestCase):
+    def test_ring_ignores_host_order_and_moves_few_groups(self):
+        hosts = [f"redis://10.0.0.{i}:6379" for i in range(1, 4)]
+        groups = [f"user_{i}" for i in range(3000)]
+
+        def placement(layer_hosts):
+            layer = ShardedRedisChannelLayer(hosts=layer_hosts)
+            return {g: layer.hosts[layer.consistent_hash(g)]["address"] for g in groups}
+
+        three = placement(hosts)
+        self.assertEqual(three, placement(list(reversed(hosts))))
+        per_host = [list(three.values()).count(h) for h in hosts]
+        self.assertGreater(min(per_host), 700)  # ~1000 each
+
+        four = placement(hosts + ["redis://10.0.0.4:6379"])
+        moved = [g for g in groups if three[g] != four[g]]
+        self.assertLess(len(moved), 1000)  # ~1/4 of the groups, all onto the new host
+        self.assertEqual({four[g] for g in moved}, {"redis://10.0.0.4:6379"})
+
+    def test_falls_back_to_a_bounded_local_layer_without_redis(self):
+        layer = ShardedRedisChannelLayer(hosts=["redis://127.0.0.1:1"], fallback_capacity=2, retry_after=60)
+
+        async def scenario():
+            channel = await layer.new_channel()
+            with self.assertLogs("django_dress.channel_layers", "WARNING"):
+                await layer.group_add("user_1", channel)
+            for n in range(5):
+                await layer.group_send("user_1", {"type": "send_notification", "data": {"n": n}})
+            received = [await layer.receive(channel), await layer.receive(channel)]
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(layer.receive(channel), 0.1)
+            return received
+
+        received = async_to_sync(scenario)()
+        self.assertEqual([m["data"]["n"] for m in received], [0, 1])
+        self.assertFalse(layer.available)
+
+    def test_redis_receive_survives_losing_the_race(self):
+        layer = ShardedRedisChannelLayer(hosts=["redis://127.0.0.1:1"])
+        channel = "specific.test!1"
+        calls, cancelled = [], []
+
+        async def scenario():
+            remote = asyncio.Queue()
+
+            async def redis_receive(self, channel):
+                calls.append(channel)
+                try:
+                    return await remote.get()
+                except asyncio.CancelledError:
+                    cancelled.append(channel)
+                    raise
+
+            with mock.patch.object(RedisChannelLayer, "receive", redis_receive):
+                await layer.fallback.send(channel, {"n": "local"})
+                first = await layer.receive(channel)
+                await asyncio.sleep(0)
+                after_local = (list(cancelled), len(layer._remote_receives))
+
+                remote.put_nowait({"n": "redis"})
+                second = await layer.receive(channel)
+
+                # the consumer going away cancels its receive: the Redis one goes with it
+                waiting = asyncio.ensure_future(layer.receive(channel))
+                await asyncio.sleep(0.05)
+                waiting.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await waiting
+            return first, after_local, second
+
+        first, after_local, second = async_to_sync(scenario)()
+        self.assertEqual((first["n"], second["n"]), ("local", "redis"))
+        self.assertEqual(after_local, ([], 1))  # still pending, not cancelled
+        self.assertEqual(calls, [channel, channel])
+        self.assertEqual(cancelled, [channel])
+        self.assertEqual(layer._remote_receives, {})
+
+
+class OrderStatusTrackingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="buyer@example.com", name="Buyer", phone_number="9876543210", password="pass12345",
+        )
+        self.order = Order.objects.create(user=self.user, total_amount=499)
+
+    def test_status_change_needs_no_extra_select(self):
+        order = Order.objects.get(pk=self.order.pk)
+        order.order_status = "SHIPPED"
+        # UPDATE + outbox INSERT, no SELECT of the old row
+        with self.assertNumQueries(2):
+            order.save(update_fields=["order_status", "updated_at"])
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+
+        # saving again without a change queues nothing
+        order.save()
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+
+    def test_other_field_updates_do_not_notify(self):
+        order = Order.objects.get(pk=self.order.pk)
+        order.shipping_address = "MG Road"
+        with self.assertNumQueries(1):
+            order.save(update_fields=["shipping_address"])
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_unloaded_instance_falls_back_to_lookup(self):
+        order = Order(
+            pk=self.order.pk, user=self.user, total_amount=499,
+            order_status="DELIVERED", created_at=self.order.created_at,
+        )
+        order.save()
+        self.assertEqual(NotificationOutbox.objects.get().payload["status"], "DELIVERED")
+
+    def test_bulk_status_update_queues_one_event_per_changed_order(self):
+        other = Order.objects.create(user=self.user, total_amount=10, order_status="SHIPPED")
+        changed = set_order_status(Order.objects.filter(pk__in=[self.order.pk, other.pk]), "SHIPPED")
+        self.assertEqual([pk for pk, _, _ in changed], [self.order.pk])
+        self.assertEqual(Order.objects.get(pk=self.order.pk).order_status, "SHIPPED")
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "row locking needs PostgreSQL")
+class ConcurrentReserveStockTests(TransactionTestCase):
+    """Many parallel checkouts against the same SKUs: no oversell, no deadlock."""
+
+    workers = 16
+
+    def _run_parallel(self, jobs):
+        barrier = threading.Barrier(len(jobs))
+        results = []
+        lock = threading.Lock()
+
+        def run(lines):
+            try:
+                barrier.wait()
+                with transaction.atomic():
+                    reserve_stock(lines)
+                outcome = "ok"
+            except StockReservationError:
+                outcome = "out_of_stock"
+            except Exception as exc:  # deadlocks surface here as OperationalError
+                outcome = repr(exc)
+            finally:
+                connection.close()
+            with lock:
+                results.append(outcome)
+
+        threads = [threading.Thread(target=run, args=(lines,)) for lines in jobs]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results
+
+    def test_same_sku_never_oversells(self):
+        dress = _make_product("Maxi dress", {"M": 5})
+        results = self._run_parallel([[(dress, "M", 1)]] * self.workers)
+        self.assertEqual(results.count("ok"), 5)
+        self.assertEqual(results.count("out_of_stock"), self.workers - 5)
+        self.assertEqual(_stock(dress, "M"), 0)
+
+    def test_opposite_line_order_does_not_deadlock(self):
+        dress = _make_product("Maxi dress", {"M": 100})
+        shirt = _make_product("Linen shirt", {"M": 100})
+        forward = [(dress, "M", 1), (shirt, "M", 1)]
+        backward = [(shirt, "M", 1), (dress, "M", 1)]
+        jobs = [forward if i % 2 else backward for i in range(self.workers)]
+        results = self._run_parallel(jobs)
+        self.assertEqual(results, ["ok"] * self.workers)
+        self.assertEqual(_stock(dress, "M"), 100 - self.workers)
+        self.assertEqual(_stock(shirt, "M"), 100 - self.workers)
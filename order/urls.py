@@ -1,15 +1,22 @@
 from django.urls import path
+from .async_views import order_events, razorpay_create_order_async, razorpay_verify_async
 from .views import (
     user_orders,
+    checkout_quote,
     cod_checkout,
+    notifications_read,
     razorpay_create_order,
     razorpay_verify,
+    razorpay_webhook,
     update_order_address,
 )
 
 urlpatterns = [
     path("my-orders/", user_orders, name="user_orders"),
 
+    # server-side pricing, reused by the razorpay steps
+    path("checkout/quote/", checkout_quote, name="checkout_quote"),
+
     # COD checkout
     path("checkout/cod/", cod_checkout, name="cod_checkout"),
 
@@ -17,6 +24,18 @@ urlpatterns = [
     path("checkout/razorpay/create/", razorpay_create_order, name="razorpay_create_order"),
     path("checkout/razorpay/verify/", razorpay_verify, name="razorpay_verify"),
 
+    # same, without holding a worker thread during the gateway round trip (ASGI)
+    path("checkout/razorpay/async/create/", razorpay_create_order_async, name="razorpay_create_order_async"),
+    path("checkout/razorpay/async/verify/", razorpay_verify_async, name="razorpay_verify_async"),
+
+    # gateway -> server payment events (orders for clients that never came back to verify)
+    path("webhooks/razorpay/", razorpay_webhook, name="razorpay_webhook"),
+
+    # order notifications as server-sent events (one-way alternative to the websocket)
+    path("events/", order_events, name="order_events"),
+    # stop replaying notifications the client has seen
+    path("notifications/read/", notifications_read, name="notifications_read"),
+
     # Update address
     path("<int:order_id>/update-address/", update_order_address, name="update_order_address"),
 
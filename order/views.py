@@ -1,37 +1,65 @@
 # orders/simple_views.py
-import razorpay
-from product.models import Product, ProductSize
+from product.models import ProductSize
 
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 from django.conf import settings
 from django.db import transaction
-from django.db.models import F
+from django.db.models import Prefetch, prefetch_related_objects
+from django.utils.dateparse import parse_datetime
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-import hmac, hashlib, traceback
+import hmac, hashlib, json, traceback
 from django.db import transaction, IntegrityError
 from product.models import Product
-from cart.models import CartItem
-from .models import Order, OrderItem, Notification
+from cart.store import get_cart_store
+from django_dress.pagination import KeysetPagination
+from .models import Order, OrderItem, Notification, PaymentIntent
+from .gateways import GatewayError, InvalidSignature, get_payment_gateway
+from .quotes import QuoteError, build_quote, get_quote, issue_quote
+from .outbox import mark_read
+from .webhooks import record_event
+from .services import PaymentConflictError, StockReservationError, complete_payment_intent, order_summary, reserve_stock
 from .serializers import (    
     CheckoutOrderSerializer,
+    OrderListSerializer,
     UserOrderSerializer,
 )
 
-# simple client (uses keys from settings.py)
-razorpay_client = razorpay.Client(
-    auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
-)
+
+class UserOrderPagination(KeysetPagination):
+    # served by the (user_id, created_at, id) index on Order
+    ordering = ("-created_at", "-id")
+    max_page_size = 50
+
+
+def _filter_user_orders(qs, params):
+    """Apply the order history filters in `params`; -> (qs, error message or None)."""
+    for field, choices in (("order_status", Order.ORDER_STATUS_CHOICES), ("payment_status", Order.PAYMENT_STATUS_CHOICES)):
+        value = params.get(field)
+        if value:
+            if value not in {choice[0] for choice in choices}:
+                return qs, f"Invalid {field}"
+            qs = qs.filter(**{field: value})
+    for field, lookup in (("created_after", "created_at__gte"), ("created_before", "created_at__lt")):
+        if params.get(field):
+            value = parse_datetime(params[field])
+            if value is None:
+                return qs, f"{field} must be an ISO datetime"
+            qs = qs.filter(**{lookup: value})
+    return qs, None
 
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def user_orders(request):
     """
-    GET /api/orders/           -> list all user's orders
-    GET /api/orders/?order_id= -> single order (optional)
+    GET /api/orders/           -> user's orders, newest first, as keyset pages of summary rows
+        ?order_status=SHIPPED&payment_status=PAID
+        &created_after=2025-01-01T00:00:00Z&created_before=...  (ISO datetimes, [after, before))
+        &page_size=20 (max 50), then follow `next`; ?count=estimated|exact adds a count
+    GET /api/orders/?order_id= -> single order with its items
     """
     order_id = request.query_params.get("order_id")
     if order_id:
@@ -43,11 +71,37 @@ def user_orders(request):
             return Response({"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
         return Response(UserOrderSerializer(order).data)
 
-    orders = Order.objects.filter(user=request.user).prefetch_related("items__product").order_by("-created_at")
-    return Response(UserOrderSerializer(orders, many=True).data)
+    orders, error = _filter_user_orders(Order.objects.filter(user=request.user), request.query_params)
+    if error:
+        return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+    paginator = UserOrderPagination()
+    page = paginator.paginate_queryset(orders, request)
+    return paginator.get_paginated_response(OrderListSerializer(page, many=True).data)
+
+
+# price a checkout once; create / verify reuse the quote by id
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def checkout_quote(request):
+    """
+    POST /api/v1/order/checkout/quote/
+    Body: { "orders": [ ... ] }
+    Returns line totals, discounts, the grand total and a signed quote_id
+    valid for settings.ORDER_QUOTE_TTL seconds.
+    """
+    try:
+        quote = build_quote(request.data.get("orders"))
+    except QuoteError as e:
+        return Response({"error": str(e)}, status=e.status_code)
+    quote_id = issue_quote(request.user.id, quote)
+    return Response(
+        {"quote_id": quote_id, "expires_in": settings.ORDER_QUOTE_TTL, **quote},
+        status=status.HTTP_201_CREATED,
+    )
 
 
-# COD checkout (safe field handling)
+# COD checkout: constant number of queries for any cart size
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def cod_checkout(request):
@@ -55,57 +109,155 @@ def cod_checkout(request):
     if not orders_payload:
         return Response({"error": "orders payload required"}, status=status.HTTP_400_BAD_REQUEST)
 
-    prod_ids = [o["product"] for o in orders_payload]
-    products = Product.objects.filter(id__in=prod_ids)
-    product_map = {p.id: p for p in products}
-
-    created_orders = []
-    total_amount = 0
-
-    order_field_names = {f.name for f in Order._meta.get_fields()}
-
-    with transaction.atomic():
-        for o in orders_payload:
-            p = product_map.get(o["product"])
-            if not p:
-                return Response({"error": f"Product {o['product']} not found"}, status=status.HTTP_404_NOT_FOUND)
-
-            qty = int(o.get("quantity", 1))
-            price = getattr(p, "new_price", None)
-            if price is None:
-                price = getattr(p, "price", None) or getattr(p, "old_price", 0)
-            total_amount += price * qty
-
-            # build order instance without optional fields
-            order = Order(
-                user=request.user,
-                total_amount=price * qty,
-                shipping_address=o.get("shipping_address", ""),
-                phone=o.get("phone", ""),
-            )
+    # price and validate every line before opening the transaction
+    try:
+        quote = build_quote(orders_payload)
+    except QuoteError as e:
+        return Response({"error": str(e)}, status=e.status_code)
 
-            # only set optional fields if they exist on the model
-            if "payment_status" in order_field_names:
-                setattr(order, "payment_status", "PENDING")
-            if "payment_method" in order_field_names:
-                setattr(order, "payment_method", "COD")
-
-            order.save()
-            # use bulk create
-            OrderItem.objects.create(
-                order=order,
-                product=p,
-                size=o.get("size", ""),
-                quantity=qty,
-                price=price,
-            )
+    lines = quote["lines"]
+    for line in lines:
+        if not line["size"]:
+            return Response({"error": f"size required for product {line['product']}"}, status=status.HTTP_400_BAD_REQUEST)
+    prod_ids = [line["product"] for line in lines]
 
-            created_orders.append(order)
+    try:
+        with transaction.atomic():
+            reserve_stock([(line["product"], line["size"], line["quantity"]) for line in lines])
+
+            # one Order per line (existing contract), ids come back from the INSERT
+            created_orders = Order.objects.bulk_create([
+                Order(
+                    user=request.user,
+                    total_amount=Decimal(line["line_total"]),
+                    payment_status="PENDING",
+                    shipping_address=line["shipping_address"],
+                    phone=line["phone"],
+                    **order_summary([line]),
+                )
+                for line in lines
+            ])
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order, product_id=line["product"], size=line["size"],
+                    quantity=line["quantity"], price=Decimal(line["unit_price"]),
+                )
+                for order, line in zip(created_orders, lines)
+            ])
+
+            get_cart_store().remove_products(request.user.id, prod_ids)
+    except StockReservationError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    prefetch_related_objects(
+        created_orders,
+        Prefetch("items", queryset=OrderItem.objects.select_related("product__category")),
+        Prefetch("items__product__sizes", queryset=ProductSize.objects.select_related("size")),
+    )
+    serializer = CheckoutOrderSerializer(created_orders, many=True)
+    return Response({"message": "Orders placed (COD)", "orders": serializer.data, "total_amount": Decimal(quote["total"])}, status=status.HTTP_201_CREATED)
 
-        CartItem.objects.filter(user=request.user, product_id__in=prod_ids).delete()
 
-    serializer = CheckoutOrderSerializer(created_orders, many=True)
-    return Response({"message": "Orders placed (COD)", "orders": serializer.data, "total_amount": total_amount}, status=status.HTTP_201_CREATED)
+# shared by the sync views below and their async variants (async_views.py)
+def _checkout_quote(user_id, data):
+    """(quote, quote_id, orders_payload) for a create request; raises QuoteError."""
+    quote_id = data.get("quote_id")
+    orders_payload = data.get("orders")
+    if quote_id:
+        return get_quote(quote_id, user_id), quote_id, orders_payload
+    if not orders_payload:
+        raise QuoteError("orders payload required")
+    quote = build_quote(orders_payload)
+    return quote, issue_quote(user_id, quote), orders_payload
+
+
+def _intent_fields(user_id, razorpay_order_id, quote):
+    # verify works from this row, not from anything the client sends back
+    return {
+        "user_id": user_id,
+        "razorpay_order_id": razorpay_order_id,
+        "lines": quote["lines"],
+        "total": Decimal(quote["total"]),
+        "amount_paise": quote["amount_paise"],
+        "currency": quote["currency"],
+    }
+
+
+def _create_payload(gateway, razorpay_order_id, quote, quote_id, orders_payload):
+    return {
+        "message": "Razorpay order created",
+        "razorpay_order_id": razorpay_order_id,
+        "razorpay_key": gateway.key_id,
+        "amount": quote["amount_paise"],
+        "currency": quote["currency"],
+        "quote_id": quote_id,
+        "orders_payload": orders_payload or quote["lines"],
+    }
+
+
+def _amount_mismatch(intent, client_amount):
+    # amount, when sent, is the one create returned (paise), or the total in rupees
+    # ("1299", "1299.0" and 1299 all match a 1299.00 total)
+    if client_amount is None:
+        return None
+    try:
+        amount = Decimal(str(client_amount))
+    except InvalidOperation:
+        amount = None
+    if amount is not None and amount in (Decimal(intent.amount_paise), Decimal(intent.total)):
+        return None
+    return {
+        "error": "amount_mismatch",
+        "message": "Client amount does not match server computed total",
+        "client_amount": str(client_amount),
+        "server_total": str(intent.total)
+    }
+
+
+def _legacy_intent(user_id, razorpay_order_id, data):
+    """
+    Razorpay orders created before payment intents were stored have no
+    PaymentIntent row. Price them from the quote_id / orders_payload the client
+    sends back, as verify used to, and accept that only if it comes to what the
+    gateway order was created for. Returns an unsaved PaymentIntent, or None
+    when the request carries neither; raises QuoteError.
+    Only needed until those gateway orders have expired.
+    """
+    quote_id = data.get("quote_id")
+    orders_payload = data.get("orders_payload")
+    if quote_id:
+        quote = get_quote(quote_id, user_id)
+    elif orders_payload:
+        quote = build_quote(orders_payload)
+    else:
+        return None
+    try:
+        charged = get_payment_gateway().order_amount(razorpay_order_id)
+    except GatewayError as e:
+        raise QuoteError(f"payment gateway error: {e}", status_code=502) from e
+    if charged != quote["amount_paise"]:
+        raise QuoteError("quote does not match razorpay order")
+    return PaymentIntent(**_intent_fields(user_id, razorpay_order_id, quote))
+
+
+def _saved_intent(intent):
+    """Store a legacy intent once its signature checked out (a concurrent verify may have already)."""
+    if intent.pk is not None:
+        return intent
+    saved, _ = PaymentIntent.objects.get_or_create(
+        razorpay_order_id=intent.razorpay_order_id,
+        user_id=intent.user_id,
+        defaults={
+            "lines": intent.lines, "total": intent.total,
+            "amount_paise": intent.amount_paise, "currency": intent.currency,
+        },
+    )
+    return saved
+
+
+def _verify_payload(order, created):
+    detail = "Payment verified and order created" if created else "Payment already verified"
+    return {"detail": detail, "order_id": order.id}
 
 
 # razorpay create (no stock checks)
@@ -114,224 +266,117 @@ def cod_checkout(request):
 def razorpay_create_order(request):
     """
     POST /api/v1/order/checkout/razorpay/create/
-    Body: { "orders": [ ... ] }
-    Returns: razorpay_order_id, key, amount (in paise)
+    Body: { "quote_id": "..." } (from checkout/quote/) or { "orders": [ ... ] }
+    Returns: razorpay_order_id, key, amount (in paise), quote_id
     """
-    orders_payload = request.data.get("orders")
-    if not orders_payload:
-        return Response({"error": "orders payload required"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        quote, quote_id, orders_payload = _checkout_quote(request.user.id, request.data)
+    except QuoteError as e:
+        return Response({"error": str(e)}, status=e.status_code)
 
-    # build products map and calculate total (no stock checks)
-    prod_ids = [o["product"] for o in orders_payload]
-    products = Product.objects.filter(id__in=prod_ids)
-    product_map = {p.id: p for p in products}
+    gateway = get_payment_gateway()
+    try:
+        razorpay_order_id = gateway.create_order(quote["amount_paise"], quote["currency"])
+    except GatewayError as e:
+        return Response({"error": "payment_gateway_error", "detail": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
 
-    total = 0
-    for o in orders_payload:
-        p = product_map.get(o["product"])
-        if not p:
-            return Response({"error": f"Product {o['product']} not found"}, status=status.HTTP_404_NOT_FOUND)
+    PaymentIntent.objects.create(**_intent_fields(request.user.id, razorpay_order_id, quote))
 
-        qty = int(o.get("quantity", 1))
+    return Response(
+        _create_payload(gateway, razorpay_order_id, quote, quote_id, orders_payload),
+        status=status.HTTP_201_CREATED,
+    )
 
-        # use new_price if exists, else price, else old_price
-        price = getattr(p, "new_price", None)
-        if price is None:
-            price = getattr(p, "price", None) or getattr(p, "old_price", 0)
 
-        total += price * qty
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def razorpay_verify(request):
+    """
+    POST /api/v1/order/checkout/razorpay/verify/
+    Body: { razorpay_payment_id, razorpay_order_id, razorpay_signature, amount? }
+    (+ quote_id or orders_payload for gateway orders created before intents were stored)
+    Safe to retry: the same payment always answers with the same order.
+    """
+    payment_id = request.data.get("razorpay_payment_id")
+    order_id = request.data.get("razorpay_order_id")
+    signature = request.data.get("razorpay_signature")
 
-    amount_paise = int(total * 100)
+    if not all([payment_id, order_id, signature]):
+        return Response({"error": "missing fields"}, status=status.HTTP_400_BAD_REQUEST)
 
-    razorpay_order = razorpay_client.order.create({
-        "amount": amount_paise,
-        "currency": "INR",
-        "payment_capture": 1
-    })
+    # one indexed lookup: lines and amount were priced when the order was created
+    intent = PaymentIntent.objects.filter(razorpay_order_id=order_id, user=request.user).first()
+    if intent is None:
+        try:
+            intent = _legacy_intent(request.user.id, order_id, request.data)
+        except QuoteError as e:
+            return Response({"error": str(e)}, status=e.status_code)
+    if intent is None:
+        return Response({"error": "unknown razorpay order"}, status=status.HTTP_404_NOT_FOUND)
 
-    return Response({
-        "message": "Razorpay order created",
-        "razorpay_order_id": razorpay_order["id"],
-        "razorpay_key": settings.RAZORPAY_KEY_ID,
-        "amount": amount_paise,
-        "currency": "INR",
-        "orders_payload": orders_payload,
-    }, status=status.HTTP_201_CREATED)
+    mismatch = _amount_mismatch(intent, request.data.get("amount", None))
+    if mismatch:
+        return Response(mismatch, status=status.HTTP_400_BAD_REQUEST)
 
+    # verify signature (HMAC of order_id|payment_id with the gateway secret)
+    try:
+        get_payment_gateway().verify_signature(order_id, payment_id, signature)
+    except InvalidSignature:
+        return Response({"error": "signature verification failed"}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception:
+        traceback.print_exc()
+        return Response({"error": "signature verification error"}, status=status.HTTP_400_BAD_REQUEST)
 
+    try:
+        order, created = complete_payment_intent(_saved_intent(intent), payment_id)
+    except StockReservationError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except PaymentConflictError as e:
+        return Response({"error": "already_paid", "detail": str(e)}, status=status.HTTP_409_CONFLICT)
 
+    return Response(_verify_payload(order, created), status=status.HTTP_200_OK)
 
 
 @api_view(["POST"])
-@permission_classes([IsAuthenticated])
-def razorpay_verify(request):
+@authentication_classes([])
+@permission_classes([AllowAny])
+def razorpay_webhook(request):
+    """
+    POST /api/v1/order/webhooks/razorpay/
+    Verifies X-Razorpay-Signature over the raw body and stores the event;
+    `manage.py process_payment_webhooks` creates / confirms the orders.
+    Redelivered events (same X-Razorpay-Event-Id) are acknowledged and dropped.
+    """
+    body = request.body
     try:
-        payment_id = request.data.get("razorpay_payment_id")
-        order_id = request.data.get("razorpay_order_id")
-        signature = request.data.get("razorpay_signature")
-        orders_payload = request.data.get("orders_payload")
-        client_amount = request.data.get("amount", None)
-
-        if not all([payment_id, order_id, signature, orders_payload]):
-            return Response({"error": "missing fields"}, status=status.HTTP_400_BAD_REQUEST)
-
-        # normalize orders_payload
-        if isinstance(orders_payload, dict):
-            orders_payload = [orders_payload]
-        if not isinstance(orders_payload, list) or len(orders_payload) == 0:
-            return Response({"error": "orders_payload must be a non-empty list or object"}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Fetch products, map by id
-        prod_ids = []
-        for o in orders_payload:
-            try:
-                pid = int(o.get("product"))
-            except Exception:
-                return Response({"error": f"invalid product id in payload: {o.get('product')}"}, status=status.HTTP_400_BAD_REQUEST)
-            prod_ids.append(pid)
-
-        products = Product.objects.filter(id__in=prod_ids)
-        product_map = {p.id: p for p in products}
-
-        # compute expected total in rupees (Decimal)
-        expected_total = Decimal("0.00")
-        for o in orders_payload:
-            pid = int(o.get("product"))
-            p = product_map.get(pid)
-            if not p:
-                return Response({"error": f"Product {pid} not found"}, status=status.HTTP_404_NOT_FOUND)
-
-            qty = int(o.get("quantity", 1))
-            price = getattr(p, "new_price", None)
-            if price is None:
-                price = getattr(p, "price", None) or getattr(p, "old_price", 0)
-
-            try:
-                price_num = Decimal(str(price))
-            except Exception:
-                price_num = Decimal("0.00")
-
-            expected_total += price_num * qty
-
-        # interpret client_amount if provided (try to detect paise vs rupees)
-        client_amount_rupees = None
-        if client_amount is not None:
-            try:
-                client_amount_int = int(client_amount)
-                if client_amount_int > (expected_total * Decimal(10)):
-                    client_amount_rupees = Decimal(client_amount_int) / Decimal(100)
-                else:
-                    client_amount_rupees = Decimal(str(client_amount))
-            except Exception:
-                try:
-                    client_amount_rupees = Decimal(str(client_amount))
-                except Exception:
-                    client_amount_rupees = None
-
-        if client_amount_rupees is not None:
-            if round(client_amount_rupees, 2) != round(expected_total, 2):
-                return Response({
-                    "error": "amount_mismatch",
-                    "message": "Client amount does not match server computed total",
-                    "client_amount": str(client_amount_rupees),
-                    "server_total": str(expected_total)
-                }, status=status.HTTP_400_BAD_REQUEST)
-
-        # verify signature using razorpay utility
-        try:
-            razorpay_client.utility.verify_payment_signature({
-                "razorpay_order_id": order_id,
-                "razorpay_payment_id": payment_id,
-                "razorpay_signature": signature,
-            })
-        except razorpay.errors.SignatureVerificationError:
-            return Response({"error": "signature verification failed"}, status=status.HTTP_400_BAD_REQUEST)
-        except Exception:
-            traceback.print_exc()
-            return Response({"error": "signature verification error"}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Build order kwargs only with real model fields
-        order_field_names = {f.name for f in Order._meta.get_fields()}
-        order_kwargs = {"user": request.user}
-        if "total_amount" in order_field_names:
-            order_kwargs["total_amount"] = expected_total
-        if "payment_method" in order_field_names:
-            order_kwargs["payment_method"] = "RAZORPAY"
-        if "payment_status" in order_field_names:
-            order_kwargs["payment_status"] = "PAID"
-        if "razorpay_order_id" in order_field_names:
-            order_kwargs["razorpay_order_id"] = order_id
-        if "razorpay_payment_id" in order_field_names:
-            order_kwargs["razorpay_payment_id"] = payment_id
-
-        first = orders_payload[0] if len(orders_payload) else {}
-        if "shipping_address" in order_field_names and first.get("shipping_address"):
-            order_kwargs["shipping_address"] = first.get("shipping_address")
-        if "phone" in order_field_names and first.get("phone"):
-            order_kwargs["phone"] = first.get("phone")
-
-        # Create one Order and its OrderItems inside a transaction
-        try:
-            with transaction.atomic():
-                # 1) Lock all ProductSize rows needed and validate stock
-                # We'll collect tuples (product, size_name, qty) so we can create items after validation.
-                validation_items = []
-                for o in orders_payload:
-                    pid = int(o.get("product"))
-                    p = product_map.get(pid)
-                    qty = int(o.get("quantity", 1))
-                    size_name = o.get("size", "")
-                    if not size_name:
-                        return Response({"error": f"size required for product {pid}"}, status=status.HTTP_400_BAD_REQUEST)
-
-                    try:
-                        ps = ProductSize.objects.select_for_update().get(product=p, size__name=size_name)
-                    except ProductSize.DoesNotExist:
-                        return Response({"error": f"Size '{size_name}' not available for product {pid}"}, status=status.HTTP_400_BAD_REQUEST)
-
-                    if ps.stock < qty:
-                        return Response({"error": f"Insufficient stock for {p.name} size {size_name}"}, status=status.HTTP_400_BAD_REQUEST)
-
-                    validation_items.append((p, size_name, qty))
-
-                # 2) Create Order
-                order = Order.objects.create(**order_kwargs)
-
-                # 3) Create OrderItems and decrement stock (atomically using F)
-                for p, size_name, qty in validation_items:
-                    price = getattr(p, "new_price", None)
-                    if price is None:
-                        price = getattr(p, "price", None) or getattr(p, "old_price", 0)
-
-                    OrderItem.objects.create(
-                        order=order,
-                        product=p,
-                        size=size_name,
-                        quantity=qty,
-                        price=price,
-                    )
-
-                    ProductSize.objects.filter(product=p, size__name=size_name).update(stock=F("stock") - qty)
-
-                # 4) remove items from cart for this user (if using cart)
-                CartItem.objects.filter(user=request.user, product_id__in=prod_ids).delete()
-
-            return Response({"detail": "Payment verified and order created", "order_id": order.id}, status=status.HTTP_200_OK)
-
-        except IntegrityError as e:
-            traceback.print_exc()
-            return Response({"error": "database_integrity_error", "detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-        except Product.DoesNotExist:
-            traceback.print_exc()
-            return Response({"error": "product_not_found"}, status=status.HTTP_400_BAD_REQUEST)
-        except Exception as e:
-            traceback.print_exc()
-            return Response({"error": "verification_failed", "detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-
-    except Exception as e:
-        # any top-level unexpected error
-        traceback.print_exc()
-        return Response({"error": "server_error", "detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        get_payment_gateway().verify_webhook_signature(body, request.headers.get("X-Razorpay-Signature"))
+    except InvalidSignature:
+        return Response({"error": "signature verification failed"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return Response({"error": "invalid JSON"}, status=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(payload, dict):
+        return Response({"error": "invalid payload"}, status=status.HTTP_400_BAD_REQUEST)
+
+    stored = record_event(request.headers.get("X-Razorpay-Event-Id"), body, payload)
+    return Response({"status": "queued" if stored else "duplicate"}, status=status.HTTP_200_OK)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def notifications_read(request):
+    """
+    POST /api/v1/order/notifications/read/
+    Body: { "cursor": "<cursor of the last notification seen>" }  (omit: all)
+    Marks the notifications up to it read, so reconnects stop replaying them.
+    """
+    cursor = request.data.get("cursor")
+    if cursor is not None and not isinstance(cursor, str):
+        return Response({"error": "cursor must be a string"}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({"marked": mark_read(request.user.id, cursor)}, status=status.HTTP_200_OK)
+
 
 @api_view(["PATCH"])
 @permission_classes([IsAuthenticated])
@@ -0,0 +1,124 @@
+# order/webhooks.py
+"""
+Payment webhooks: the endpoint only verifies and stores the event (one INSERT,
+redeliveries ignored); orders are created or confirmed later, in batches, by
+`manage.py process_payment_webhooks` with the same code razorpay_verify uses.
+"""
+import hashlib
+import json
+import logging
+
+from django.db import InterfaceError, OperationalError, connection, transaction
+from django.utils import timezone
+
+from .models import PaymentIntent, PaymentWebhookEvent
+from .services import PaymentConflictError, StockReservationError, complete_payment_intent
+
+logger = logging.getLogger(__name__)
+
+# events that mean "this gateway order has been paid"
+PAYMENT_EVENTS = {"payment.captured", "order.paid"}
+
+
+def record_event(event_id, body, payload):
+    """
+    Append the event; returns False when it was already recorded.
+    Without an event id header the body hash stands in for it.
+    """
+    event_id = event_id or hashlib.sha256(body).hexdigest()
+    table = connection.ops.quote_name(PaymentWebhookEvent._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (event_id, event, payload, received_at, outcome) "
+            f"VALUES (%s, %s, %s::jsonb, %s, '') "
+            f"ON CONFLICT (event_id) DO NOTHING RETURNING id",
+            [event_id, str(payload.get("event", ""))[:100], json.dumps(payload), timezone.now()],
+        )
+        return cursor.fetchone() is not None
+
+
+def _payment_entity(payload):
+    # tolerant of malformed payloads: anything unexpected reads as "no payment"
+    for key in ("payload", "payment", "entity"):
+        payload = payload.get(key) if isinstance(payload, dict) else None
+    return payload if isinstance(payload, dict) else {}
+
+
+def _process(event):
+    if event.event not in PAYMENT_EVENTS:
+        return "ignored"
+    payment = _payment_entity(event.payload)
+    if not payment.get("id"):
+        return "ignored"
+    order_id = payment.get("order_id")
+    intent = PaymentIntent.objects.filter(razorpay_order_id=order_id).first() if isinstance(order_id, str) else None
+    if intent is None:
+        return "no_intent"
+    if payment.get("amount") != intent.amount_paise:
+        return "amount_mismatch"
+    try:
+        order, created = complete_payment_intent(intent, payment.get("id"))
+    except PaymentConflictError:
+        return "conflict"
+    except StockReservationError:
+        # paid but can't be fulfilled: left for refund / manual follow-up
+        return "out_of_stock"
+    return "created" if created else "confirmed"
+
+
+def _process_next(after_id):
+    """
+    Lock, handle and stamp the oldest unprocessed event past after_id, in a
+    transaction of its own. Returns the event (processed_at still None when a
+    transient error rolled it back), or None when nothing is pending.
+    """
+    event = None
+    try:
+        with transaction.atomic():
+            event = (
+                PaymentWebhookEvent.objects.select_for_update(skip_locked=True)
+                .filter(processed_at__isnull=True, id__gt=after_id)
+                .order_by("id")
+                .first()
+            )
+            if event is None:
+                return None
+            try:
+                with transaction.atomic():
+                    event.outcome = _process(event)
+            except (OperationalError, InterfaceError):
+                raise
+            except Exception:
+                # deterministic (malformed payload or intent data): a retry won't help
+                logger.exception("payment webhook %s failed", event.event_id)
+                event.outcome = "error"
+            event.processed_at = timezone.now()
+            event.save(update_fields=["outcome", "processed_at"])
+    except (OperationalError, InterfaceError):
+        if event is None:
+            raise  # couldn't read the queue at all: the caller retries later
+        # lock timeout, deadlock, lost connection: rolled back, the next run retries it
+        logger.warning("payment webhook %s deferred", event.event_id, exc_info=True)
+        event.outcome, event.processed_at = "", None
+    return event
+
+
+def process_webhook_events(batch_size=100):
+    """
+    Handle up to batch_size unprocessed events, oldest first; returns how many
+    were processed. Rows are locked with SKIP LOCKED so several workers can run
+    side by side.
+
+    Each event is committed in its own transaction, so the stock rows its order
+    locks are held for that event only. An unexpected error is logged and
+    recorded as outcome "error" (processed, so it can't block the queue); a
+    transient database error leaves the event unprocessed for the next run.
+    """
+    processed, after_id = 0, 0
+    for _ in range(batch_size):
+        event = _process_next(after_id)
+        if event is None:
+            break
+        after_id = event.id
+        processed += event.processed_at is not None
+    return processed
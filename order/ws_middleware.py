@@ -1,45 +1,109 @@
+import asyncio
+
 from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http.cookie import parse_cookie
 from channels.db import database_sync_to_async
-import jwt
-# Take the JWT from cookies, verify it, attach the user to the socket
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from django_dress.middleware.jwt_cookie_middleware import JWTAuthCookieMiddleware
+from django_dress.usercache import UserCache
+
+
+class SocketUser:
+    """What a socket needs to know about its user; cached instead of the full User row."""
+    __slots__ = ("id", "is_staff")
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, id, is_staff=False):
+        self.id = id
+        self.is_staff = is_staff
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __repr__(self):
+        return f"<SocketUser {self.id}>"
+
+
+# user id -> SocketUser, or None for unknown / banned / inactive ids
+users = UserCache(maxsize=settings.WS_AUTH_CACHE_SIZE, ttl=settings.WS_AUTH_CACHE_TTL)
+
+# user id -> in-flight load, so a user's sockets connecting together share one query
+_loading = {}
+
+
 @database_sync_to_async
-def get_user(user_id):
+def _load_user(user_id):
     from django.contrib.auth import get_user_model
-    from django.contrib.auth.models import AnonymousUser
 
-    User = get_user_model()
+    row = (
+        get_user_model().objects
+        .filter(id=user_id, is_active=True, is_banned=False)
+        .values_list("id", "is_staff")
+        .first()
+    )
+    return SocketUser(*row) if row else None
+
+
+async def _fetch_user(user_id):
+    try:
+        user = await _load_user(user_id)
+        users.set(user_id, user)
+        return user
+    finally:
+        del _loading[user_id]
+
+
+async def get_user(user_id):
+    user = users.get(user_id)
+    if user is UserCache.MISSING:
+        task = _loading.get(user_id)
+        if task is None:
+            task = _loading[user_id] = asyncio.ensure_future(_fetch_user(user_id))
+        # shielded: one socket giving up mustn't cancel the load for the others
+        user = await asyncio.shield(task)
+    return user or AnonymousUser()
+
+
+def _token_from_cookies(scope):
+    # same cookie names the HTTP side accepts (LoginView sets "access")
+    for name, value in scope.get("headers", []):
+        if name == b"cookie":
+            cookies = parse_cookie(value.decode("latin-1"))
+            for cookie_name in JWTAuthCookieMiddleware.COOKIE_NAMES:
+                if cookies.get(cookie_name):
+                    return cookies[cookie_name]
+    return None
+
+
+async def user_from_token(token):
+    """Cached user for a raw access JWT; AnonymousUser when it is missing or invalid."""
     try:
-        return User.objects.get(id=user_id)
-    except User.DoesNotExist:
+        user_id = int(AccessToken(token)[settings.SIMPLE_JWT.get("USER_ID_CLAIM", "user_id")])
+    except (TokenError, KeyError, TypeError, ValueError):
         return AnonymousUser()
+    return await get_user(user_id)
+
 
 class JWTAuthMiddleware:
+    """
+    Take the access JWT from the cookies, verify it and attach the user to the
+    socket scope. Users come from a per-process LRU + TTL cache, so reconnect
+    storms mostly skip the database and the sync thread pool.
+    """
+
     def __init__(self, inner):
         self.inner = inner
 
     async def __call__(self, scope, receive, send):
-        from django.contrib.auth.models import AnonymousUser
-
-        headers = dict(scope.get("headers", [])) # Get headers from scope
-        cookies = headers.get(b"cookie", b"").decode() # Decode cookies
-
-        token = None
-        for part in cookies.split(";"):
-            if part.strip().startswith("access_token="): # Look for access_token cookie
-                token = part.split("=", 1)[1] # Extract token value
-
-        if not token:
-            scope["user"] = AnonymousUser()
-            return await self.inner(scope, receive, send)
-
-        try:
-            payload = jwt.decode(
-                token,
-                settings.SECRET_KEY,
-                algorithms=["HS256"],
-            )
-            scope["user"] = await get_user(payload["user_id"])
-        except Exception:
-            scope["user"] = AnonymousUser()
+        scope = dict(scope, user=AnonymousUser())
+        token = _token_from_cookies(scope)
+        if token:
+            scope["user"] = await user_from_token(token)
 
         return await self.inner(scope, receive, send)
@@ -0,0 +1,100 @@
+# product/cache.py
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+# Every catalog write bumps this counter instead of deleting individual keys.
+# Cached responses embed the version in their key, so old entries simply stop
+# being read and expire on their own TTL.
+CATALOG_VERSION_KEY = "catalog:version"
+CATALOG_MODIFIED_KEY = "catalog:last_modified"
+
+
+def _catalog_timeout():
+    return getattr(settings, "CATALOG_CACHE_TIMEOUT", 300)
+
+
+def get_catalog_state():
+    """
+    Return (version, last_modified) for the product catalog.
+    Both are (re)initialised from the clock if the cache was flushed, so a
+    fresh version can never collide with one that is still cached.
+    """
+    state = cache.get_many([CATALOG_VERSION_KEY, CATALOG_MODIFIED_KEY])
+    version = state.get(CATALOG_VERSION_KEY)
+    last_modified = state.get(CATALOG_MODIFIED_KEY)
+    if version is None or last_modified is None:
+        now = int(time.time())
+        cache.add(CATALOG_VERSION_KEY, now * 1000, None)
+        cache.add(CATALOG_MODIFIED_KEY, now, None)
+        state = cache.get_many([CATALOG_VERSION_KEY, CATALOG_MODIFIED_KEY])
+        version = state.get(CATALOG_VERSION_KEY, now * 1000)
+        last_modified = state.get(CATALOG_MODIFIED_KEY, now)
+    return version, last_modified
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog response in O(1)."""
+    now = int(time.time())
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        # key missing (evicted / flushed): start again from the clock
+        cache.set(CATALOG_VERSION_KEY, now * 1000, None)
+    cache.set(CATALOG_MODIFIED_KEY, now, None)
+
+
+def catalog_cache_key(version, request, view, params):
+    """
+    Build the response cache key from the catalog version, the view action,
+    the url kwargs and only the query params that change the response
+    (sorted, so ?a=1&b=2 and ?b=2&a=1 share an entry).
+    """
+    query = sorted(
+        (name, value)
+        for name in params
+        for value in request.query_params.getlist(name)
+    )
+    kwargs = sorted((k, str(v)) for k, v in view.kwargs.items())
+    raw = repr((request.get_host(), view.action, kwargs, query))
+    digest = hashlib.sha1(raw.encode()).hexdigest()
+    return f"catalog:v{version}:{view.action}:{digest}"
+
+
+class CatalogCacheMixin:
+    """
+    Read-through response cache for public, user-independent catalog views.
+    Wrap a handler with `self.cached_response(request, handler)`; the handler
+    only runs on a cache miss. Adds ETag / Last-Modified so clients can
+    revalidate and get a 304 without the view touching the database.
+    """
+    catalog_cache_params = ()
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        version, last_modified = get_catalog_state()
+        key = catalog_cache_key(version, request, self, self.catalog_cache_params)
+        etag = f'"{key.rsplit(":", 1)[-1]}-{version}"'
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            not_modified["ETag"] = etag
+            not_modified["Last-Modified"] = http_date(last_modified)
+            return not_modified
+
+        data = cache.get(key)
+        if data is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            cache.set(key, response.data, _catalog_timeout())
+        else:
+            response = Response(data)
+
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        return response
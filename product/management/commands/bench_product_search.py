@@ -0,0 +1,93 @@
+# product/management/commands/bench_product_search.py
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from product.models import Category, Product
+from product.search import ProductSearchFilter, refresh_search_vectors
+
+WORDS = [
+    "floral", "summer", "maxi", "midi", "cotton", "linen", "silk", "denim", "party",
+    "casual", "striped", "printed", "wrap", "shirt", "dress", "skirt", "kurta", "saree",
+    "blue", "black", "white", "red", "green", "yellow", "pink", "beige", "navy", "classic",
+]
+CATEGORIES = ["Dresses", "Tops", "Bottoms", "Ethnic Wear", "Outerwear"]
+DEFAULT_QUERIES = ["dress", "floral maxi", "navy linen shirt", "drss", "summ"]
+BATCH_SIZE = 5000
+
+
+class _SearchView:
+    search_fields = ["name", "category__name"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare product search latency of DRF SearchFilter (icontains) against the "
+        "full-text/trigram ProductSearchFilter on synthetic catalogs. "
+        "Runs inside a transaction that is rolled back, so no data is kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000, 1_000_000])
+        parser.add_argument("--queries", nargs="+", default=DEFAULT_QUERIES)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--page-size", type=int, default=20)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("bench_product_search needs PostgreSQL (tsvector / pg_trgm).")
+
+        sizes = sorted(options["sizes"])
+        factory = APIRequestFactory()
+        rng = random.Random(42)
+
+        with transaction.atomic():
+            categories = [
+                Category.objects.get_or_create(name=f"bench {name}", defaults={"slug": f"bench-{i}"})[0]
+                for i, name in enumerate(CATEGORIES)
+            ]
+            created = 0
+            for size in sizes:
+                created = self._seed(categories, created, size, rng)
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE product_product")
+                self.stdout.write(self.style.MIGRATE_HEADING(f"\n{size:,} products"))
+                self.stdout.write(f"{'query':<20} {'SearchFilter ms':>16} {'FTS+trigram ms':>16} {'hits':>8}")
+                for term in options["queries"]:
+                    request = Request(factory.get("/", {"search": term}))
+                    base = Product.objects.select_related("category")
+                    old = SearchFilter().filter_queryset(request, base, _SearchView())
+                    new = ProductSearchFilter().filter_queryset(request, base, _SearchView())
+                    old_ms = self._time(old, options["page_size"], options["repeat"])
+                    new_ms = self._time(new, options["page_size"], options["repeat"])
+                    hits = len(new[: options["page_size"]])
+                    self.stdout.write(f"{term:<20} {old_ms:>16.2f} {new_ms:>16.2f} {hits:>8}")
+            transaction.set_rollback(True)
+
+    def _seed(self, categories, start, total, rng):
+        """Insert products up to `total` rows (numbered from `start`) and build their vectors."""
+        for offset in range(start, total, BATCH_SIZE):
+            batch = []
+            for i in range(offset, min(offset + BATCH_SIZE, total)):
+                name = " ".join(rng.sample(WORDS, 3))
+                batch.append(Product(
+                    category=rng.choice(categories), name=name,
+                    slug=f"bench-{i}", new_price=rng.randint(199, 4999),
+                ))
+            Product.objects.bulk_create(batch)
+        refresh_search_vectors(Product.objects.filter(slug__startswith="bench-", search_vector__isnull=True))
+        return total
+
+    def _time(self, queryset, page_size, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset[:page_size])
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
@@ -0,0 +1,42 @@
+# product/management/commands/recompute_ratings.py
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from product.cache import bump_catalog_version
+
+# one grouped pass over reviews; only products whose cached values drifted are written
+RECOMPUTE_SQL = """
+UPDATE product_product AS p
+SET rating_sum = agg.rating_sum,
+    review_count = agg.review_count,
+    avg_rating = agg.avg_rating
+FROM (
+    SELECT p2.id,
+           COALESCE(r.rating_sum, 0) AS rating_sum,
+           COALESCE(r.review_count, 0) AS review_count,
+           COALESCE(ROUND(r.rating_sum::numeric / NULLIF(r.review_count, 0), 1), 0) AS avg_rating
+    FROM product_product AS p2
+    LEFT JOIN (
+        SELECT product_id, SUM(rating) AS rating_sum, COUNT(*) AS review_count
+        FROM product_review
+        GROUP BY product_id
+    ) AS r ON r.product_id = p2.id
+) AS agg
+WHERE agg.id = p.id
+  AND (p.rating_sum <> agg.rating_sum
+       OR p.review_count <> agg.review_count
+       OR p.avg_rating <> agg.avg_rating)
+"""
+
+
+class Command(BaseCommand):
+    help = "Recompute Product rating_sum / review_count / avg_rating from reviews, fixing any drift."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(RECOMPUTE_SQL)
+                repaired = cursor.rowcount
+            if repaired:
+                transaction.on_commit(bump_catalog_version)
+        self.stdout.write(self.style.SUCCESS(f"Repaired ratings for {repaired} product(s)."))
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:31
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+BACKFILL_SEARCH_VECTOR = """
+UPDATE product_product AS p
+SET search_vector =
+    setweight(to_tsvector('english', coalesce(p.name, '')), 'A')
+    || setweight(to_tsvector('english', coalesce(
+        (SELECT c.name FROM product_category AS c WHERE c.id = p.category_id), ''
+    )), 'B')
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0005_product_product_created_id_idx'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='product_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunSQL(BACKFILL_SEARCH_VECTOR, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:41
+
+from django.db import migrations, models
+
+BACKFILL_RATING_SUM = """
+UPDATE product_product AS p
+SET rating_sum = r.rating_sum
+FROM (SELECT product_id, SUM(rating) AS rating_sum FROM product_review GROUP BY product_id) AS r
+WHERE r.product_id = p.id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0006_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunSQL(BACKFILL_RATING_SUM, migrations.RunSQL.noop),
+    ]
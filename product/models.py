@@ -1,5 +1,8 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.conf import settings
+from django_dress.tracking import TrackedFieldsMixin
 from django.utils.text import slugify
 from decimal import Decimal, ROUND_HALF_UP
 
@@ -39,15 +42,25 @@ class Product(models.Model):
     image = models.ImageField(upload_to="products/", blank=True, null=True)
     new_price = models.DecimalField(max_digits=10, decimal_places=2)
     old_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
-    # cached rating fields (kept in sync by signals)
+    # cached rating fields (kept in sync by signals with F() deltas, see signals.py)
     avg_rating = models.DecimalField(max_digits=3, decimal_places=1, default=0.0)
     review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     slug = models.SlugField(max_length=255, unique=True, blank=True)
+    # name + category name, maintained by signals (see product/search.py)
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # keyset pagination on (created_at, id)
+            models.Index(fields=["-created_at", "-id"], name="product_created_id_idx"),
+            # full-text search and typo-tolerant name matching
+            GinIndex(fields=["search_vector"], name="product_search_vector_idx"),
+            GinIndex(fields=["name"], name="product_name_trgm_idx", opclasses=["gin_trgm_ops"]),
+        ]
 
     def __str__(self):
         return self.name
@@ -106,7 +119,7 @@ class ProductSize(models.Model):
         return f"{self.product.name} - {self.size.name} ({self.stock})"
 
 
-class Review(models.Model):
+class Review(TrackedFieldsMixin, models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="reviews")
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="product_reviews")
     rating = models.PositiveSmallIntegerField()  # 1..5
@@ -114,6 +127,9 @@ class Review(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # old values for the incremental rating update on edit/delete
+    tracked_fields = ("rating", "product_id")
+
     class Meta:
         ordering = ["-created_at"]
         unique_together = ("product", "user")
@@ -0,0 +1,114 @@
+# product/search.py
+import re
+
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity,
+)
+from django.db import connections
+from django.db.models import F, OuterRef, Q, Subquery
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Category, Product
+
+# text search configuration used for both the stored vector and the queries
+SEARCH_CONFIG = "english"
+
+# websearch syntax is only needed for quoted phrases or "-excluded" words;
+# plain input is treated as a prefix query so results show up while typing
+_WEBSEARCH_SYNTAX = re.compile(r'"|(^|\s)-\w')
+_TOKEN = re.compile(r"\w+")
+
+
+def product_search_vector():
+    """
+    Expression for Product.search_vector: name (weight A) + category name (weight B).
+    Usable directly in .update(), the category name comes from a subquery.
+    """
+    category_name = Subquery(
+        Category.objects.filter(pk=OuterRef("category_id")).values("name")[:1]
+    )
+    return (
+        SearchVector("name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector(category_name, weight="B", config=SEARCH_CONFIG)
+    )
+
+
+def refresh_search_vectors(queryset):
+    """Recompute the stored vector for every product in queryset with one UPDATE."""
+    if connections[queryset.db].vendor != "postgresql":
+        return 0
+    return queryset.update(search_vector=product_search_vector())
+
+
+def build_search_query(term):
+    if _WEBSEARCH_SYNTAX.search(term):
+        return SearchQuery(term, search_type="websearch", config=SEARCH_CONFIG)
+    tokens = _TOKEN.findall(term)
+    if not tokens:
+        return None
+    # every word must match, the last one (or all of them) as a prefix: "blue dre" -> blue:* & dre:*
+    raw = " & ".join(f"{token}:*" for token in tokens)
+    return SearchQuery(raw, search_type="raw", config=SEARCH_CONFIG)
+
+
+def search_products(queryset, term):
+    """
+    Full-text match on the stored tsvector (GIN), falling back to trigram
+    word similarity on the name for typos (GIN, pg_trgm). Results are ordered by
+    rank then similarity; callers may re-order afterwards.
+    Non-Postgres databases get the old icontains behaviour.
+    """
+    term = (term or "").strip()
+    if not term:
+        return queryset
+
+    if connections[queryset.db].vendor != "postgresql":
+        return queryset.filter(Q(name__icontains=term) | Q(category__name__icontains=term))
+
+    query = build_search_query(term)
+    if query is None:
+        return queryset.none()
+
+    match = Q(search_vector=query)
+    if not _WEBSEARCH_SYNTAX.search(term):
+        # typo tolerance for plain input: "flral" still finds "Floral maxi dress"
+        match |= Q(name__trigram_word_similar=term)
+
+    return (
+        queryset.annotate(
+            search_rank=SearchRank(F("search_vector"), query),
+            name_similarity=TrigramWordSimilarity(term, "name"),
+        )
+        .filter(match)
+        .order_by("-search_rank", "-name_similarity", "-id")
+    )
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """
+    Drop-in replacement for SearchFilter on product views (?search=...).
+    Place it before OrderingFilter so an explicit ?ordering= still wins over rank.
+    """
+    search_param = "search"
+
+    def filter_queryset(self, request, queryset, view):
+        return search_products(queryset, request.query_params.get(self.search_param, ""))
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.search_param,
+                "required": False,
+                "in": "query",
+                "description": "Full-text search over product and category names (typo tolerant).",
+                "schema": {"type": "string"},
+            },
+        ]
+
+
+def autocomplete_products(term, limit=10):
+    """Small, rank-ordered suggestion list for a search box."""
+    term = (term or "").strip()
+    if not term:
+        return Product.objects.none()
+    return search_products(Product.objects.all(), term).only("id", "name", "slug")[:limit]
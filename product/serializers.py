@@ -40,7 +40,11 @@ class ProductSerializer(serializers.ModelSerializer):
 
     def get_sizes(self, obj):
         # return available sizes and stock (small list)
-        qs = obj.sizes.all().select_related("size")
+        # use the view's Prefetch when present; .select_related() here would discard it
+        if "sizes" in getattr(obj, "_prefetched_objects_cache", {}):
+            qs = obj.sizes.all()
+        else:
+            qs = obj.sizes.all().select_related("size")
         return [{"size": s.size.name, "stock": s.stock} for s in qs]
 
 
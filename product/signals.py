@@ -1,15 +1,84 @@
 # product/signals.py
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.db.models import Avg, Count
-from .models import Review, Product
+from django.db.models import Case, Count, DecimalField, F, Sum, Value, When
+from django.db.models.functions import Cast, Round
+from .cache import bump_catalog_version
+from .models import Review, Product, ProductSize, Category, Size
+from .search import refresh_search_vectors
 
+def apply_rating_delta(product_id, rating_delta, count_delta):
+    """
+    Shift a product's cached rating by a delta in one UPDATE; the average is
+    recomputed from the new sum/count in SQL, so concurrent writes can't race.
+    """
+    new_sum = F("rating_sum") + rating_delta
+    new_count = F("review_count") + count_delta
+    Product.objects.filter(pk=product_id).update(
+        rating_sum=new_sum,
+        review_count=new_count,
+        avg_rating=Case(
+            When(review_count__gt=-count_delta, then=Round(
+                Cast(new_sum, DecimalField(max_digits=12, decimal_places=4)) / new_count, 1,
+            )),
+            default=Value(0),
+            output_field=DecimalField(max_digits=3, decimal_places=1),
+        ),
+    )
+
+
+@receiver(post_save, sender=Review)
+def update_product_rating_on_review_save(sender, instance, created, **kwargs):
+    if created:
+        apply_rating_delta(instance.product_id, instance.rating, 1)
+        return
+    if not instance.is_tracking("rating"):
+        # built by hand with an existing pk: old rating unknown, re-aggregate this product
+        agg = Review.objects.filter(product_id=instance.product_id).aggregate(total=Sum("rating"), count=Count("id"))
+        Product.objects.filter(pk=instance.product_id).update(rating_sum=0, review_count=0, avg_rating=0)
+        apply_rating_delta(instance.product_id, agg["total"] or 0, agg["count"])
+        return
+
+    old_product_id = instance.get_loaded_value("product_id", instance.product_id)
+    old_rating = instance.get_loaded_value("rating")
+    if old_product_id != instance.product_id:
+        apply_rating_delta(old_product_id, -old_rating, -1)
+        apply_rating_delta(instance.product_id, instance.rating, 1)
+    elif old_rating != instance.rating:
+        apply_rating_delta(instance.product_id, instance.rating - old_rating, 0)
+
+
+@receiver(post_delete, sender=Review)
+def update_product_rating_on_review_delete(sender, instance, **kwargs):
+    # the row held the loaded values, not any unsaved in-memory edits
+    apply_rating_delta(
+        instance.get_loaded_value("product_id", instance.product_id),
+        -instance.get_loaded_value("rating", instance.rating),
+        -1,
+    )
+
+
+@receiver(post_save, sender=Product)
+def update_product_search_vector(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {"name", "category"} & set(update_fields):
+        return
+    # update() doesn't fire signals, so this can't recurse
+    refresh_search_vectors(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Category)
+def update_category_products_search_vector(sender, instance, created, **kwargs):
+    if created:
+        return
+    refresh_search_vectors(Product.objects.filter(category=instance))
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductSize)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Size)
 @receiver([post_save, post_delete], sender=Review)
-def update_product_rating_on_review_change(sender, instance, **kwargs):
-    product = instance.product
-    agg = product.reviews.aggregate(avg=Avg("rating"), count=Count("id"))
-    avg = agg.get("avg") or 0.0
-    count = agg.get("count") or 0
-    # round to 1 decimal
-    avg_rounded = round(float(avg) if avg else 0.0, 1)
-    Product.objects.filter(pk=product.pk).update(avg_rating=avg_rounded, review_count=count)
+def invalidate_catalog_cache(sender, instance, **kwargs):
+    # bump after commit so a concurrent reader can't re-cache pre-commit data
+    transaction.on_commit(bump_catalog_version)
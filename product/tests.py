@@ -1,3 +1,129 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from user.models import User
+from .models import Category, Product, ProductSize, Review, Size
+
+
+class ProductListQueryCountTests(TestCase):
+    """
+    The public product list must cost a fixed number of queries no matter
+    how many products are on the page (no per-product sizes lookup).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Dresses")
+        cls.sizes = [Size.objects.create(name=n) for n in ("S", "M", "L")]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def _create_products(self, count):
+        for i in range(count):
+            p = Product.objects.create(category=self.category, name=f"Dress {i}", new_price=100 + i)
+            for size in self.sizes:
+                ProductSize.objects.create(product=p, size=size, stock=5)
+
+    def test_list_query_count_is_constant(self):
+        self._create_products(2)
+        # products + prefetched sizes (with their Size rows joined)
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/v1/products/")
+        self.assertEqual(len(response.json()), 2)
+
+        self._create_products(10)
+        cache.clear()
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/v1/products/")
+        data = response.json()
+        self.assertEqual(len(data), 12)
+        self.assertEqual(
+            sorted(s["size"] for s in data[0]["sizes"]),
+            ["L", "M", "S"],
+        )
+
+    def test_mini_query_count_is_constant(self):
+        self._create_products(10)
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/v1/products/mini/")
+        self.assertEqual(len(response.json()), 10)
+
+
+class ProductCursorPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        category = Category.objects.create(name="Dresses")
+        # newest first would be the reverse of relevance for "floral"
+        self.best = Product.objects.create(category=category, name="Floral floral maxi", new_price=100)
+        self.other = Product.objects.create(category=category, name="Floral wrap dress", new_price=100)
+        for i in range(3):
+            Product.objects.create(category=category, name=f"Plain dress {i}", new_price=100)
+
+    def test_search_keeps_rank_order_with_offset_pages(self):
+        first = self.client.get("/api/v1/products/?pagination=cursor&page_size=1&search=floral").json()
+        self.assertEqual([p["id"] for p in first["results"]], [self.best.id])
+        self.assertIn("offset=1", first["next"])
+        self.assertIsNone(first["previous"])
+
+        second = self.client.get(first["next"]).json()
+        self.assertEqual([p["id"] for p in second["results"]], [self.other.id])
+        self.assertIsNone(second["next"])
+        self.assertIsNotNone(second["previous"])
+
+    def test_without_search_pages_by_keyset(self):
+        data = self.client.get("/api/v1/products/?pagination=cursor&page_size=2").json()
+        self.assertEqual(len(data["results"]), 2)
+        self.assertIn("cursor=", data["next"])
+
+
+class IncrementalRatingTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Dresses")
+        self.product = Product.objects.create(category=category, name="Maxi dress", new_price=999)
+        self.users = [
+            User.objects.create_user(
+                email=f"u{i}@example.com", name=f"U{i}", phone_number=f"900000000{i}", password="pass12345",
+            )
+            for i in range(3)
+        ]
+
+    def assertRating(self, rating_sum, count, avg):
+        self.product.refresh_from_db()
+        self.assertEqual(
+            (self.product.rating_sum, self.product.review_count, self.product.avg_rating),
+            (rating_sum, count, Decimal(avg)),
+        )
+
+    def test_create_update_delete_apply_deltas(self):
+        first = Review.objects.create(product=self.product, user=self.users[0], rating=5)
+        Review.objects.create(product=self.product, user=self.users[1], rating=4)
+        self.assertRating(9, 2, "4.5")
+
+        review = Review.objects.get(pk=first.pk)
+        review.rating = 2
+        # one UPDATE for the review, one delta UPDATE for the product: no re-aggregation
+        with self.captureOnCommitCallbacks(), self.assertNumQueries(2):
+            review.save(update_fields=["rating", "updated_at"])
+        self.assertRating(6, 2, "3.0")
+
+        review.delete()
+        self.assertRating(4, 1, "4.0")
+
+        Review.objects.all().delete()
+        self.assertRating(0, 0, "0.0")
+
+    def test_recompute_ratings_repairs_drift(self):
+        Review.objects.create(product=self.product, user=self.users[0], rating=3)
+        Review.objects.create(product=self.product, user=self.users[1], rating=4)
+        Product.objects.filter(pk=self.product.pk).update(rating_sum=50, review_count=1, avg_rating=1)
 
-# Create your tests here.
+        call_command("recompute_ratings", stdout=StringIO())
+        self.assertRating(7, 2, "3.5")
@@ -4,7 +4,11 @@ from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter, SearchFilter
+from django.db.models import Prefetch
 
+from django_dress.pagination import OptionalKeysetPagination
+from .cache import CatalogCacheMixin
+from .search import ProductSearchFilter, autocomplete_products
 from .models import Product, Category, Size, ProductSize, Review
 from .serializers import (
     ProductSerializer, ProductMiniSerializer, CategorySerializer,
@@ -21,26 +25,56 @@ class CategoryViewSet(viewsets.ModelViewSet):
         return [permissions.IsAdminUser()]
 
 
+class ProductCursorPagination(OptionalKeysetPagination):
+    # served by the (created_at, id) index on Product
+    ordering = ("-created_at", "-id")
+    # ?search= results keep their rank order (offset pages)
+    ranked_params = ("search",)
+
+
 class SizeViewSet(viewsets.ModelViewSet):
     queryset = Size.objects.all().order_by("name")
     serializer_class = SizeSerializer
     permission_classes = [permissions.IsAdminUser]
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
     authentication_classes = []
     permission_classes = [permissions.AllowAny]
     queryset = Product.objects.all().select_related("category")
     serializer_class = ProductSerializer
     parser_classes = (MultiPartParser, FormParser, JSONParser)
-    filter_backends = [DjangoFilterBackend, OrderingFilter, SearchFilter]
+    # search ranks results; OrderingFilter runs after it so ?ordering= still applies
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, OrderingFilter]
+    # unpaginated unless the client opts into ?pagination=cursor
+    pagination_class = ProductCursorPagination
 
     filterset_fields = {
         "category__slug": ["exact"],
         "category": ["exact"],
     }
     ordering_fields = ["created_at", "new_price"]
-    search_fields = ["name", "category__name"]
+    # query params that change the response; anything else is ignored by the cache key
+    catalog_cache_params = (
+        "category__slug", "category", "search", "q", "ordering",
+        "page", "page_size", "pagination", "cursor", "offset", "count",
+    )
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.action == "mini":
+            # ProductMiniSerializer has no sizes; don't pay for the prefetch
+            return qs
+        # one extra query for all sizes on the page, consumed by ProductSerializer.get_sizes
+        return qs.prefetch_related(
+            Prefetch("sizes", queryset=ProductSize.objects.select_related("size"))
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
 
     @action(detail=False, methods=["get"])
     def mini(self, request):
@@ -48,6 +82,21 @@ class ProductViewSet(viewsets.ModelViewSet):
         Optional lightweight list for client components that only need a small product shape.
         GET /api/v1/products/mini/
         """
+        return self.cached_response(request, self._mini)
+
+    @action(detail=False, methods=["get"])
+    def autocomplete(self, request):
+        """
+        Prefix / typo tolerant suggestions for the search box.
+        GET /api/v1/products/autocomplete/?q=dre
+        """
+        return self.cached_response(request, self._autocomplete)
+
+    def _autocomplete(self, request):
+        qs = autocomplete_products(request.query_params.get("q"))
+        return Response([{"id": p.id, "name": p.name, "slug": p.slug} for p in qs])
+
+    def _mini(self, request):
         qs = self.filter_queryset(self.get_queryset())
         page = self.paginate_queryset(qs)
         serializer = ProductMiniSerializer(page or qs, many=True, context={"request": request})
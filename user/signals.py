@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from django_dress.authentication import forget_auth_user
+from django_dress.usercache import forget_user
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    # bans / deactivation / deletion must not be served from the auth caches;
+    # evict after commit so a concurrent connect can't re-cache the old row
+    user_id = instance.pk
+
+    def forget():
+        forget_user(user_id)
+        forget_auth_user(user_id)
+
+    transaction.on_commit(forget)
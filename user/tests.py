@@ -1,3 +1,112 @@
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from django_dress import authentication
+from django_dress.authentication import CachedJWTAuthentication
+from .models import User
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        authentication.users.clear()
+        cache.clear()
+        self.user = User.objects.create_user(
+            email="buyer@example.com", name="Buyer", phone_number="9876543210", password="pass12345",
+        )
+        self.admin = User.objects.create_user(
+            email="admin@example.com", name="Admin", phone_number="9876543211", password="pass12345", is_staff=True,
+        )
+        self.client = APIClient()
+        self.admin_client = APIClient()
+        self.admin_client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.admin)}")
+
+    def authenticate(self, user):
+        request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+        return CachedJWTAuthentication().authenticate(request)[0]
+
+    def test_cached_user_needs_no_query(self):
+        with self.assertNumQueries(1):
+            self.authenticate(self.user)
+        with self.assertNumQueries(0):
+            user = self.authenticate(self.user)
+        self.assertIsInstance(user, User)
+        self.assertEqual((user.pk, user.email, user.is_staff), (self.user.pk, "buyer@example.com", False))
+
+        # another process: local copy gone, shared cache still warm
+        authentication.users.clear()
+        with self.assertNumQueries(0):
+            self.authenticate(self.user)
+
+    def test_other_fields_load_on_access(self):
+        user = self.authenticate(self.user)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.name, "Buyer")
+
+    def test_ban_applies_to_the_next_request(self):
+        self.authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.admin_client.post(f"/api/v1/admin/admin_user/{self.user.pk}/toggle-ban/")
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertRaisesMessage(AuthenticationFailed, "User is banned"):
+            self.authenticate(self.user)
+
+    def test_deactivation_evicts(self):
+        self.authenticate(self.user)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        with self.assertRaisesMessage(AuthenticationFailed, "User is inactive"):
+            self.authenticate(self.user)
+
+    def test_admin_update_and_delete_evict(self):
+        self.authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.admin_client.patch(
+                f"/api/v1/admin/admin_user/{self.user.pk}/", {"is_banned": True}, format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        with self.assertRaisesMessage(AuthenticationFailed, "User is banned"):
+            self.authenticate(self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.admin_client.delete(f"/api/v1/admin/admin_user/{self.user.pk}/")
+        self.assertEqual(response.status_code, 204)
+        with self.assertRaisesMessage(AuthenticationFailed, "User not found"):
+            self.authenticate(self.user)
+
+    def test_profile_update_evicts(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+        self.assertEqual(self.client.get("/api/v1/user/profile/").json()["name"], "Buyer")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch("/api/v1/user/profile/", {"name": "Renamed"}, format="json")
+        self.assertEqual(response.json()["name"], "Renamed")
+        self.assertIs(authentication.users.get(self.user.pk), authentication.users.MISSING)
+        self.assertIsNone(cache.get(f"auth:user:{self.user.pk}"))
+
+    def test_unreachable_cache_falls_back_to_the_database(self):
+        down = ConnectionError("redis down")
+        with mock.patch.object(cache, "get", side_effect=down), mock.patch.object(cache, "set", side_effect=down):
+            for _ in range(2):
+                with self.assertNumQueries(1):
+                    user = self.authenticate(self.user)
+                self.assertEqual(user.pk, self.user.pk)
+        # nothing kept locally while the shared cache could not be read
+        self.assertIs(authentication.users.get(self.user.pk), authentication.users.MISSING)
+
+    def test_unwritable_cache_still_authenticates(self):
+        with mock.patch.object(cache, "set", side_effect=ConnectionError("redis down")):
+            with self.assertNumQueries(1):
+                self.assertEqual(self.authenticate(self.user).pk, self.user.pk)
 
-# Create your tests here.
+    def test_eviction_survives_an_unreachable_cache(self):
+        self.authenticate(self.user)
+        with mock.patch.object(cache, "delete", side_effect=ConnectionError("redis down")):
+            authentication.forget_auth_user(self.user.pk)
+        self.assertIs(authentication.users.get(self.user.pk), authentication.users.MISSING)
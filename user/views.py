@@ -206,8 +206,12 @@ class ProfileView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser, JSONParser]
 
+    def get_object(self, request):
+        # request.user only has the cached auth columns loaded; fetch the full row once
+        return User.objects.get(pk=request.user.pk)
+
     def get(self, request):
-        serializer = ProfileSerializer(request.user, context={"request": request})
+        serializer = ProfileSerializer(self.get_object(request), context={"request": request})
         return Response(serializer.data)
 
     def patch(self, request):
@@ -215,7 +219,8 @@ class ProfileView(APIView):
         logger.debug("ProfileView.patch request.user: id=%s authenticated=%s", getattr(request.user, "id", None), request.user.is_authenticated)
 
         try:
-            serializer = ProfileSerializer(request.user, data=request.data, partial=True, context={"request": request})
+            # saving evicts the cached auth record (user/signals.py)
+            serializer = ProfileSerializer(self.get_object(request), data=request.data, partial=True, context={"request": request})
             if serializer.is_valid():
                 serializer.save()
                 return Response(serializer.data)
@@ -0,0 +1,12 @@
+# wishlist/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from django_dress.etags import bump_collection_version
+from .models import Wishlist
+
+
+@receiver([post_save, post_delete], sender=Wishlist)
+def bump_wishlist_version(sender, instance, **kwargs):
+    transaction.on_commit(lambda: bump_collection_version("wishlist", instance.user_id))
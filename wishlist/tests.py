@@ -1,3 +1,38 @@
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from product.models import Category, Product
+from user.models import User
+
+
+class WishlistDeltaResponseTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email="buyer@example.com", name="Buyer", phone_number="9876543210", password="pass12345",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name="Dresses")
+        self.product = Product.objects.create(category=category, name="Maxi dress", new_price=499)
+
+    def test_delta_add_and_remove(self):
+        etag = self.client.get("/api/v1/wishlist/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            added = self.client.post("/api/v1/wishlist/?response=delta", {"product": self.product.id}, format="json")
+        self.assertEqual(added.status_code, 201)
+        self.assertEqual(added.json()["item"]["product_detail"]["id"], self.product.id)
+        self.assertEqual(self.client.get("/api/v1/wishlist/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # a duplicate add changes nothing
+        current = self.client.get("/api/v1/wishlist/")["ETag"]
+        again = self.client.post("/api/v1/wishlist/?response=delta", {"product": self.product.id}, format="json")
+        self.assertEqual(again.json()["detail"], "Already in wishlist")
+        self.assertEqual(again["ETag"], current)
+        self.assertEqual(self.client.get("/api/v1/wishlist/", HTTP_IF_NONE_MATCH=current).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            removed = self.client.delete(f"/api/v1/wishlist/{added.json()['item']['id']}/?response=delta")
+        self.assertEqual(removed.json()["removed"], added.json()["item"]["id"])
+        self.assertEqual(self.client.get("/api/v1/wishlist/", HTTP_IF_NONE_MATCH=current).status_code, 200)
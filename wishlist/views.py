@@ -1,4 +1,3 @@
-
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
@@ -7,19 +6,47 @@ from django.shortcuts import get_object_or_404
 from .models import Wishlist
 from .serializers import WishlistSerializer
 from product.models import Product
+from django_dress.etags import collection_etag, not_modified, wants_delta
+
+
+def wishlist_response(request, response_status=status.HTTP_200_OK, item=None, removed=None, detail=None):
+    """
+    Full wishlist by default. With ?response=delta only the changed row is sent
+    back (or the id of the removed one) together with the new wishlist version.
+    """
+    etag = collection_etag("wishlist", request.user.id)
+    if wants_delta(request):
+        data = {"version": etag}
+        if item is not None:
+            data["item"] = WishlistSerializer(item, context={"request": request}).data
+        if removed is not None:
+            data["removed"] = removed
+    else:
+        qs = Wishlist.objects.filter(user=request.user).select_related("product")
+        serializer = WishlistSerializer(qs, many=True, context={"request": request})
+        # return as object to match prior contract: { id?, user?, items: [...] }
+        data = {"items": serializer.data}
+    if detail:
+        data = {"detail": detail, **data}
+    response = Response(data, status=response_status)
+    response["ETag"] = etag
+    return response
+
 
 class WishlistListCreateAPIView(APIView):
     """
     GET: list current user's wishlist items
     POST: add a product to wishlist with payload { "product": <id> }
+    Add ?response=delta to a POST / DELETE to get only the changed item back.
     """
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, format=None):
-        qs = Wishlist.objects.filter(user=request.user).select_related("product")
-        serializer = WishlistSerializer(qs, many=True, context={"request": request})
-        # return as object to match prior contract: { id?, user?, items: [...] }
-        return Response({"items": serializer.data}, status=status.HTTP_200_OK)
+        # If-None-Match with the last seen version -> 304, no query
+        cached = not_modified(request, collection_etag("wishlist", request.user.id))
+        if cached is not None:
+            return cached
+        return wishlist_response(request)
 
     def post(self, request, format=None):
         product_id = request.data.get("product")
@@ -30,19 +57,15 @@ class WishlistListCreateAPIView(APIView):
         product = get_object_or_404(Product, pk=product_id)
 
         # prevent duplicates
-        exists = Wishlist.objects.filter(user=request.user, product=product).exists()
-        if exists:
+        existing = Wishlist.objects.filter(user=request.user, product=product).select_related("product").first()
+        if existing is not None:
             # return current wishlist so client stays authoritative
-            qs = Wishlist.objects.filter(user=request.user).select_related("product")
-            serializer = WishlistSerializer(qs, many=True, context={"request": request})
-            return Response({"detail": "Already in wishlist", "items": serializer.data}, status=status.HTTP_200_OK)
+            return wishlist_response(request, item=existing, detail="Already in wishlist")
 
         item = Wishlist.objects.create(user=request.user, product=product)
 
         # return updated wishlist
-        qs = Wishlist.objects.filter(user=request.user).select_related("product")
-        serializer = WishlistSerializer(qs, many=True, context={"request": request})
-        return Response({"items": serializer.data}, status=status.HTTP_201_CREATED)
+        return wishlist_response(request, status.HTTP_201_CREATED, item=item)
 
 
 class WishlistDeleteAPIView(APIView):
@@ -57,6 +80,4 @@ class WishlistDeleteAPIView(APIView):
             return Response({"detail": "Not allowed"}, status=status.HTTP_403_FORBIDDEN)
 
         obj.delete()
-        qs = Wishlist.objects.filter(user=request.user).select_related("product")
-        serializer = WishlistSerializer(qs, many=True, context={"request": request})
-        return Response({"items": serializer.data}, status=status.HTTP_200_OK)
+        return wishlist_response(request, removed=pk)